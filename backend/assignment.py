@@ -0,0 +1,175 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+ASSIGNMENT_SOLVER_SPARSE = "sparse"   # Hanya edge feasible (memori ~ jumlah pasangan)
+ASSIGNMENT_SOLVER_DENSE = "dense"     # Matrix penuh per blok
+ASSIGNMENT_SOLVER = os.getenv("ASSIGNMENT_SOLVER", ASSIGNMENT_SOLVER_SPARSE)
+
+ASSIGNMENT_WORKERS = int(os.getenv("ASSIGNMENT_WORKERS", str(os.cpu_count() or 1)))
+ASSIGNMENT_PARALLEL_MIN_CELLS = int(os.getenv("ASSIGNMENT_PARALLEL_MIN_CELLS", "250000"))  # Blok kecil diselesaikan inline
+
+INFINITY_COST = 1e9   # Sel tanpa pasangan feasible (solver dense)
+
+
+class AssignmentBlock(NamedTuple):
+    """Edge feasible satu blok independen, dengan index global dest/origin."""
+    rows: np.ndarray
+    cols: np.ndarray
+    costs: np.ndarray
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def _pool_context() -> multiprocessing.context.BaseContext:
+    """
+    Proses induk punya thread lain (executor HTTP, lock cache), jadi fork bisa
+    mewarisi lock yang sedang terkunci. Pakai forkserver, atau spawn jika tidak
+    tersedia (Windows).
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool, _pool_pid
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=max(1, ASSIGNMENT_WORKERS),
+                mp_context=_pool_context()
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _solve_dense(
+    rows: np.ndarray,
+    cols: np.ndarray,
+    costs: np.ndarray,
+    num_rows: int,
+    num_cols: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    sub_matrix = np.full((num_rows, num_cols), INFINITY_COST)
+    sub_matrix[rows, cols] = costs
+    row_ind, col_ind = linear_sum_assignment(sub_matrix)
+    matched = sub_matrix[row_ind, col_ind] < INFINITY_COST
+    return row_ind[matched], col_ind[matched]
+
+
+def _solve_sparse(
+    rows: np.ndarray,
+    cols: np.ndarray,
+    costs: np.ndarray,
+    num_rows: int,
+    num_cols: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ekuivalen dengan Hungarian pada matrix INFINITY_COST, tapi hanya memakai
+    edge feasible. Graf dibuat persegi dengan node dummy:
+
+    - baris i  -> kolom dummy i  : INFINITY_COST / 2 (baris tidak dipasangkan)
+    - baris dummy j -> kolom j   : INFINITY_COST / 2 (kolom tidak dipasangkan)
+    - baris dummy j -> kolom dummy i untuk tiap edge (i, j): 0
+
+    Sehingga total = sum cost - INFINITY_COST * jumlah match + konstanta, sama
+    dengan objektif versi dense. Semua bobot digeser positif karena nol
+    dianggap bukan edge.
+    """
+    unmatched_cost = INFINITY_COST / 2
+    shift = 1.0 - min(0.0, float(costs.min()))
+
+    row_range = np.arange(num_rows)
+    col_range = np.arange(num_cols)
+    graph_rows = np.concatenate([rows, row_range, num_rows + col_range, num_rows + cols])
+    graph_cols = np.concatenate([cols, num_cols + row_range, col_range, num_cols + rows])
+    weights = np.concatenate([
+        costs,
+        np.full(num_rows, unmatched_cost),
+        np.full(num_cols, unmatched_cost),
+        np.zeros(len(costs)),
+    ]) + shift
+
+    size = num_rows + num_cols
+    graph = csr_matrix((weights, (graph_rows, graph_cols)), shape=(size, size))
+    row_ind, col_ind = min_weight_full_bipartite_matching(graph)
+    matched = (row_ind < num_rows) & (col_ind < num_cols)
+    return row_ind[matched], col_ind[matched]
+
+
+SOLVERS = {
+    ASSIGNMENT_SOLVER_SPARSE: _solve_sparse,
+    ASSIGNMENT_SOLVER_DENSE: _solve_dense,
+}
+
+
+def _solve_block(
+    block: AssignmentBlock,
+    solver: str
+) -> Tuple[np.ndarray, np.ndarray]:
+    row_ids, rows = np.unique(block.rows, return_inverse=True)
+    col_ids, cols = np.unique(block.cols, return_inverse=True)
+    row_ind, col_ind = SOLVERS[solver](rows, cols, block.costs, len(row_ids), len(col_ids))
+    return row_ids[row_ind], col_ids[col_ind]
+
+
+def _block_work(block: AssignmentBlock, solver: str) -> int:
+    if solver == ASSIGNMENT_SOLVER_DENSE:
+        return len(np.unique(block.rows)) * len(np.unique(block.cols))
+    return len(block.costs)
+
+
+def solve_assignment(
+    blocks: List[AssignmentBlock],
+    solver: str = ASSIGNMENT_SOLVER,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Assignment biaya minimum per blok independen. Pasangan antar blok tidak
+    pernah feasible, jadi gabungan optimum per blok sama dengan optimum matrix
+    penuh, tetapi biayanya mengikuti blok terbesar. Blok besar dikerjakan
+    paralel di process pool.
+
+    progress(selesai, total) dipanggil setiap satu blok selesai.
+    Returns (row_indices, col_indices) pasangan terpilih, terurut per baris
+    seperti linear_sum_assignment.
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"Assignment solver tidak dikenal: '{solver}'")
+
+    large = [
+        k for k, block in enumerate(blocks)
+        if _block_work(block, solver) >= ASSIGNMENT_PARALLEL_MIN_CELLS
+    ]
+
+    futures = {}
+    if len(large) > 1 and ASSIGNMENT_WORKERS > 1:
+        pool = _get_pool()
+        futures = {k: pool.submit(_solve_block, blocks[k], solver) for k in large}
+
+    row_parts: List[np.ndarray] = []
+    col_parts: List[np.ndarray] = []
+    for k, block in enumerate(blocks):
+        row_ind, col_ind = futures[k].result() if k in futures else _solve_block(block, solver)
+        row_parts.append(row_ind)
+        col_parts.append(col_ind)
+        if progress:
+            progress(k + 1, len(blocks))
+
+    if not row_parts:
+        return np.array([], dtype=np.intp), np.array([], dtype=np.intp)
+
+    row_indices = np.concatenate(row_parts)
+    col_indices = np.concatenate(col_parts)
+    order = np.argsort(row_indices, kind="stable")
+    return row_indices[order], col_indices[order]
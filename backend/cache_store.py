@@ -0,0 +1,251 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+EVICTION_CHECK_INTERVAL = 1000     # Cek ukuran cache setiap N penulisan
+EVICTION_TARGET_RATIO = 0.9        # Setelah eviction, sisakan 90% dari max_entries
+ACCESS_TOUCH_INTERVAL = 60.0       # Update accessed_at paling cepat tiap 60 detik per key
+GET_MANY_BATCH = 500               # Key per query IN (...), di bawah limit variabel SQLite
+
+
+class PersistentCache:
+    """
+    Cache key-value berbasis SQLite (WAL) yang dipakai bersama oleh semua
+    worker uvicorn dan bertahan setelah restart.
+
+    - Entry kedaluwarsa setelah TTL (bisa di-override per entry).
+    - Jika jumlah entry melewati max_entries, entry yang paling lama tidak
+      diakses (LRU) dibuang.
+    - Counter hit/miss dihitung per proses.
+    - Error SQLite tidak pernah menggagalkan pemanggil; diperlakukan sebagai miss.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        table: str,
+        max_entries: int,
+        ttl_seconds: float
+    ):
+        self.path = Path(path)
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes_since_check = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # Koneksi SQLite tidak boleh dipakai ulang setelah fork
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, "
+            "value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, "
+            "accessed_at REAL NOT NULL, "
+            "expires_at REAL)"
+        )
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{self.table}_accessed "
+            f"ON {self.table} (accessed_at)"
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                f"SELECT value, accessed_at, expires_at FROM {self.table} WHERE key = ?",
+                (key,)
+            ).fetchone()
+
+            if row is None or (row[2] is not None and row[2] < now):
+                with self._lock:
+                    self.misses += 1
+                return None
+
+            if now - row[1] > ACCESS_TOUCH_INTERVAL:
+                conn.execute(
+                    f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?",
+                    (now, key)
+                )
+        except sqlite3.Error as e:
+            print(f"Warning: cache '{self.table}' tidak bisa dibaca: {e}")
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return json.loads(row[0])
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Lookup banyak key sekaligus; return hanya key yang ada & belum kedaluwarsa."""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, Any] = {}
+        now = time.time()
+        try:
+            conn = self._connect()
+            stale = []
+            for start in range(0, len(keys), GET_MANY_BATCH):
+                batch = keys[start:start + GET_MANY_BATCH]
+                rows = conn.execute(
+                    f"SELECT key, value, accessed_at, expires_at FROM {self.table} "
+                    f"WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                for key, value, accessed_at, expires_at in rows:
+                    if expires_at is not None and expires_at < now:
+                        continue
+                    found[key] = json.loads(value)
+                    if now - accessed_at > ACCESS_TOUCH_INTERVAL:
+                        stale.append((now, key))
+            if stale:
+                conn.executemany(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", stale)
+        except sqlite3.Error as e:
+            print(f"Warning: cache '{self.table}' tidak bisa dibaca: {e}")
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        now = time.time()
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = now + ttl if ttl and ttl > 0 else None
+
+        try:
+            self._connect().execute(
+                f"INSERT OR REPLACE INTO {self.table} "
+                "(key, value, created_at, accessed_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(value), now, now, expires_at)
+            )
+        except sqlite3.Error as e:
+            print(f"Warning: cache '{self.table}' tidak bisa ditulis: {e}")
+            return
+
+        with self._lock:
+            self._writes_since_check += 1
+            should_evict = self._writes_since_check >= EVICTION_CHECK_INTERVAL
+            if should_evict:
+                self._writes_since_check = 0
+        if should_evict:
+            self.evict()
+
+    def set_many(self, items: Dict[str, Any], ttl_seconds: Optional[float] = None) -> None:
+        """Tulis banyak entry dalam satu transaksi (mis. hasil satu request matrix)."""
+        if not items:
+            return
+        now = time.time()
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = now + ttl if ttl and ttl > 0 else None
+
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} "
+                    "(key, value, created_at, accessed_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                    [(key, json.dumps(value), now, now, expires_at) for key, value in items.items()]
+                )
+        except sqlite3.Error as e:
+            print(f"Warning: cache '{self.table}' tidak bisa ditulis: {e}")
+            return
+
+        with self._lock:
+            self._writes_since_check += len(items)
+            should_evict = self._writes_since_check >= EVICTION_CHECK_INTERVAL
+            if should_evict:
+                self._writes_since_check = 0
+        if should_evict:
+            self.evict()
+
+    def delete(self, key: str) -> None:
+        try:
+            self._connect().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            print(f"Warning: cache '{self.table}' tidak bisa dihapus: {e}")
+
+    def evict(self) -> int:
+        """Buang entry kedaluwarsa, lalu entry LRU jika masih melebihi max_entries."""
+        removed = 0
+        try:
+            conn = self._connect()
+            removed += conn.execute(
+                f"DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at < ?",
+                (time.time(),)
+            ).rowcount
+
+            count = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            if self.max_entries > 0 and count > self.max_entries:
+                excess = count - int(self.max_entries * EVICTION_TARGET_RATIO)
+                removed += conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f"SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                    (excess,)
+                ).rowcount
+        except sqlite3.Error as e:
+            print(f"Warning: eviction cache '{self.table}' gagal: {e}")
+
+        with self._lock:
+            self.evictions += removed
+        return removed
+
+    def clear(self) -> None:
+        try:
+            self._connect().execute(f"DELETE FROM {self.table}")
+        except sqlite3.Error as e:
+            print(f"Warning: cache '{self.table}' tidak bisa dikosongkan: {e}")
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """Semua entry yang belum kedaluwarsa."""
+        try:
+            rows = self._connect().execute(
+                f"SELECT key, value FROM {self.table} "
+                "WHERE expires_at IS NULL OR expires_at >= ?",
+                (time.time(),)
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Warning: cache '{self.table}' tidak bisa dibaca: {e}")
+            return
+        for key, value in rows:
+            yield key, json.loads(value)
+
+    def __len__(self) -> int:
+        try:
+            return self._connect().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "path": str(self.path),
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
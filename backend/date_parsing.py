@@ -0,0 +1,195 @@
+from datetime import datetime
+from itertools import repeat
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+DATETIME_FORMATS = [
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%dT%H:%M',
+    '%d/%m/%Y %H:%M:%S',
+    '%d/%m/%Y %H:%M',
+    '%d-%m-%Y %H:%M:%S',
+    '%d-%m-%Y %H:%M',
+    '%d %b %Y %H:%M',
+    '%d %B %Y %H:%M',
+    '%Y/%m/%d %H:%M',
+    '%Y-%m-%d',
+    '%d/%m/%Y',
+    '%d-%m-%Y',
+]
+
+# Hanya dipakai saat inferensi format kolom: kolom yang jelas MM/DD (ada hari > 12)
+# di-parse konsisten sebagai MM/DD. Nilai ambigu tetap DD/MM karena urutan.
+INFERENCE_ONLY_FORMATS = [
+    '%m/%d/%Y %H:%M:%S',
+    '%m/%d/%Y %H:%M',
+    '%m/%d/%Y',
+]
+
+DATETIME_SAMPLE_SIZE = 200
+EMPTY_DATETIME_VALUES = ('nat', 'nan', 'none', '')
+ISO_FORMAT = '%Y-%m-%dT%H:%M:%S'   # = np.datetime_as_string(unit='s')
+DATETIME64_MIN = pd.Timestamp.min.ceil('us').to_pydatetime()
+DATETIME64_MAX = pd.Timestamp.max.floor('us').to_pydatetime()
+
+
+def _strptime_or_none(value: str, fmt: str) -> Optional[datetime]:
+    try:
+        return datetime.strptime(value, fmt)
+    except ValueError:
+        return None
+
+
+def parse_datetime_value(value: Any) -> Tuple[Optional[datetime], Optional[str]]:
+    """
+    Parse satu nilai: coba DATETIME_FORMATS berurutan, lalu pandas dengan
+    dayfirst=True (konvensi DD/MM). Returns (datetime, pesan_error).
+    """
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None, "Nilai kosong"
+
+    if isinstance(value, datetime):
+        return value, None
+
+    s = str(value).strip()
+    if s.lower() in EMPTY_DATETIME_VALUES:
+        return None, "Nilai kosong"
+
+    for fmt in DATETIME_FORMATS:
+        parsed = _strptime_or_none(s, fmt)
+        if parsed is not None:
+            return parsed, None
+
+    try:
+        parsed = pd.to_datetime(s, dayfirst=True)
+        if pd.notna(parsed):
+            return parsed.to_pydatetime(), None
+    except Exception:
+        pass
+
+    return None, f"Format tidak dikenali: '{s}'"
+
+
+def infer_datetime_format(values: List[str]) -> Optional[str]:
+    """
+    Format pertama yang cocok dengan seluruh sampel string; jika tidak ada,
+    format yang paling banyak cocok. Jika seri, format yang lebih awal di
+    DATETIME_FORMATS menang (DD/MM sebelum MM/DD). Setiap format dicoba
+    tervektorisasi pada seluruh sampel, bukan strptime per string.
+    """
+    sample = pd.Series(values[:DATETIME_SAMPLE_SIZE], dtype=object)
+    best_format, best_count = None, 0
+    for fmt in DATETIME_FORMATS + INFERENCE_ONLY_FORMATS:
+        count = int(pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum())
+        if count > best_count:
+            best_format, best_count = fmt, count
+        if best_count == len(sample):
+            break
+    return best_format
+
+
+def _naive_datetimes(values: np.ndarray) -> np.ndarray:
+    """Buang timezone dari datetime/Timestamp (jam lokal apa adanya, seperti sel Excel)."""
+    return np.array([
+        value.replace(tzinfo=None) if value.tzinfo is not None else value
+        for value in values
+    ], dtype=object)
+
+
+def _place_datetimes(
+    result: np.ndarray,
+    overflow: Dict[int, datetime],
+    positions: np.ndarray,
+    values: np.ndarray
+) -> None:
+    """
+    Isi result[positions] (datetime64[ns]) dengan values (object datetime).
+    Nilai di luar rentang datetime64[ns] (mis. salah ketik tahun) tetap NaT
+    di result, tapi disimpan di overflow supaya string ISO-nya tetap ada.
+    """
+    if len(positions) == 0:
+        return
+    converted = pd.to_datetime(pd.Series(values, dtype=object), errors='coerce')
+    in_range = ((converted >= DATETIME64_MIN) & (converted <= DATETIME64_MAX)).to_numpy()
+    result[positions[in_range]] = converted[in_range].astype('datetime64[ns]').to_numpy()
+    for k, value in zip(positions[~in_range], values[~in_range]):
+        overflow[int(k)] = value
+
+
+def _iso_strings(values: np.ndarray) -> np.ndarray:
+    """ISO_FORMAT untuk array datetime64 (tervektorisasi), None untuk NaT."""
+    iso = np.datetime_as_string(values, unit='s').astype(object)
+    iso[np.isnat(values)] = None
+    return iso
+
+
+def parse_datetime_column(series: pd.Series) -> Tuple[pd.Series, List[Optional[str]], List[Optional[str]]]:
+    """
+    Parse satu kolom tanggal sekaligus:
+
+    1. kolom datetime64 langsung dipakai (tanpa parse)
+    2. selain itu nilai unik saja yang diproses (hasil disebar ke semua baris)
+    3. format dominan ditebak dari sampel string unik (infer_datetime_format)
+    4. semua string unik di-parse tervektorisasi dengan format itu
+    5. hanya yang gagal (outlier) lewat parse_datetime_value per format
+
+    Dipakai bersama oleh validasi dan optimasi supaya tafsiran DD/MM vs
+    MM/DD selalu sama.
+
+    Returns (Series datetime64[ns] dengan NaT untuk yang gagal, string ISO per
+    baris, pesan error per baris).
+    """
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        values = series.dt.tz_localize(None) if series.dt.tz is not None else series
+        values = values.astype('datetime64[ns]')
+        errors = np.where(values.isna().to_numpy(), "Nilai kosong", None)
+        return values.rename(series.name), _iso_strings(values.to_numpy()).tolist(), errors.tolist()
+
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    uniques = pd.Series(np.asarray(uniques, dtype=object), dtype=object)
+
+    result = np.full(len(uniques), np.datetime64('NaT'), dtype='datetime64[ns]')
+    overflow: Dict[int, datetime] = {}
+    errors = np.full(len(uniques), None, dtype=object)
+
+    missing = uniques.isna().to_numpy()
+    is_datetime = np.fromiter(map(isinstance, uniques, repeat(datetime)), dtype=bool, count=len(uniques))
+    datetime_positions = np.flatnonzero(is_datetime & ~missing)
+    _place_datetimes(result, overflow, datetime_positions, _naive_datetimes(uniques.to_numpy()[datetime_positions]))
+
+    text_positions = np.flatnonzero(~is_datetime & ~missing)
+    texts = uniques.iloc[text_positions].astype(str).str.strip()
+    empty = texts.str.lower().isin(EMPTY_DATETIME_VALUES).to_numpy()
+    errors[missing] = "Nilai kosong"
+    errors[text_positions[empty]] = "Nilai kosong"
+    text_positions, texts = text_positions[~empty], texts[~empty].tolist()
+
+    dominant_format = infer_datetime_format(texts) if texts else None
+    if dominant_format is not None:
+        vectorized = pd.to_datetime(pd.Series(texts, dtype=object), format=dominant_format, errors='coerce')
+        failed = vectorized.isna().to_numpy()
+        in_range = ((vectorized >= DATETIME64_MIN) & (vectorized <= DATETIME64_MAX)).to_numpy()
+        result[text_positions[in_range]] = vectorized[in_range].astype('datetime64[ns]').to_numpy()
+        for k, value in zip(text_positions[~failed & ~in_range], vectorized[~failed & ~in_range]):
+            overflow[int(k)] = value.to_pydatetime()
+    else:
+        failed = np.ones(len(texts), dtype=bool)
+
+    # Outlier: per nilai lewat semua DATETIME_FORMATS lalu pandas dayfirst
+    outlier_positions = text_positions[failed]
+    outlier_values = np.full(len(outlier_positions), None, dtype=object)
+    for n, s in enumerate(np.asarray(texts, dtype=object)[failed]):
+        outlier_values[n], errors[outlier_positions[n]] = parse_datetime_value(s)
+    parsed_outliers = outlier_values != None   # noqa: E711 (elementwise)
+    _place_datetimes(result, overflow, outlier_positions[parsed_outliers], outlier_values[parsed_outliers])
+
+    iso = _iso_strings(result)
+    for k, value in overflow.items():
+        iso[k] = value.strftime(ISO_FORMAT)
+
+    column = pd.Series(result[codes], index=series.index, name=series.name)
+    return column, iso[codes].tolist(), errors[codes].tolist()
@@ -0,0 +1,210 @@
+import argparse
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from valhalla import (
+    ROUTING_MODE,
+    ROUTING_MODE_MATRIX,
+    ROUTING_MODE_ROUTE,
+    _create_route_cache_key,
+    get_valhalla_distance,
+    prefetch_matrix,
+    prefetch_routes,
+    route_cache,
+)
+
+DISTANCE_PROVIDER_VALHALLA = "valhalla"    # Routing engine Valhalla (route/matrix)
+DISTANCE_PROVIDER_HAVERSINE = "haversine"  # Offline: haversine x detour factor
+DISTANCE_PROVIDER_TABLE = "table"          # Offline: tabel jarak precomputed dari disk
+DISTANCE_PROVIDER = os.getenv("DISTANCE_PROVIDER", DISTANCE_PROVIDER_VALHALLA)
+
+DISTANCE_DETOUR_FACTOR = float(os.getenv("DISTANCE_DETOUR_FACTOR", "1.3"))
+# Prefilter pasangan memakai haversine x faktor ini sebagai batas bawah jarak jalan;
+# detour factor di bawahnya membuat batas bawah melebihi jarak provider haversine
+HAVERSINE_LOWER_BOUND_FACTOR = 0.995   # Koreksi bumi bulat vs elipsoid
+DISTANCE_TABLE_PATH = os.getenv(
+    "DISTANCE_TABLE_PATH",
+    str(Path(__file__).parent / "distance_table.csv")
+)
+DISTANCE_TABLE_COLUMNS = ['from_lat', 'from_lon', 'to_lat', 'to_lon', 'distance_km']
+
+EARTH_RADIUS_KM = 6371.0
+
+Leg = Tuple[float, float, float, float]
+
+
+def haversine_km(lat1: Any, lon1: Any, lat2: Any, lon2: Any) -> Any:
+    """Jarak great-circle (km); menerima skalar maupun array NumPy."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class DistanceProvider:
+    """Sumber jarak jalan (km) antar dua koordinat untuk cost matrix."""
+
+    name = "base"
+    supports_geometry = False
+
+    def prefetch(self, legs: List[Leg]) -> None:
+        """Ambil banyak leg sekaligus sebelum get_distance dipanggil (opsional)."""
+
+    def get_distance(
+        self,
+        lat_start: float,
+        lon_start: float,
+        lat_end: float,
+        lon_end: float
+    ) -> Optional[float]:
+        raise NotImplementedError
+
+
+class ValhallaProvider(DistanceProvider):
+    """
+    Valhalla dengan dua mode: 'route' (satu /route per leg, paralel) atau
+    'matrix' (batch /sources_to_targets; sel yang kosong fallback ke /route).
+    """
+
+    name = DISTANCE_PROVIDER_VALHALLA
+    supports_geometry = True
+
+    def __init__(self, routing_mode: str = ROUTING_MODE):
+        if routing_mode not in (ROUTING_MODE_ROUTE, ROUTING_MODE_MATRIX):
+            raise ValueError(f"Routing mode tidak dikenal: '{routing_mode}'")
+        self.routing_mode = routing_mode
+        self.table: Dict[str, Tuple[float, Optional[float]]] = {}
+
+    def prefetch(self, legs: List[Leg]) -> None:
+        if not legs:
+            return
+        if self.routing_mode == ROUTING_MODE_MATRIX:
+            self.table.update(prefetch_matrix(legs))
+        else:
+            prefetch_routes(legs)
+
+    def get_distance(
+        self,
+        lat_start: float,
+        lon_start: float,
+        lat_end: float,
+        lon_end: float
+    ) -> Optional[float]:
+        cached = self.table.get(_create_route_cache_key(lat_start, lon_start, lat_end, lon_end))
+        if cached is not None:
+            return cached[0]
+        distance_km, _ = get_valhalla_distance(lat_start, lon_start, lat_end, lon_end)
+        return distance_km
+
+
+def _check_detour_factor(detour_factor: float) -> None:
+    if detour_factor < HAVERSINE_LOWER_BOUND_FACTOR:
+        raise ValueError(
+            f"DISTANCE_DETOUR_FACTOR={detour_factor} di bawah batas bawah prefilter "
+            f"({HAVERSINE_LOWER_BOUND_FACTOR}); pasangan valid bisa ikut terbuang"
+        )
+
+
+_check_detour_factor(DISTANCE_DETOUR_FACTOR)
+
+
+class HaversineProvider(DistanceProvider):
+    """Jarak great-circle dikali detour factor. Tanpa network."""
+
+    name = DISTANCE_PROVIDER_HAVERSINE
+
+    def __init__(self, detour_factor: float = DISTANCE_DETOUR_FACTOR):
+        _check_detour_factor(detour_factor)
+        self.detour_factor = detour_factor
+
+    def get_distance(
+        self,
+        lat_start: float,
+        lon_start: float,
+        lat_end: float,
+        lon_end: float
+    ) -> Optional[float]:
+        return float(haversine_km(lat_start, lon_start, lat_end, lon_end) * self.detour_factor)
+
+
+@lru_cache(maxsize=4)
+def _load_distance_table(path: str, mtime: float) -> Dict[str, float]:
+    df = pd.read_csv(path, usecols=DISTANCE_TABLE_COLUMNS)
+    df = df.dropna(subset=['distance_km'])
+    keys = [
+        _create_route_cache_key(a, b, c, d)
+        for a, b, c, d in zip(df['from_lat'], df['from_lon'], df['to_lat'], df['to_lon'])
+    ]
+    print(f"Distance table loaded: {len(keys)} leg dari {path}")
+    return dict(zip(keys, df['distance_km'].astype(float)))
+
+
+class TableProvider(DistanceProvider):
+    """
+    Tabel jarak precomputed dari disk (CSV dengan kolom DISTANCE_TABLE_COLUMNS).
+    Leg yang tidak ada di tabel dianggap tidak ada rute.
+    """
+
+    name = DISTANCE_PROVIDER_TABLE
+
+    def __init__(self, path: str = DISTANCE_TABLE_PATH):
+        if not Path(path).exists():
+            raise ValueError(f"Distance table tidak ditemukan: '{path}'")
+        self.path = path
+        self.table = _load_distance_table(path, Path(path).stat().st_mtime)
+        self.misses = 0
+
+    def get_distance(
+        self,
+        lat_start: float,
+        lon_start: float,
+        lat_end: float,
+        lon_end: float
+    ) -> Optional[float]:
+        distance_km = self.table.get(_create_route_cache_key(lat_start, lon_start, lat_end, lon_end))
+        if distance_km is None:
+            self.misses += 1
+        return distance_km
+
+
+def get_distance_provider(
+    name: Optional[str] = None,
+    routing_mode: str = ROUTING_MODE
+) -> DistanceProvider:
+    """Buat provider dari nama (default env DISTANCE_PROVIDER)."""
+    name = (name or DISTANCE_PROVIDER).strip().lower()
+    if name == DISTANCE_PROVIDER_VALHALLA:
+        return ValhallaProvider(routing_mode)
+    if name == DISTANCE_PROVIDER_HAVERSINE:
+        return HaversineProvider()
+    if name == DISTANCE_PROVIDER_TABLE:
+        return TableProvider()
+    raise ValueError(f"Distance provider tidak dikenal: '{name}'")
+
+
+def export_route_cache(path: str) -> int:
+    """Tulis isi route_cache (hasil Valhalla) sebagai distance table untuk TableProvider."""
+    rows = []
+    for key, value in route_cache.items():
+        start, end = key.split("|")
+        from_lat, from_lon = start.split(",")
+        to_lat, to_lon = end.split(",")
+        rows.append((float(from_lat), float(from_lon), float(to_lat), float(to_lon), value[0]))
+
+    pd.DataFrame(rows, columns=DISTANCE_TABLE_COLUMNS).to_csv(path, index=False)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export route cache ke distance table (CSV).")
+    parser.add_argument("output", nargs="?", default=DISTANCE_TABLE_PATH)
+    args = parser.parse_args()
+    count = export_route_cache(args.output)
+    print(f"{count} leg ditulis ke {args.output}")
@@ -0,0 +1,344 @@
+import argparse
+import importlib.util
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_DURASI_BONGKAR_JAM = 5.0
+DEFAULT_DURASI_MUAT_JAM = 5.0
+DURATION_TIPES = ("bongkar", "muat")
+HOURS_PER_DAY = 24
+
+DURATION_LOOKUP_JSON_PATH = Path(os.getenv(
+    "DURATION_LOOKUP_JSON_PATH",
+    str(Path(__file__).parent / "duration_lookup.json")
+))
+# Hasil compile (Arrow IPC): di-memory-map, jadi halaman file dipakai bersama semua worker
+DURATION_LOOKUP_PATH = Path(os.getenv(
+    "DURATION_LOOKUP_PATH",
+    str(Path(__file__).parent / "duration_lookup.arrow")
+))
+DURATION_LOOKUP_CHECK_SECONDS = float(os.getenv("DURATION_LOOKUP_CHECK_SECONDS", "30"))   # 0 = tanpa watcher
+
+KIND_CUSTOMER = 0
+KIND_CABANG = 1
+
+
+class DurationIndex:
+    """
+    Duration lookup dalam bentuk terindeks untuk scoring tervektorisasi:
+
+    - customer_keys / cabang_keys: key lookup ("CUSTID__CABANG" / cabang) -> posisi integer
+    - hours[tipe]: median jam per posisi (NaN jika tidak ada)
+    - mode_hour[tipe], sample_count[tipe] (-1 jika tidak ada) dan
+      distribution[tipe] (count per jam, bentuk (n, 24)) untuk time profile
+    - global_hours[tipe]: fallback terakhir
+
+    Posisi customer dan cabang ada di array yang sama (cabang setelah customer).
+    Urutan fallback: customer, cabang, global.
+    """
+
+    def __init__(
+        self,
+        keys: Sequence[str],
+        kinds: np.ndarray,
+        hours: Dict[str, np.ndarray],
+        mode_hour: Dict[str, np.ndarray],
+        sample_count: Dict[str, np.ndarray],
+        distribution: Dict[str, np.ndarray],
+        global_default: Optional[float],
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        self.customer_keys: Dict[str, int] = {}
+        self.cabang_keys: Dict[str, int] = {}
+        for k, (key, kind) in enumerate(zip(keys, kinds.tolist())):
+            (self.customer_keys if kind == KIND_CUSTOMER else self.cabang_keys)[key] = k
+        self.hours = hours
+        self.mode_hour = mode_hour
+        self.sample_count = sample_count
+        self.distribution = distribution
+        defaults = {"bongkar": DEFAULT_DURASI_BONGKAR_JAM, "muat": DEFAULT_DURASI_MUAT_JAM}
+        self.global_hours: Dict[str, float] = {
+            tipe: float(global_default if global_default is not None else defaults[tipe])
+            for tipe in DURATION_TIPES
+        }
+        self.metadata = metadata or {}
+
+    @classmethod
+    def from_lookup(cls, lookup: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None) -> "DurationIndex":
+        """Dari dict duration_lookup.json ('customers', 'cabang_defaults', 'global_default')."""
+        entries = [
+            (KIND_CUSTOMER, key, data) for key, data in lookup.get("customers", {}).items()
+        ] + [
+            (KIND_CABANG, key, data) for key, data in lookup.get("cabang_defaults", {}).items()
+        ]
+        hours, mode_hour, sample_count, distribution = {}, {}, {}, {}
+        for tipe in DURATION_TIPES:
+            hours[tipe] = np.array(
+                [data.get(f"median_{tipe}_hours", np.nan) for _, _, data in entries], dtype=np.float64
+            )
+            mode_hour[tipe] = np.array(
+                [data.get(f"mode_hour_{tipe}", -1) for _, _, data in entries], dtype=np.int16
+            )
+            sample_count[tipe] = np.array(
+                [data.get(f"count_hours_{tipe}", -1) for _, _, data in entries], dtype=np.int32
+            )
+            counts = np.zeros((len(entries), HOURS_PER_DAY), dtype=np.int32)
+            for k, (_, _, data) in enumerate(entries):
+                for hour, count in data.get(f"hour_distribution_{tipe}", {}).items():
+                    counts[k, int(hour)] = count
+            distribution[tipe] = counts
+
+        return cls(
+            [key for _, key, _ in entries],
+            np.array([kind for kind, _, _ in entries], dtype=np.int8),
+            hours, mode_hour, sample_count, distribution,
+            lookup.get("global_default"),
+            {
+                **(metadata or {}),
+                "generated_at": lookup.get("generated_at"),
+                "total_customers": len(lookup.get("customers", {})),
+            }
+        )
+
+    @classmethod
+    def from_arrow(cls, path: Path) -> "DurationIndex":
+        """Dari file hasil compile_lookup; kolom numerik tetap di memory map (tanpa copy)."""
+        import pyarrow as pa
+
+        table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+        meta = json.loads(table.schema.metadata[b"duration_lookup"])
+
+        def column(name: str) -> np.ndarray:
+            return table.column(name).combine_chunks().to_numpy(zero_copy_only=True)
+
+        def distribution_column(name: str) -> np.ndarray:
+            values = table.column(name).combine_chunks().flatten()
+            return values.to_numpy(zero_copy_only=True).reshape(-1, HOURS_PER_DAY)
+
+        return cls(
+            table.column("key").to_pylist(),
+            column("kind"),
+            {tipe: column(f"median_{tipe}_hours") for tipe in DURATION_TIPES},
+            {tipe: column(f"mode_hour_{tipe}") for tipe in DURATION_TIPES},
+            {tipe: column(f"count_hours_{tipe}") for tipe in DURATION_TIPES},
+            {tipe: distribution_column(f"hour_distribution_{tipe}") for tipe in DURATION_TIPES},
+            meta.get("global_default"),
+            {"generated_at": meta.get("generated_at"), "total_customers": meta.get("total_customers")}
+        )
+
+    def locate(self, customer_id: Any, cabang: Any) -> Tuple[int, int]:
+        """Posisi (customer, cabang) untuk satu baris, -1 jika tidak ada."""
+        return self.customer_keys.get(f"{customer_id}__{cabang}", -1), self.cabang_keys.get(cabang, -1)
+
+    def codes(
+        self,
+        customer_ids: Sequence[Any],
+        cabangs: Sequence[Any]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Posisi customer & cabang per baris (-1 jika tidak ada), dihitung sekali per (cust, cabang) unik."""
+        resolved: Dict[Tuple[Any, Any], Tuple[int, int]] = {}
+        customer_codes = np.empty(len(customer_ids), dtype=np.int32)
+        cabang_codes = np.empty(len(customer_ids), dtype=np.int32)
+        for k, pair in enumerate(zip(customer_ids, cabangs)):
+            codes = resolved.get(pair)
+            if codes is None:
+                codes = resolved[pair] = self.locate(*pair)
+            customer_codes[k], cabang_codes[k] = codes
+        return customer_codes, cabang_codes
+
+    def _gather(self, values: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        # Posisi -1 (tidak ada) menunjuk ke NaN tambahan di akhir
+        return np.append(values, np.nan)[codes]
+
+    def hours_for(self, customer_codes: np.ndarray, cabang_codes: np.ndarray, tipe: str) -> np.ndarray:
+        """Median durasi (jam) per baris: gather customer, lalu cabang, lalu global."""
+        customer_hours = self._gather(self.hours[tipe], customer_codes)
+        cabang_hours = self._gather(self.hours[tipe], cabang_codes)
+        return np.where(
+            ~np.isnan(customer_hours), customer_hours,
+            np.where(~np.isnan(cabang_hours), cabang_hours, self.global_hours[tipe])
+        )
+
+    def profiles(self, customer_codes: np.ndarray, cabang_codes: np.ndarray, tipe: str) -> List[Dict[str, Any]]:
+        """Time profile per baris; baris dengan posisi yang sama berbagi satu dict."""
+        resolved: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        result = []
+        for pair in zip(customer_codes.tolist(), cabang_codes.tolist()):
+            profile = resolved.get(pair)
+            if profile is None:
+                profile = resolved[pair] = self.profile(*pair, tipe)
+            result.append(profile)
+        return result
+
+    def profile(self, customer_code: int, cabang_code: int, tipe: str) -> Dict[str, Any]:
+        if customer_code >= 0 and self.mode_hour[tipe][customer_code] >= 0:
+            counts = self.distribution[tipe][customer_code]
+            return {
+                "mode_hour": int(self.mode_hour[tipe][customer_code]),
+                "distribution": {str(hour): int(counts[hour]) for hour in np.flatnonzero(counts)},
+                "sample_count": max(int(self.sample_count[tipe][customer_code]), 0),
+                "source": "customer"
+            }
+
+        if cabang_code >= 0 and self.mode_hour[tipe][cabang_code] >= 0:
+            return {
+                "mode_hour": int(self.mode_hour[tipe][cabang_code]),
+                "distribution": {},
+                "sample_count": 0,
+                "source": "cabang_default"
+            }
+
+        return {"mode_hour": None, "distribution": {}, "sample_count": 0, "source": "none"}
+
+    def duration(self, customer_id: Any, cabang: Any, tipe: str) -> float:
+        customer_code, cabang_code = self.locate(customer_id, cabang)
+        return float(self.hours_for(np.array([customer_code]), np.array([cabang_code]), tipe)[0])
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            **self.metadata,
+            "customers": len(self.customer_keys),
+            "cabang_defaults": len(self.cabang_keys),
+        }
+
+
+def compile_lookup(json_path: Path = DURATION_LOOKUP_JSON_PATH, output: Path = DURATION_LOOKUP_PATH) -> Path:
+    """
+    Compile duration_lookup.json ke Arrow IPC. Ditulis ke file sementara lalu
+    di-rename, jadi worker yang sedang memakai file lama (memory map) tidak terganggu.
+    """
+    import pyarrow as pa
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        lookup = json.load(f)
+    index = DurationIndex.from_lookup(lookup)
+    keys = list(index.customer_keys) + list(index.cabang_keys)
+    kinds = np.array([KIND_CUSTOMER] * len(index.customer_keys) + [KIND_CABANG] * len(index.cabang_keys), dtype=np.int8)
+
+    columns: Dict[str, Any] = {"key": pa.array(keys, pa.string()), "kind": pa.array(kinds)}
+    for tipe in DURATION_TIPES:
+        columns[f"median_{tipe}_hours"] = pa.array(index.hours[tipe])
+        columns[f"mode_hour_{tipe}"] = pa.array(index.mode_hour[tipe])
+        columns[f"count_hours_{tipe}"] = pa.array(index.sample_count[tipe])
+        columns[f"hour_distribution_{tipe}"] = pa.FixedSizeListArray.from_arrays(
+            pa.array(index.distribution[tipe].ravel()), HOURS_PER_DAY
+        )
+    meta = {
+        "global_default": lookup.get("global_default"),
+        "generated_at": lookup.get("generated_at"),
+        "total_customers": len(index.customer_keys),
+    }
+    table = pa.table(columns).replace_schema_metadata({"duration_lookup": json.dumps(meta)})
+
+    output = Path(output)
+    tmp_path = output.with_suffix(f".{os.getpid()}.tmp")
+    with pa.OSFile(str(tmp_path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, output)
+    return output
+
+
+def _file_version(path: Optional[Path]) -> Optional[Tuple[str, int, int]]:
+    if path is None:
+        return None
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return (str(path), stat.st_mtime_ns, stat.st_size)
+
+
+def _lookup_source() -> Optional[Path]:
+    """
+    File Arrow hasil compile jika ada, pyarrow terpasang, dan tidak lebih lama
+    dari JSON-nya (JSON yang baru diganti tanpa compile ulang tetap terpakai).
+    """
+    arrow_version = _file_version(DURATION_LOOKUP_PATH)
+    json_version = _file_version(DURATION_LOOKUP_JSON_PATH)
+    if arrow_version and importlib.util.find_spec("pyarrow"):
+        if json_version is None or arrow_version[1] >= json_version[1]:
+            return DURATION_LOOKUP_PATH
+    return DURATION_LOOKUP_JSON_PATH if json_version else None
+
+
+def load_duration_index(path: Optional[Path]) -> DurationIndex:
+    if path is None:
+        print("Warning: duration_lookup.json not found. Using global defaults.")
+        return DurationIndex.from_lookup({})
+    if path.suffix == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            index = DurationIndex.from_lookup(json.load(f))
+    else:
+        index = DurationIndex.from_arrow(path)
+    index.metadata.update({"source": str(path), "loaded_at": time.time()})
+    print(f"Duration lookup loaded: {len(index.customer_keys)} customers ({path.name})")
+    return index
+
+
+_index: Optional[DurationIndex] = None
+_index_version: Optional[Tuple[str, int, int]] = None
+_last_check = 0.0
+_lock = threading.Lock()
+
+
+def reload_duration_index(force: bool = False) -> DurationIndex:
+    """
+    Muat ulang lookup jika file sumber berubah (atau force). Index baru dipasang
+    dengan satu assignment; pemanggil yang sudah memegang index lama tetap
+    memakainya sampai selesai. Jika file baru gagal dibaca, index lama dipertahankan.
+    """
+    global _index, _index_version, _last_check
+    with _lock:
+        _last_check = time.monotonic()
+        source = _lookup_source()
+        version = _file_version(source)
+        if _index is not None and not force and version == _index_version:
+            return _index
+        try:
+            index = load_duration_index(source)
+        except Exception as e:
+            if _index is None:
+                raise
+            print(f"Warning: duration lookup {source} gagal dimuat, tetap memakai versi lama: {e}")
+            return _index
+        _index, _index_version = index, version
+        return index
+
+
+def get_duration_index() -> DurationIndex:
+    """Index lookup saat ini; file sumber dicek paling sering tiap DURATION_LOOKUP_CHECK_SECONDS."""
+    index = _index
+    if index is None:
+        return reload_duration_index()
+    if DURATION_LOOKUP_CHECK_SECONDS > 0 and time.monotonic() - _last_check >= DURATION_LOOKUP_CHECK_SECONDS:
+        return reload_duration_index()
+    return index
+
+
+def get_customer_duration(
+    customer_id: str,
+    cabang: str,
+    tipe: str = "bongkar"
+) -> float:
+    return get_duration_index().duration(customer_id, cabang, tipe)
+
+
+def get_customer_time_profile(customer_id: str, cabang: str, tipe: str = "bongkar") -> Dict[str, Any]:
+    index = get_duration_index()
+    return index.profile(*index.locate(customer_id, cabang), tipe)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile duration_lookup.json ke format Arrow (memory-mapped).")
+    parser.add_argument("input", nargs="?", default=str(DURATION_LOOKUP_JSON_PATH))
+    parser.add_argument("output", nargs="?", default=str(DURATION_LOOKUP_PATH))
+    args = parser.parse_args()
+    output = compile_lookup(Path(args.input), Path(args.output))
+    print(f"Duration lookup ditulis ke {output} ({output.stat().st_size / 1024:.0f} KB)")
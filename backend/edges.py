@@ -0,0 +1,138 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+POOL_CATEGORIES = ("OPTIMAL", "LATE_SHIFT_POSSIBLE", "IDLE_REDUCE_POSSIBLE")
+POOL_OPTIMAL, POOL_LATE, POOL_IDLE = range(len(POOL_CATEGORIES))
+
+# Bit opsi penyesuaian jadwal; urutan = urutan di kolom 'opsi' hasil
+SHIFT_OPTIONS = ("MUNDUR_MUAT", "MAJU_BONGKAR", "MAJU_MUAT", "MUNDUR_BONGKAR")
+
+EDGE_DTYPE = np.dtype([
+    ('i', np.int64),
+    ('j', np.int64),
+    ('pool', np.int8),
+    ('options', np.uint8),
+    ('score', np.float64),
+    ('saving_km', np.float64),
+    ('cost_triangulasi', np.float64),
+    ('cost_via_port', np.float64),
+    ('dist_triangulasi', np.float64),
+    ('dist_via_port', np.float64),
+    ('dist_direct', np.float64),
+    ('est_travel', np.float64),
+    ('shift', np.float64),
+    ('gap', np.float64),
+    ('selesai_bongkar_ns', np.int64),
+])
+
+
+def option_bits(*flags: np.ndarray) -> np.ndarray:
+    """Gabungkan array boolean per opsi (urutan SHIFT_OPTIONS) jadi satu bitmask."""
+    bits = np.zeros(len(flags[0]), dtype=np.uint8)
+    for bit, flag in enumerate(flags):
+        bits |= flag.astype(np.uint8) << bit
+    return bits
+
+
+class CandidateEdges:
+    """
+    Edge feasible (dest i, origin j) dalam satu structured array EDGE_DTYPE,
+    bukan satu dict per pasangan. Kolom yang hanya bergantung pada baris
+    (id, cust id, koordinat, waktu, durasi) tidak disalin; dict detail dibuat
+    lewat details() untuk pasangan terpilih saja.
+    """
+
+    def __init__(self, records: np.ndarray):
+        self.records = records
+        self._sorted_keys = None
+        self._order = None
+
+    @classmethod
+    def empty(cls) -> "CandidateEdges":
+        return cls(np.empty(0, dtype=EDGE_DTYPE))
+
+    @classmethod
+    def concat(cls, tables: Sequence["CandidateEdges"]) -> "CandidateEdges":
+        if not tables:
+            return cls.empty()
+        return cls(np.concatenate([table.records for table in tables]))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def nbytes(self) -> int:
+        return self.records.nbytes
+
+    @staticmethod
+    def _keys(rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        return (np.asarray(rows, dtype=np.int64) << 32) | np.asarray(cols, dtype=np.int64)
+
+    def find(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """Posisi edge (rows[k], cols[k]) di records, -1 jika tidak ada."""
+        if self._sorted_keys is None:
+            keys = self._keys(self.records['i'], self.records['j'])
+            self._order = np.argsort(keys, kind='stable')
+            self._sorted_keys = keys[self._order]
+        wanted = self._keys(rows, cols)
+        if len(self._sorted_keys) == 0:
+            return np.full(len(wanted), -1, dtype=np.intp)
+        at = np.minimum(np.searchsorted(self._sorted_keys, wanted), len(self._sorted_keys) - 1)
+        return np.where(self._sorted_keys[at] == wanted, self._order[at], -1)
+
+    def details(self, positions: np.ndarray, dest: Dict[str, Any], orig: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Dict detail pasangan (format lama match_details) untuk edge di `positions`."""
+        result = []
+        for edge in self.records[positions].tolist():
+            (i, j, pool, options, score, saving_km, cost_triangulasi, cost_via_port,
+             dist_triangulasi, dist_via_port, dist_direct, est_travel, shift, gap, selesai_bongkar_ns) = edge
+            if pool == POOL_OPTIMAL:
+                opsi, shift_needed = ["PERFECT"], 0
+            else:
+                opsi = [name for bit, name in enumerate(SHIFT_OPTIONS) if options >> bit & 1]
+                shift_needed = shift
+            result.append({
+                'dest_id': dest['id'][i],
+                'orig_id': orig['id'][j],
+                'cabang': dest['cabang'][i],
+                'size_cont': dest['size'][i],
+                'pool': POOL_CATEGORIES[pool],
+                'score': score,
+                'saving_km': saving_km,
+                'saving_cost': cost_via_port - cost_triangulasi,
+                'cost_triangulasi': cost_triangulasi,
+                'cost_via_port': cost_via_port,
+                'dist_triangulasi': dist_triangulasi,
+                'dist_via_port': dist_via_port,
+                'dist_direct': dist_direct,
+                'est_travel': est_travel,
+                'shift': shift_needed,
+                'gap': gap,
+                'opsi': opsi,
+                'waktu_bongkar': pd.Timestamp(int(dest['arrival_ns'][i])),
+                'waktu_muat': pd.Timestamp(int(orig['arrival_ns'][j])),
+                'durasi_bongkar_est': float(dest['durasi'][i]),
+                'durasi_muat_est': float(orig['durasi'][j]),
+                'selesai_bongkar': pd.Timestamp(selesai_bongkar_ns),
+                'dest_cust_id': dest['cust_id'][i],
+                'orig_cust_id': orig['cust_id'][j],
+                'dest_lat': dest['lat'][i],
+                'dest_lon': dest['lon'][i],
+                'orig_lat': orig['lat'][j],
+                'orig_lon': orig['lon'][j]
+            })
+        return result
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Puncak RSS proses (MB), None jika tidak tersedia (Windows)."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
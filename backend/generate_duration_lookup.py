@@ -0,0 +1,580 @@
+"""
+Generate duration_lookup.json dari data historis bongkar/muat.
+
+Raw record disimpan kolumnar (satu file Parquet per file sumber) di
+DURATION_RECORDS_DIR, bersama agregat per (cust_id, cabang) dan per cabang.
+Menambah data bulan baru hanya memproses file baru lalu menggabungkan
+agregatnya; median memakai QuantileSketch yang bisa di-merge, jadi raw
+record lama tidak perlu dibaca ulang.
+
+    python generate_duration_lookup.py --dest dest.xlsx --orig orig.xlsx            # full rebuild
+    python generate_duration_lookup.py --dest dest_mar.xlsx --orig orig_mar.xlsx --update
+    python generate_duration_lookup.py --import-raw duration_raw_records.json       # migrasi data lama
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from date_parsing import parse_datetime_column
+from durations import DURATION_LOOKUP_JSON_PATH, DURATION_LOOKUP_PATH, DURATION_TIPES, HOURS_PER_DAY, compile_lookup
+from ingest import UPLOAD_EXCEL_ENGINE
+
+MIN_DURASI_JAM = 0.5
+DEFAULT_DURASI_JAM = 4.0
+
+DURATION_RECORDS_DIR = Path(os.getenv(
+    "DURATION_RECORDS_DIR",
+    str(Path(__file__).parent / "duration_records")
+))
+# Bin per sketch; di bawah ini median persis sama dengan statistics.median
+DURATION_SKETCH_MAX_BINS = int(os.getenv("DURATION_SKETCH_MAX_BINS", "2048"))
+DURATION_RECORDS_BATCH_ROWS = 65536
+
+STATE_FILENAME = "aggregates.json"
+PARTS_DIRNAME = "records"
+STATE_VERSION = 1
+CENTI_PER_HOUR = 100   # Durasi raw record dibulatkan 2 desimal
+
+
+class QuantileSketch:
+    """
+    Histogram durasi dalam satuan 0.01 jam. Selama jumlah bin <= max_bins,
+    median persis sama dengan statistics.median atas nilai mentahnya. Jika
+    lebih, lebar bin digandakan sampai muat (error median maks. satu lebar bin).
+    Dua sketch digabung dengan menjumlahkan bin pada lebar yang lebih besar.
+    """
+
+    def __init__(self, width: int = 1, bins: Optional[Dict[int, int]] = None, max_bins: int = DURATION_SKETCH_MAX_BINS):
+        self.width = width
+        self.bins: Dict[int, int] = defaultdict(int, bins or {})
+        self.max_bins = max_bins
+
+    @property
+    def count(self) -> int:
+        return sum(self.bins.values())
+
+    def add(self, centi_counts: Dict[int, int]) -> None:
+        for centi, count in centi_counts.items():
+            self.bins[centi // self.width] += count
+        self._compact()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.width > self.width:
+            self._rescale(other.width)
+        factor = self.width // other.width
+        for b, count in other.bins.items():
+            self.bins[b // factor] += count
+        self._compact()
+
+    def _rescale(self, width: int) -> None:
+        factor = width // self.width
+        bins: Dict[int, int] = defaultdict(int)
+        for b, count in self.bins.items():
+            bins[b // factor] += count
+        self.width, self.bins = width, bins
+
+    def _compact(self) -> None:
+        while len(self.bins) > self.max_bins:
+            self._rescale(self.width * 2)
+
+    def _value(self, b: int) -> float:
+        if self.width == 1:
+            return b / CENTI_PER_HOUR
+        return (b * self.width + (self.width - 1) / 2) / CENTI_PER_HOUR
+
+    def median(self) -> Optional[float]:
+        n = self.count
+        if n == 0:
+            return None
+        keys = sorted(self.bins)
+        cumulative = np.cumsum([self.bins[b] for b in keys])
+
+        def value_at(rank: int) -> float:
+            return self._value(keys[int(np.searchsorted(cumulative, rank, side="right"))])
+
+        if n % 2 == 1:
+            return value_at(n // 2)
+        return (value_at(n // 2 - 1) + value_at(n // 2)) / 2
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"width": self.width, "bins": {str(b): c for b, c in sorted(self.bins.items())}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        return cls(data["width"], {int(b): c for b, c in data["bins"].items()})
+
+
+class DurationAggregate:
+    """
+    Agregat satu (key, tipe) yang bisa di-merge: count/sum/min/max durasi
+    (satuan 0.01 jam, eksak), QuantileSketch untuk median, dan count per jam
+    kedatangan beserta urutan kemunculan pertamanya (seri mode dimenangkan
+    jam yang muncul duluan, sama seperti statistics.mode).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total_centi = 0
+        self.min_centi: Optional[int] = None
+        self.max_centi: Optional[int] = None
+        self.sketch = QuantileSketch()
+        self.hour_counts = np.zeros(HOURS_PER_DAY, dtype=np.int64)
+        self.hour_first = np.full(HOURS_PER_DAY, -1, dtype=np.int64)
+
+    def merge(self, other: "DurationAggregate") -> None:
+        if other.count:
+            self.count += other.count
+            self.total_centi += other.total_centi
+            self.min_centi = other.min_centi if self.min_centi is None else min(self.min_centi, other.min_centi)
+            self.max_centi = other.max_centi if self.max_centi is None else max(self.max_centi, other.max_centi)
+            self.sketch.merge(other.sketch)
+        self.hour_counts += other.hour_counts
+        both = (self.hour_first >= 0) & (other.hour_first >= 0)
+        self.hour_first = np.where(both, np.minimum(self.hour_first, other.hour_first),
+                                   np.maximum(self.hour_first, other.hour_first))
+
+    def median_hours(self) -> float:
+        return round(self.sketch.median(), 2)
+
+    def mean_hours(self) -> float:
+        return round(self.total_centi / CENTI_PER_HOUR / self.count, 2)
+
+    def mode_hour(self) -> int:
+        candidates = np.flatnonzero(self.hour_counts == self.hour_counts.max())
+        return int(candidates[np.argmin(self.hour_first[candidates])])
+
+    def hour_distribution(self) -> Dict[str, int]:
+        return {str(hour): int(self.hour_counts[hour]) for hour in np.flatnonzero(self.hour_counts)}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_centi": self.total_centi,
+            "min_centi": self.min_centi,
+            "max_centi": self.max_centi,
+            "sketch": self.sketch.to_dict(),
+            "hour_counts": self.hour_counts.tolist(),
+            "hour_first": self.hour_first.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DurationAggregate":
+        agg = cls()
+        agg.count = data["count"]
+        agg.total_centi = data["total_centi"]
+        agg.min_centi = data["min_centi"]
+        agg.max_centi = data["max_centi"]
+        agg.sketch = QuantileSketch.from_dict(data["sketch"])
+        agg.hour_counts = np.array(data["hour_counts"], dtype=np.int64)
+        agg.hour_first = np.array(data["hour_first"], dtype=np.int64)
+        return agg
+
+
+AggregateMap = Dict[str, Dict[str, DurationAggregate]]   # key -> tipe -> agregat
+
+
+def _aggregate_batch(keys: pd.Series, records: pd.DataFrame) -> AggregateMap:
+    """Agregat satu batch record (kolom seq, tipe, durasi, arrival_hour) per (key, tipe)."""
+    frame = pd.DataFrame({
+        "key": keys.to_numpy(),
+        "tipe": records["tipe"].to_numpy(),
+        "centi": np.rint(records["durasi"].to_numpy(dtype=np.float64) * CENTI_PER_HOUR),
+        "hour": records["arrival_hour"].to_numpy(dtype=np.float64),
+        "seq": records["seq"].to_numpy(),
+    })
+    result: AggregateMap = {}
+    for key, tipe in frame[["key", "tipe"]].drop_duplicates().itertuples(index=False):
+        result.setdefault(key, {})[tipe] = DurationAggregate()
+
+    durations = frame[frame["centi"].notna()].astype({"centi": np.int64})
+    stats = durations.groupby(["key", "tipe"], sort=False)["centi"].agg(["size", "sum", "min", "max"])
+    for (key, tipe), count, total, low, high in stats.itertuples(name=None):
+        agg = result[key][tipe]
+        agg.count, agg.total_centi, agg.min_centi, agg.max_centi = int(count), int(total), int(low), int(high)
+    bins: Dict[Tuple[str, str], Dict[int, int]] = defaultdict(dict)
+    for (key, tipe, centi), count in durations.groupby(["key", "tipe", "centi"], sort=False).size().items():
+        bins[(key, tipe)][int(centi)] = int(count)
+    for (key, tipe), centi_counts in bins.items():
+        result[key][tipe].sketch.add(centi_counts)
+
+    hours = frame[frame["hour"].notna()].astype({"hour": np.int64})
+    hour_stats = hours.groupby(["key", "tipe", "hour"], sort=False)["seq"].agg(["size", "min"])
+    for (key, tipe, hour), count, first in hour_stats.itertuples(name=None):
+        agg = result[key][tipe]
+        agg.hour_counts[hour] = count
+        agg.hour_first[hour] = first
+    return result
+
+
+def _merge_aggregates(target: AggregateMap, batch: AggregateMap) -> None:
+    for key, by_tipe in batch.items():
+        existing = target.setdefault(key, {})
+        for tipe, agg in by_tipe.items():
+            if tipe in existing:
+                existing[tipe].merge(agg)
+            else:
+                existing[tipe] = agg
+
+
+class DurationRecordStore:
+    """
+    Folder raw record + agregat:
+
+    - records/<file sumber>.parquet: raw record (seq, cust_id, cabang, tipe,
+      durasi, arrival_hour), satu file per file sumber
+    - aggregates.json: daftar file yang sudah diproses, total baris, dan agregat
+      per customer ("CUSTID__CABANG") serta per cabang
+
+    Lookup dibangun dari agregat saja; file Parquet hanya dibaca ulang saat
+    file sumber lama diganti (--force) atau rebuild().
+    """
+
+    def __init__(self, root: Path = DURATION_RECORDS_DIR):
+        self.root = Path(root)
+        self.parts_dir = self.root / PARTS_DIRNAME
+        self.state_path = self.root / STATE_FILENAME
+        self.processed_files: Dict[str, Dict[str, Any]] = {}
+        self.next_seq = 0
+        self.total_rows = 0
+        self.customers: AggregateMap = {}
+        self.cabang: AggregateMap = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.state_path.exists():
+            return
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") != STATE_VERSION:
+            raise ValueError(f"{self.state_path}: versi state {state.get('version')} tidak didukung")
+        self.processed_files = state["processed_files"]
+        self.next_seq = state["next_seq"]
+        self.total_rows = state["total_rows"]
+        for target, name in ((self.customers, "customers"), (self.cabang, "cabang")):
+            for key, by_tipe in state[name].items():
+                target[key] = {tipe: DurationAggregate.from_dict(data) for tipe, data in by_tipe.items()}
+
+    def save(self) -> None:
+        state = {
+            "version": STATE_VERSION,
+            "processed_files": self.processed_files,
+            "next_seq": self.next_seq,
+            "total_rows": self.total_rows,
+            "customers": {
+                key: {tipe: agg.to_dict() for tipe, agg in by_tipe.items()}
+                for key, by_tipe in self.customers.items()
+            },
+            "cabang": {
+                key: {tipe: agg.to_dict() for tipe, agg in by_tipe.items()}
+                for key, by_tipe in self.cabang.items()
+            },
+        }
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def reset(self) -> None:
+        """Hapus semua raw record dan agregat (full rebuild)."""
+        shutil.rmtree(self.parts_dir, ignore_errors=True)
+        self.processed_files, self.next_seq, self.total_rows = {}, 0, 0
+        self.customers, self.cabang = {}, {}
+
+    def _add_to_aggregates(self, records: pd.DataFrame) -> None:
+        customer_keys = records["cust_id"].astype(str) + "__" + records["cabang"].astype(str)
+        _merge_aggregates(self.customers, _aggregate_batch(customer_keys, records))
+        _merge_aggregates(self.cabang, _aggregate_batch(records["cabang"].astype(str), records))
+        self.total_rows += len(records)
+
+    def _part_path(self, source_file: str) -> Path:
+        return self.parts_dir / (re.sub(r"[^A-Za-z0-9._-]", "_", source_file) + ".parquet")
+
+    def _write_part(self, path: Path, records: pd.DataFrame) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            ("seq", pa.int64()),
+            ("cust_id", pa.string()),
+            ("cabang", pa.dictionary(pa.int16(), pa.string())),
+            ("tipe", pa.dictionary(pa.int8(), pa.string())),
+            ("durasi", pa.float64()),
+            ("arrival_hour", pa.int8()),
+        ])
+        table = pa.Table.from_pandas(
+            records[schema.names].astype({"arrival_hour": "Int8"}),
+            schema=schema, preserve_index=False
+        )
+        self.parts_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+
+    def append(self, source_file: str, records: pd.DataFrame, force: bool = False) -> bool:
+        """
+        Simpan record dari satu file sumber dan gabungkan ke agregat. File yang
+        sudah pernah diproses dilewati, kecuali force: record lamanya diganti dan
+        agregat dibangun ulang dari Parquet. Kolom seq diisi jika belum ada.
+        """
+        replaced = source_file in self.processed_files
+        if replaced and not force:
+            print(f"  ⚠ {source_file} sudah pernah diproses "
+                  f"({self.processed_files[source_file]['rows']} records). Gunakan --force untuk replace.")
+            return False
+
+        records = records.reset_index(drop=True)
+        if "seq" not in records.columns:
+            records = records.assign(seq=np.arange(self.next_seq, self.next_seq + len(records), dtype=np.int64))
+        path = self._part_path(source_file)
+        self._write_part(path, records)
+        self.processed_files[source_file] = {"part": path.name, "rows": len(records)}
+        if len(records):
+            self.next_seq = max(self.next_seq, int(records["seq"].max()) + 1)
+
+        if replaced:
+            print(f"  --force: Mengganti data lama dari file: {source_file}")
+            self.rebuild()
+        else:
+            self._add_to_aggregates(records)
+        return True
+
+    def iter_batches(self, batch_rows: int = DURATION_RECORDS_BATCH_ROWS) -> Iterator[pd.DataFrame]:
+        """Raw record semua file sumber, per batch (tidak dimuat sekaligus)."""
+        import pyarrow.parquet as pq
+
+        for info in self.processed_files.values():
+            parquet_file = pq.ParquetFile(self.parts_dir / info["part"])
+            for batch in parquet_file.iter_batches(batch_size=batch_rows):
+                yield batch.to_pandas()
+
+    def rebuild(self) -> None:
+        """Bangun ulang agregat dari semua file Parquet."""
+        self.customers, self.cabang, self.total_rows = {}, {}, 0
+        for batch in self.iter_batches():
+            self._add_to_aggregates(batch)
+
+    def build_lookup(self) -> Dict[str, Any]:
+        """Lookup dengan skema duration_lookup.json (customers, cabang_defaults, global_default)."""
+        customers: Dict[str, Any] = {}
+        for key, by_tipe in self.customers.items():
+            cust_id, cabang = key.split("__", 1)
+            entry: Dict[str, Any] = {"cust_id": cust_id, "cabang": cabang}
+            for tipe in DURATION_TIPES:
+                agg = by_tipe.get(tipe)
+                if agg is None:
+                    continue
+                if agg.count:
+                    entry[f"median_{tipe}_hours"] = agg.median_hours()
+                    entry[f"mean_{tipe}_hours"] = agg.mean_hours()
+                    entry[f"count_{tipe}"] = agg.count
+                    entry[f"min_{tipe}_hours"] = round(agg.min_centi / CENTI_PER_HOUR, 2)
+                    entry[f"max_{tipe}_hours"] = round(agg.max_centi / CENTI_PER_HOUR, 2)
+                if agg.hour_counts.any():
+                    entry[f"mode_hour_{tipe}"] = agg.mode_hour()
+                    entry[f"hour_distribution_{tipe}"] = agg.hour_distribution()
+                    entry[f"count_hours_{tipe}"] = int(agg.hour_counts.sum())
+            customers[key] = entry
+
+        cabang_defaults: Dict[str, Any] = {}
+        for cab, by_tipe in self.cabang.items():
+            entry = cabang_defaults[cab] = {}
+            for tipe in DURATION_TIPES:
+                agg = by_tipe.get(tipe)
+                if agg is None:
+                    continue
+                if agg.count:
+                    entry[f"median_{tipe}_hours"] = agg.median_hours()
+                    entry[f"count_{tipe}"] = agg.count
+                if agg.hour_counts.any():
+                    entry[f"mode_hour_{tipe}"] = agg.mode_hour()
+
+        return {
+            "generated_at": datetime.now().isoformat(),
+            "total_rows_processed": self.total_rows,
+            "total_customers": len(customers),
+            "global_default": DEFAULT_DURASI_JAM,
+            "customers": customers,
+            "cabang_defaults": cabang_defaults,
+        }
+
+
+def extract_records(df: pd.DataFrame, tipe: str) -> pd.DataFrame:
+    """
+    Raw record (cust_id, cabang, tipe, durasi, arrival_hour) dari satu file
+    historis. Waktu tempuh pelabuhan <-> customer dari Valhalla, sekali per
+    (cabang, koordinat) unik:
+
+    - arrival_hour = jam (ACT. LOAD DATE + waktu berangkat)
+    - durasi = (ACT. FINISH DATE - ACT. LOAD DATE) - waktu berangkat - waktu pulang,
+      hanya jika >= MIN_DURASI_JAM
+
+    Baris tanpa durasi maupun arrival_hour dibuang.
+    """
+    from logic import geocode_dataframe, get_port_location, normalize_cabang
+    from valhalla import get_valhalla_distance
+
+    columns = ["cust_id", "cabang", "tipe", "durasi", "arrival_hour"]
+    missing = [c for c in ("CUST ID", "CABANG", "ACT. LOAD DATE") if c not in df.columns]
+    if missing:
+        print(f"  ERROR: Kolom tidak ditemukan: {missing}")
+        return pd.DataFrame(columns=columns)
+
+    df = df.copy()
+    df["ACT. LOAD DATE"] = parse_datetime_column(df["ACT. LOAD DATE"])[0]
+    if "ACT. FINISH DATE" in df.columns:
+        df["ACT. FINISH DATE"] = parse_datetime_column(df["ACT. FINISH DATE"])[0]
+    else:
+        df["ACT. FINISH DATE"] = pd.NaT
+
+    if "ALAMAT_LAT" not in df.columns or df["ALAMAT_LAT"].isna().any():
+        if "ALAMAT" not in df.columns:
+            print("  WARNING: Kolom ALAMAT tidak ditemukan, tidak bisa geocode.")
+            return pd.DataFrame(columns=columns)
+        df = geocode_dataframe(df)
+
+    df["CABANG_NORM"] = df["CABANG"].map(normalize_cabang)
+    df = df.dropna(subset=["CUST ID", "CABANG_NORM", "ACT. LOAD DATE", "ALAMAT_LAT", "ALAMAT_LONG"]).reset_index(drop=True)
+    print(f"  Data valid: {len(df)} rows")
+
+    legs = df[["CABANG_NORM", "ALAMAT_LAT", "ALAMAT_LONG"]].astype({"ALAMAT_LAT": float, "ALAMAT_LONG": float})
+    travel: Dict[Tuple[str, float, float], Tuple[Optional[float], Optional[float]]] = {}
+    unique_legs = list(dict.fromkeys(legs.itertuples(index=False, name=None)))
+    for idx, (cabang, lat, lon) in enumerate(unique_legs):
+        port = get_port_location(cabang)
+        _, travel_to = get_valhalla_distance(port["lat"], port["lon"], lat, lon)
+        _, travel_back = get_valhalla_distance(lat, lon, port["lat"], port["lon"]) if travel_to is not None else (None, None)
+        travel[(cabang, lat, lon)] = (travel_to, travel_back)
+        if (idx + 1) % 50 == 0 or idx == len(unique_legs) - 1:
+            print(f"  [{idx + 1}/{len(unique_legs)}] Rute dihitung ({tipe})")
+
+    leg_times = [travel[leg] for leg in legs.itertuples(index=False, name=None)]
+    travel_to = pd.Series([t for t, _ in leg_times], dtype="float64")
+    travel_back = pd.Series([b for _, b in leg_times], dtype="float64")
+
+    arrival = df["ACT. LOAD DATE"] + pd.to_timedelta(travel_to, unit="h")
+    total_hours = (df["ACT. FINISH DATE"] - df["ACT. LOAD DATE"]).dt.total_seconds() / 3600.0
+    durasi = (total_hours - travel_to - travel_back).where(total_hours > 0)
+    durasi = durasi.where(durasi >= MIN_DURASI_JAM).round(2)
+
+    records = pd.DataFrame({
+        "cust_id": df["CUST ID"].astype(str).str.strip(),
+        "cabang": df["CABANG_NORM"],
+        "tipe": tipe,
+        "durasi": durasi,
+        "arrival_hour": arrival.dt.hour.astype("Int8"),
+    })
+    records = records[records["durasi"].notna() | records["arrival_hour"].notna()].reset_index(drop=True)
+    print(f"  Durasi valid: {int(records['durasi'].notna().sum())}/{len(df)} rows")
+    print(f"  Arrival hour valid: {int(records['arrival_hour'].notna().sum())}/{len(df)} rows")
+    return records
+
+
+def import_raw_records(store: DurationRecordStore, raw_path: Path, force: bool = False) -> None:
+    """Migrasi duration_raw_records.json (format lama) ke store; urutan record dipertahankan."""
+    with open(raw_path, "r", encoding="utf-8") as f:
+        records = pd.DataFrame(json.load(f).get("records", []))
+    if records.empty:
+        print(f"  {raw_path}: tidak ada record")
+        return
+    records["seq"] = np.arange(store.next_seq, store.next_seq + len(records), dtype=np.int64)
+    for source_file, part in records.groupby("source_file", sort=False):
+        if store.append(source_file, part.drop(columns="source_file"), force=force):
+            print(f"  Imported {source_file}: {len(part)} records")
+
+
+def print_summary(lookup: Dict[str, Any]) -> None:
+    print(f"  Total records: {lookup['total_rows_processed']}")
+    print(f"  Customers: {lookup['total_customers']}")
+    print(f"  Cabang defaults: {len(lookup['cabang_defaults'])}")
+    for tipe in DURATION_TIPES:
+        with_median = sum(f"median_{tipe}_hours" in entry for entry in lookup["customers"].values())
+        with_mode = sum(f"mode_hour_{tipe}" in entry for entry in lookup["customers"].values())
+        print(f"  {tipe}: {with_median} customer dengan durasi, {with_mode} dengan jam kedatangan")
+
+
+def write_lookup(lookup: Dict[str, Any], output_path: Path) -> None:
+    tmp_path = output_path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(lookup, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, output_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate duration lookup table dari data historis bongkar/muat.")
+    parser.add_argument("--dest", help="Path ke file Excel data destinasi (bongkar)")
+    parser.add_argument("--orig", help="Path ke file Excel data origin (muat)")
+    parser.add_argument("--output", default=str(DURATION_LOOKUP_JSON_PATH),
+                        help="Path output JSON (default: duration_lookup.json di folder backend)")
+    parser.add_argument("--records-dir", default=str(DURATION_RECORDS_DIR),
+                        help="Folder raw record (Parquet) dan agregat")
+    parser.add_argument("--update", action="store_true",
+                        help="Tambahkan file baru ke data existing (incremental update)")
+    parser.add_argument("--force", action="store_true",
+                        help="Force re-process file yang sudah pernah diproses (ganti data lama dari file tersebut)")
+    parser.add_argument("--import-raw", help="Import duration_raw_records.json (format lama) ke folder raw record")
+    parser.add_argument("--rebuild", action="store_true", help="Bangun ulang agregat dari file Parquet")
+    parser.add_argument("--compile", action="store_true",
+                        help=f"Compile hasilnya ke Arrow ({DURATION_LOOKUP_PATH.name}) untuk worker")
+    args = parser.parse_args()
+
+    store = DurationRecordStore(Path(args.records_dir))
+    if args.update or args.import_raw:
+        print(f"\n[1/4] Mode: INCREMENTAL UPDATE ({len(store.processed_files)} file, {store.total_rows} records existing)")
+    else:
+        print("\n[1/4] Mode: FULL REBUILD")
+        store.reset()
+
+    if args.import_raw:
+        import_raw_records(store, Path(args.import_raw), force=args.force)
+
+    print("\n[2/4] Membaca & menghitung durasi...")
+    for path, tipe in ((args.dest, "bongkar"), (args.orig, "muat")):
+        if not path:
+            continue
+        source_file = Path(path).name
+        if source_file in store.processed_files and not args.force:
+            print(f"  ⚠ {source_file} sudah pernah diproses. Gunakan --force untuk replace.")
+            continue
+        try:
+            df = pd.read_excel(path, engine=UPLOAD_EXCEL_ENGINE)
+        except Exception as e:
+            print(f"  ERROR membaca file {path}: {e}")
+            sys.exit(1)
+        print(f"  {source_file} ({tipe}): {len(df)} rows, kolom: {list(df.columns)}")
+        store.append(source_file, extract_records(df, tipe), force=args.force)
+
+    if args.rebuild:
+        print("  Rebuild agregat dari raw record...")
+        store.rebuild()
+
+    if store.total_rows == 0:
+        print("\nERROR: Tidak ada record valid. Periksa data dan Valhalla server.")
+        sys.exit(1)
+
+    print("\n[3/4] Membangun lookup table...")
+    lookup = store.build_lookup()
+    print_summary(lookup)
+
+    print("\n[4/4] Menyimpan...")
+    store.save()
+    output_path = Path(args.output)
+    write_lookup(lookup, output_path)
+    print(f"  Saved lookup to: {output_path}")
+    if args.compile:
+        compiled = compile_lookup(output_path, DURATION_LOOKUP_PATH)
+        print(f"  Compiled lookup to: {compiled}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import asyncio
+import functools
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, TypeVar
+
+import requests
+from requests.adapters import HTTPAdapter
+
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))   # Jumlah host yang di-pool
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))           # Koneksi keep-alive per host
+HTTP_MAX_CONCURRENCY = int(os.getenv("HTTP_MAX_CONCURRENCY", "16"))     # Maks request paralel (bulk)
+# Thread terpisah untuk request interaktif (proxy route/geocode), tidak antri di belakang prefetch
+HTTP_INTERACTIVE_CONCURRENCY = int(os.getenv("HTTP_INTERACTIVE_CONCURRENCY", "8"))
+# State rate limiter bersama antar proses (worker uvicorn, process pool); kosong = per proses
+RATE_LIMIT_PATH = os.getenv(
+    "RATE_LIMIT_PATH",
+    str(Path(__file__).parent / "cache" / "rate_limit.sqlite3")
+)
+
+EXECUTOR_BULK = "bulk"
+EXECUTOR_INTERACTIVE = "interactive"
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executors_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Session keep-alive bersama untuk Valhalla & Nominatim (satu per proses)."""
+    global _session, _session_pid
+    with _lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_CONNECTIONS,
+                pool_maxsize=HTTP_POOL_MAXSIZE
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+            _session_pid = os.getpid()
+        return _session
+
+
+class TokenBucket:
+    """
+    Rate limiter token bucket: rate token per detik, maks burst token
+    tertabung. acquire() menunggu sampai ada token. rate <= 0 berarti tanpa batas.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    TokenBucket yang state-nya (token, waktu update) disimpan di SQLite, jadi
+    satu batas berlaku untuk semua proses yang membuka file yang sama. Setiap
+    acquire() mengambil token dalam transaksi BEGIN IMMEDIATE. Jika file tidak
+    bisa dipakai, jatuh ke bucket per proses.
+    """
+
+    def __init__(self, path: str, endpoint: str, rate: float, burst: int = 1):
+        super().__init__(rate, burst)
+        self.path = Path(path)
+        self.endpoint = endpoint
+        self._shared = True
+
+    def _take(self) -> float:
+        """Ambil satu token; return detik yang harus ditunggu (0 = dapat token)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "endpoint TEXT PRIMARY KEY, "
+                "tokens REAL NOT NULL, "
+                "updated_at REAL NOT NULL)"
+            )
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT tokens, updated_at FROM rate_limits WHERE endpoint = ?",
+                    (self.endpoint,)
+                ).fetchone()
+                # Wall clock (bukan monotonic) supaya bisa dibandingkan antar proses
+                now = time.time()
+                tokens, updated = row if row is not None else (float(self.burst), now)
+                tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+                wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+                if wait == 0.0:
+                    tokens -= 1
+                conn.execute(
+                    "INSERT OR REPLACE INTO rate_limits (endpoint, tokens, updated_at) VALUES (?, ?, ?)",
+                    (self.endpoint, tokens, now)
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return wait
+        finally:
+            conn.close()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while self._shared:
+            try:
+                wait = self._take()
+            except (sqlite3.Error, OSError) as e:
+                print(f"Warning: rate limiter bersama '{self.path}' tidak bisa dipakai, pakai per proses: {e}")
+                self._shared = False
+                break
+            if wait <= 0:
+                return
+            time.sleep(wait)
+        super().acquire()
+
+
+_rate_limiters: Dict[str, TokenBucket] = {}
+
+
+def get_rate_limiter(endpoint: str, rate: float, burst: int = 1) -> TokenBucket:
+    """
+    Satu rate limiter per endpoint, dipakai bersama semua thread. Dengan
+    RATE_LIMIT_PATH batasnya juga berlaku gabungan untuk semua proses; tanpa
+    itu setiap proses punya bucket sendiri (rate efektif = rate x jumlah proses).
+    """
+    with _lock:
+        limiter = _rate_limiters.get(endpoint)
+        if limiter is None:
+            if RATE_LIMIT_PATH:
+                limiter = SharedTokenBucket(RATE_LIMIT_PATH, endpoint, rate, burst)
+            else:
+                limiter = TokenBucket(rate, burst)
+            _rate_limiters[endpoint] = limiter
+        return limiter
+
+
+def _get_executor(kind: str) -> ThreadPoolExecutor:
+    """
+    Executor per jenis pekerjaan: EXECUTOR_BULK untuk prefetch/geometry/matrix
+    (map_concurrent), EXECUTOR_INTERACTIVE untuk request dari endpoint (run_async).
+    Ribuan task bulk yang antri tidak menahan request interaktif.
+    """
+    global _executors_pid
+    with _lock:
+        if _executors_pid != os.getpid():
+            _executors.clear()
+            _executors_pid = os.getpid()
+        executor = _executors.get(kind)
+        if executor is None:
+            workers = HTTP_MAX_CONCURRENCY if kind == EXECUTOR_BULK else HTTP_INTERACTIVE_CONCURRENCY
+            executor = _executors[kind] = ThreadPoolExecutor(
+                max_workers=max(1, workers),
+                thread_name_prefix=f"http-{kind}"
+            )
+        return executor
+
+
+def map_concurrent(func: Callable[[T], R], items: Iterable[T]) -> List[R]:
+    """Jalankan func untuk setiap item secara paralel (maks HTTP_MAX_CONCURRENCY, executor bulk)."""
+    items = list(items)
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    return list(_get_executor(EXECUTOR_BULK).map(func, items))
+
+
+async def run_async(func: Callable[..., R], *args: Any) -> R:
+    """Jalankan call HTTP blocking tanpa memblokir event loop (executor interaktif)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(EXECUTOR_INTERACTIVE), func, *args)
+
+
+async def post_async(
+    url: str,
+    json: Dict[str, Any],
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = 15,
+    verify: bool = True
+) -> requests.Response:
+    post = functools.partial(
+        get_session().post, url, json=json, headers=headers, timeout=timeout, verify=verify
+    )
+    return await run_async(post)
@@ -0,0 +1,142 @@
+import importlib.util
+import io
+import os
+from collections import defaultdict
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Any, List, Optional
+
+import pandas as pd
+
+from validate import REQUIRED_COLUMNS, _normalize_column_name
+
+UPLOAD_FORMAT_EXCEL = "excel"
+UPLOAD_FORMAT_CSV = "csv"
+UPLOAD_FORMAT_PARQUET = "parquet"
+UPLOAD_FORMAT_ARROW = "arrow"
+
+UPLOAD_EXTENSIONS = {
+    '.xlsx': UPLOAD_FORMAT_EXCEL,
+    '.xls': UPLOAD_FORMAT_EXCEL,
+    '.csv': UPLOAD_FORMAT_CSV,
+    '.parquet': UPLOAD_FORMAT_PARQUET,
+    '.pq': UPLOAD_FORMAT_PARQUET,
+    '.arrow': UPLOAD_FORMAT_ARROW,
+    '.feather': UPLOAD_FORMAT_ARROW,
+    '.ipc': UPLOAD_FORMAT_ARROW,
+}
+
+# python-calamine (Rust) jauh lebih cepat dari openpyxl; openpyxl jika tidak terpasang
+UPLOAD_EXCEL_ENGINE = os.getenv(
+    "UPLOAD_EXCEL_ENGINE",
+    "calamine" if importlib.util.find_spec("python_calamine") else "openpyxl"
+)
+
+COORDINATE_COLUMNS = ['ALAMAT_LAT', 'ALAMAT_LONG']
+UPLOAD_COLUMNS = REQUIRED_COLUMNS + COORDINATE_COLUMNS
+COLUMN_SUGGESTION_CUTOFF = 0.6   # Sama dengan _find_column_suggestion di validate
+
+# Kolom teks dibaca apa adanya sebagai string (tanpa inferensi tipe per sel);
+# tanggal dibiarkan ke pd.to_datetime / parser validasi.
+UPLOAD_DTYPES = defaultdict(
+    lambda: str,
+    {'ACT. LOAD DATE': object, **{col: 'float64' for col in COORDINATE_COLUMNS}}
+)
+
+
+def _keep_column(name: Any) -> bool:
+    """
+    Kolom yang dipakai pipeline (setelah alias dinormalisasi), plus kolom yang
+    namanya mirip kolom wajib supaya validasi tetap bisa memberi saran.
+    """
+    raw = str(name)
+    if _normalize_column_name(raw) in UPLOAD_COLUMNS:
+        return True
+    return any(
+        SequenceMatcher(None, raw, required).ratio() >= COLUMN_SUGGESTION_CUTOFF
+        for required in REQUIRED_COLUMNS
+    )
+
+
+def detect_upload_format(filename: Optional[str], content: bytes) -> str:
+    """Format dari ekstensi file; jika tidak dikenal, dari magic bytes."""
+    suffix = Path(filename or "").suffix.lower()
+    if suffix in UPLOAD_EXTENSIONS:
+        return UPLOAD_EXTENSIONS[suffix]
+    if content[:4] == b"PAR1":
+        return UPLOAD_FORMAT_PARQUET
+    if content[:6] == b"ARROW1" or content[:4] == b"\xff\xff\xff\xff":
+        return UPLOAD_FORMAT_ARROW
+    if content[:2] == b"PK" or content[:4] == b"\xd0\xcf\x11\xe0":
+        return UPLOAD_FORMAT_EXCEL
+    return UPLOAD_FORMAT_CSV
+
+
+def _read_excel(content: bytes) -> pd.DataFrame:
+    return pd.read_excel(
+        io.BytesIO(content),
+        usecols=_keep_column,
+        dtype=UPLOAD_DTYPES,
+        engine=UPLOAD_EXCEL_ENGINE
+    )
+
+
+def _read_csv(content: bytes) -> pd.DataFrame:
+    header = content.split(b"\n", 1)[0]
+    sep = ";" if header.count(b";") > header.count(b",") else ","
+    return pd.read_csv(
+        io.BytesIO(content),
+        sep=sep,
+        usecols=_keep_column,
+        dtype=UPLOAD_DTYPES,
+        encoding="utf-8-sig"
+    )
+
+
+def _arrow_table_to_frame(table: Any) -> pd.DataFrame:
+    columns: List[str] = [name for name in table.column_names if _keep_column(name)]
+    df = table.select(columns).to_pandas()
+    for col in COORDINATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def _read_parquet(content: bytes) -> pd.DataFrame:
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(io.BytesIO(content))
+    columns = [name for name in parquet_file.schema_arrow.names if _keep_column(name)]
+    return _arrow_table_to_frame(parquet_file.read(columns=columns))
+
+
+def _read_arrow(content: bytes) -> pd.DataFrame:
+    import pyarrow as pa
+
+    try:
+        table = pa.ipc.open_file(pa.BufferReader(content)).read_all()
+    except pa.ArrowInvalid:
+        table = pa.ipc.open_stream(pa.BufferReader(content)).read_all()
+    return _arrow_table_to_frame(table)
+
+
+UPLOAD_READERS = {
+    UPLOAD_FORMAT_EXCEL: _read_excel,
+    UPLOAD_FORMAT_CSV: _read_csv,
+    UPLOAD_FORMAT_PARQUET: _read_parquet,
+    UPLOAD_FORMAT_ARROW: _read_arrow,
+}
+
+
+def read_upload(content: bytes, filename: Optional[str] = None) -> pd.DataFrame:
+    """
+    Baca file upload (Excel, CSV, Parquet, Arrow IPC) sebagai DataFrame, hanya
+    dengan kolom yang dibutuhkan pipeline. File yang tidak bisa dibaca -> ValueError.
+    """
+    upload_format = detect_upload_format(filename, content)
+    try:
+        return UPLOAD_READERS[upload_format](content)
+    except ImportError:
+        raise ValueError(f"Upload {upload_format} membutuhkan paket pyarrow")
+    except Exception as e:
+        raise ValueError(f"File '{filename}' tidak bisa dibaca sebagai {upload_format}: {e}")
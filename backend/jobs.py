@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from cache_store import PersistentCache
+from workers import WorkerPoolFull, submit
+
+JOB_STATUS_QUEUED = "queued"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_DONE = "done"
+JOB_STATUS_FAILED = "failed"
+JOB_FINAL_STATUSES = (JOB_STATUS_DONE, JOB_STATUS_FAILED)
+
+JOB_STORE_PATH = os.getenv(
+    "JOB_STORE_PATH",
+    str(Path(__file__).parent / "cache" / "jobs.sqlite3")
+)
+JOB_TTL_HOURS = float(os.getenv("JOB_TTL_HOURS", "24"))   # Umur status & hasil job
+JOB_PROGRESS_INTERVAL = 0.5   # Progress ditulis paling sering tiap 0.5 detik
+JOB_POLL_INTERVAL = 0.5       # Interval cek perubahan status untuk stream
+
+# Disimpan di SQLite supaya job bisa dipantau dari worker uvicorn mana pun
+job_store = PersistentCache(
+    JOB_STORE_PATH,
+    table="jobs",
+    max_entries=10_000,
+    ttl_seconds=JOB_TTL_HOURS * 3600
+)
+
+
+def _result_key(job_id: str) -> str:
+    return f"{job_id}:result"
+
+
+def create_job() -> Dict[str, Any]:
+    now = time.time()
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "status": JOB_STATUS_QUEUED,
+        "stage": None,
+        "progress": {},
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+        "seq": 0,
+    }
+    job_store.set(job["job_id"], job)
+    return job
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    return job_store.get(job_id)
+
+
+def get_job_result(job_id: str) -> Optional[Any]:
+    return job_store.get(_result_key(job_id))
+
+
+def update_job(job_id: str, **fields: Any) -> Dict[str, Any]:
+    # Hanya runner job ini yang menulis, jadi read-modify-write aman
+    job = job_store.get(job_id) or {"job_id": job_id, "progress": {}, "seq": 0}
+    job.update(fields)
+    job["updated_at"] = time.time()
+    job["seq"] = job.get("seq", 0) + 1
+    job_store.set(job_id, job)
+    return job
+
+
+class JobProgress:
+    """
+    Callback progress(stage, done, total) untuk process_optimization.
+    Penulisan ke job_store dibatasi JOB_PROGRESS_INTERVAL, kecuali saat stage
+    berganti atau stage selesai.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.progress: Dict[str, Dict[str, int]] = {}
+        self._stage: Optional[str] = None
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, stage: str, done: int, total: int) -> None:
+        with self._lock:
+            self.progress[stage] = {"done": done, "total": total}
+            now = time.time()
+            if stage == self._stage and done < total and now - self._last_write < JOB_PROGRESS_INTERVAL:
+                return
+            self._stage = stage
+            self._last_write = now
+            update_job(self.job_id, stage=stage, progress=dict(self.progress))
+
+
+def run_job(job_id: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+    """Jalankan func(*args, progress=..., **kwargs) dan simpan hasil/error ke job_store."""
+    update_job(job_id, status=JOB_STATUS_RUNNING)
+    progress = JobProgress(job_id)
+    try:
+        result = func(*args, progress=progress, **kwargs)
+        job_store.set(_result_key(job_id), result)
+        update_job(job_id, status=JOB_STATUS_DONE, stage=None, progress=progress.progress)
+    except Exception as e:
+        traceback.print_exc()
+        update_job(job_id, status=JOB_STATUS_FAILED, error=str(e), progress=progress.progress)
+
+
+def start_job(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Dict[str, Any]:
+    """Buat job dan antrikan di worker pool. WorkerPoolFull diteruskan ke pemanggil."""
+    job = create_job()
+    try:
+        submit(run_job, job["job_id"], func, *args, **kwargs)
+    except WorkerPoolFull:
+        job_store.delete(job["job_id"])
+        raise
+    return job
+
+
+async def stream_job_events(job_id: str) -> AsyncIterator[str]:
+    """NDJSON: satu baris status job setiap ada perubahan, berhenti saat job selesai/gagal."""
+    last_seq = -1
+    while True:
+        job = get_job(job_id)
+        if job is None:
+            return
+        if job.get("seq", 0) != last_seq:
+            last_seq = job.get("seq", 0)
+            yield json.dumps(job) + "\n"
+        if job["status"] in JOB_FINAL_STATUSES:
+            return
+        await asyncio.sleep(JOB_POLL_INTERVAL)
@@ -1,19 +1,40 @@
-import json
+import hashlib
 import os
+import re
 import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Callable, Dict, List, Optional, Set, Tuple, Any
 
 import numpy as np
 import pandas as pd
 import requests
-import urllib3
-from scipy.optimize import linear_sum_assignment
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-VALHALLA_URL = os.getenv("VALHALLA_URL", "http://localhost:8002/route")
+from assignment import AssignmentBlock, solve_assignment
+from cache_store import PersistentCache
+from date_parsing import parse_datetime_column
+from durations import DurationIndex, get_duration_index
+from edges import (
+    EDGE_DTYPE, POOL_IDLE, POOL_LATE, POOL_OPTIMAL,
+    CandidateEdges, option_bits, peak_rss_mb
+)
+from http_client import get_rate_limiter, get_session
+from distance_providers import (
+    HAVERSINE_LOWER_BOUND_FACTOR,
+    DistanceProvider,
+    get_distance_provider,
+    haversine_km,
+)
+from sessions import (
+    SESSION_KIND_VALIDATION,
+    load_session,
+    new_session_id,
+    save_session,
+    validate_session_id,
+)
+from valhalla import ROUTING_MODE, fetch_route_geometries
 
 GEOCODE_TIMEOUT = 10        
 GEOCODE_MAX_RETRIES = 3
@@ -30,6 +51,17 @@ MAX_MUNDURKAN_MUAT = 8      # Max waktu jadwal muat mundur
 MAX_MAJUKAN_BONGKAR = 24    # Max waktu jadwal bongkar maju
 MAX_MAJUKAN_MUAT = 12       # Max waktu jadwal muat maju
 
+HAVERSINE_TOLERANCE_KM = float(os.getenv("HAVERSINE_TOLERANCE_KM", "1.0"))  # Toleransi snapping titik ke jalan
+PRUNE_EPSILON = 1e-3
+NS_PER_HOUR = 3_600_000_000_000
+US_PER_HOUR = 3_600_000_000
+
+MATCH_COST_OFFSET = 10_000_000   # cost = offset - score (Hungarian meminimalkan)
+
+GRADE_WILDCARDS = ['-', 'nan', 'None', '']   # Grade kosong cocok dengan grade apa pun
+
+ProgressCallback = Callable[[str, int, int], None]   # (stage, selesai, total)
+
 WEIGHT_SAVING = 1000        
 PENALTY_PER_HOUR = 500      
 
@@ -270,81 +302,84 @@ DEFAULT_COST_MODEL: Dict[int, Dict[str, int]] = {
     40: {'base': 1800000, 'per_km': 40000},
 }
 
-route_cache: Dict[str, Tuple[float, float, str]] = {}
-geocode_cache: Dict[str, Tuple[Optional[float], Optional[float]]] = {}
-
-DEFAULT_DURASI_BONGKAR_JAM = 5.0
-DEFAULT_DURASI_MUAT_JAM = 5.0
-
-DURATION_LOOKUP_PATH = Path(__file__).parent / "duration_lookup.json"
-DURATION_LOOKUP: Dict[str, Any] = {}
-
-if DURATION_LOOKUP_PATH.exists():
-    with open(DURATION_LOOKUP_PATH, "r", encoding="utf-8") as _f:
-        DURATION_LOOKUP = json.load(_f)
-    print(f"Duration lookup loaded: {len(DURATION_LOOKUP.get('customers', {}))} customers")
-else:
-    print("Warning: duration_lookup.json not found. Using global defaults.")
+COST_SIZE_CLASSES = (20, 40)
 
+def _compile_cost_model() -> Tuple[Dict[str, int], np.ndarray, np.ndarray]:
+    """
+    TRUCKING_COST_MODEL sebagai array padat (cabang, size class) untuk base
+    dan per_km. Baris terakhir = DEFAULT_COST_MODEL (cabang tanpa model);
+    size yang tidak ada di model cabang memakai default size tersebut.
+    """
+    cabang_index = {cabang: k for k, cabang in enumerate(TRUCKING_COST_MODEL)}
+    models = list(TRUCKING_COST_MODEL.values()) + [DEFAULT_COST_MODEL]
+    base = np.empty((len(models), len(COST_SIZE_CLASSES)), dtype=np.float64)
+    per_km = np.empty_like(base)
+    for k, model in enumerate(models):
+        for s, size in enumerate(COST_SIZE_CLASSES):
+            entry = model.get(size, DEFAULT_COST_MODEL[size])
+            base[k, s] = entry['base']
+            per_km[k, s] = entry['per_km']
+    return cabang_index, base, per_km
 
-def get_customer_duration(
-    customer_id: str,
-    cabang: str,
-    tipe: str = "bongkar"
-) -> float:
-    key = f"median_{tipe}_hours"
-
-    composite = f"{customer_id}__{cabang}"
-    cust_data = DURATION_LOOKUP.get("customers", {}).get(composite)
-    if cust_data and key in cust_data:
-        return cust_data[key]
-    cabang_data = DURATION_LOOKUP.get("cabang_defaults", {}).get(cabang)
-    if cabang_data and key in cabang_data:
-        return cabang_data[key]
-
-    if tipe == "bongkar":
-        return DURATION_LOOKUP.get("global_default", DEFAULT_DURASI_BONGKAR_JAM)
-    else:
-        return DURATION_LOOKUP.get("global_default", DEFAULT_DURASI_MUAT_JAM)
-
-
-def get_customer_time_profile(customer_id: str, cabang: str, tipe: str = "bongkar") -> Dict[str, Any]:
-    composite = f"{customer_id}__{cabang}"
-    cust_data = DURATION_LOOKUP.get("customers", {}).get(composite, {})
+COST_CABANG_INDEX, COST_BASE, COST_PER_KM = _compile_cost_model()
+COST_DEFAULT_ROW = len(COST_CABANG_INDEX)
 
-    mode_key = f"mode_hour_{tipe}"
-    dist_key = f"hour_distribution_{tipe}"
-    count_key = f"count_hours_{tipe}"
+INCLUDE_ROUTE_GEOMETRY = os.getenv("INCLUDE_ROUTE_GEOMETRY", "1") != "0"  # 0 = geometry diambil frontend
 
-    if mode_key in cust_data:
-        return {
-            "mode_hour": cust_data[mode_key],
-            "distribution": cust_data.get(dist_key, {}),
-            "sample_count": cust_data.get(count_key, 0),
-            "source": "customer"
-        }
+GEOCODE_CACHE_PATH = os.getenv(
+    "GEOCODE_CACHE_PATH",
+    str(Path(__file__).parent / "cache" / "geocode_cache.sqlite3")
+)
+GEOCODE_CACHE_MAX_ENTRIES = int(os.getenv("GEOCODE_CACHE_MAX_ENTRIES", "200000"))
+GEOCODE_CACHE_TTL_DAYS = float(os.getenv("GEOCODE_CACHE_TTL_DAYS", "365"))
+GEOCODE_NEGATIVE_TTL_HOURS = float(os.getenv("GEOCODE_NEGATIVE_TTL_HOURS", "24"))  # Umur cache alamat tidak ditemukan
 
-    cabang_data = DURATION_LOOKUP.get("cabang_defaults", {}).get(cabang, {})
-    if mode_key in cabang_data:
-        return {
-            "mode_hour": cabang_data[mode_key],
-            "distribution": {},
-            "sample_count": 0,
-            "source": "cabang_default"
-        }
+geocode_cache = PersistentCache(
+    GEOCODE_CACHE_PATH,
+    table="geocodes",
+    max_entries=GEOCODE_CACHE_MAX_ENTRIES,
+    ttl_seconds=GEOCODE_CACHE_TTL_DAYS * 86400
+)
 
-    return {"mode_hour": None, "distribution": {}, "sample_count": 0, "source": "none"}
+NOMINATIM_URL = os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org/search")
+NOMINATIM_USER_AGENT = "roundtrip_mapping_optimization_v2"
+# Nominatim publik maks 1 request/detik; instance lokal default tanpa batas (0)
+NOMINATIM_RATE_PER_SECOND = float(os.getenv(
+    "NOMINATIM_RATE_PER_SECOND",
+    "1" if "nominatim.openstreetmap.org" in NOMINATIM_URL else "0"
+))
+NOMINATIM_BURST = int(os.getenv("NOMINATIM_BURST", "1"))
+GEOCODE_CONCURRENCY = int(os.getenv("GEOCODE_CONCURRENCY", "4"))   # Worker geocoding paralel
 
+def normalize_address(address: Any) -> str:
+    """
+    Key cache geocode: akhiran negara ", Indonesia" dibuang, lalu case-folded
+    dan tanda baca & spasi diringkas. "Indonesia" yang bagian dari nama
+    (mis. "Jl. Bank Indonesia") tetap dipertahankan.
+    """
+    text = re.sub(r",\s*indonesia\s*$", "", str(address).casefold())
+    return re.sub(r"[\W_]+", " ", text).strip()
 
-NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
-NOMINATIM_USER_AGENT = "roundtrip_mapping_optimization_v2"
+def _cache_geocode_result(
+    cache_key: str,
+    result: Tuple[Optional[float], Optional[float]]
+) -> None:
+    if result == (None, None):
+        # TTL <= 0 berarti set() tanpa kedaluwarsa; untuk kegagalan artinya: jangan di-cache
+        if GEOCODE_NEGATIVE_TTL_HOURS > 0:
+            geocode_cache.set(cache_key, result, ttl_seconds=GEOCODE_NEGATIVE_TTL_HOURS * 3600)
+    else:
+        geocode_cache.set(cache_key, result)
 
 def geocode_helper(
     address: str,
-    max_retries: int = GEOCODE_MAX_RETRIES
+    max_retries: int = GEOCODE_MAX_RETRIES,
+    retry_failed: bool = False
 ) -> Tuple[Optional[float], Optional[float]]:
-    if address in geocode_cache:
-        return geocode_cache[address]
+    cache_key = normalize_address(address)
+    cached = geocode_cache.get(cache_key)
+    if cached is not None and not (retry_failed and cached == [None, None]):
+        return tuple(cached)
     
     for attempt in range(max_retries):
         try:
@@ -352,7 +387,8 @@ def geocode_helper(
             if "indonesia" not in query.lower():
                 query += ", Indonesia"
             
-            response = requests.get(
+            get_rate_limiter(NOMINATIM_URL, NOMINATIM_RATE_PER_SECOND, NOMINATIM_BURST).acquire()
+            response = get_session().get(
                 NOMINATIM_URL,
                 params={"q": query, "format": "json", "limit": 1},
                 headers={"User-Agent": NOMINATIM_USER_AGENT},
@@ -365,7 +401,7 @@ def geocode_helper(
                     result = (float(data[0]["lat"]), float(data[0]["lon"]))
                 else:
                     result = (None, None)
-                geocode_cache[address] = result
+                _cache_geocode_result(cache_key, result)
                 return result
             elif response.status_code == 429 or response.status_code == 509:
                 print(f"Geocoding attempt {attempt + 1}/{max_retries} rate-limited for '{address}': HTTP {response.status_code}")
@@ -388,91 +424,417 @@ def geocode_helper(
             print(f"Unexpected geocoding error for '{address}': {e}")
             break
     
-    geocode_cache[address] = (None, None)
+    # Gagal karena timeout/HTTP error/rate limit tidak di-cache: hanya "tidak
+    # ditemukan" dari Nominatim (HTTP 200, data kosong) yang disimpan sebagai (None, None)
     return (None, None)
 
-def geocode_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-    if 'ALAMAT_LAT' in df.columns and df['ALAMAT_LAT'].notna().all():
-        return df
-    
-    if 'ALAMAT' not in df.columns:
-        return df
-    
-    df['SEARCH_QUERY'] = df['ALAMAT'].astype(str)
-    unique_addresses = df['SEARCH_QUERY'].unique()
-    
+def geocode_addresses(
+    addresses: List[str],
+    progress: Optional[ProgressCallback] = None
+) -> Dict[str, Tuple[Optional[float], Optional[float]]]:
+    """
+    Geocode alamat unik secara paralel (GEOCODE_CONCURRENCY worker). Laju
+    request ke Nominatim diatur token bucket di geocode_helper, jadi alamat
+    yang sudah ada di cache tidak ikut menunggu.
+    """
     address_coords: Dict[str, Tuple[Optional[float], Optional[float]]] = {}
-    total = len(unique_addresses)
-    
+    total = len(addresses)
+    if total == 0:
+        return address_coords
+
     print(f"Geocoding {total} alamat unik...")
-    
-    for idx, addr in enumerate(unique_addresses):
-        print(f"  [{idx + 1}/{total}] Geocoding: {addr[:50]}...")
-        coords = geocode_helper(addr)
-        address_coords[addr] = coords
-        
-        sleep_time = 1.2 if coords != (None, None) else 0.5
-        time.sleep(sleep_time)
-    
-    df['ALAMAT_LAT'] = df['SEARCH_QUERY'].map(lambda x: address_coords.get(x, (None, None))[0])
-    df['ALAMAT_LONG'] = df['SEARCH_QUERY'].map(lambda x: address_coords.get(x, (None, None))[1])
-    
-    success_count = df['ALAMAT_LAT'].notna().sum()
-    print(f"Geocoding selesai: {success_count}/{len(df)} alamat berhasil di-geocode")
-    
-    return df
+    with ThreadPoolExecutor(max_workers=max(1, GEOCODE_CONCURRENCY), thread_name_prefix="geocode") as executor:
+        futures = {executor.submit(geocode_helper, addr): addr for addr in addresses}
+        for idx, future in enumerate(as_completed(futures)):
+            addr = futures[future]
+            address_coords[addr] = future.result()
+            print(f"  [{idx + 1}/{total}] Geocoded: {addr[:50]}...")
+            if progress:
+                progress("geocoding", idx + 1, total)
+
+    return address_coords
+
+def geocode_dataframes(
+    frames: List[pd.DataFrame],
+    progress: Optional[ProgressCallback] = None
+) -> List[pd.DataFrame]:
+    """
+    Geocode beberapa DataFrame sekaligus (mis. bongkar & muat) supaya alamat
+    unik gabungan di-geocode dalam satu batch paralel, bukan satu per satu.
+    Frame yang koordinatnya sudah lengkap atau tanpa kolom ALAMAT dilewati.
+    """
+    pending = [
+        df for df in frames
+        if 'ALAMAT' in df.columns
+        and not ('ALAMAT_LAT' in df.columns and df['ALAMAT_LAT'].notna().all())
+    ]
+    for df in pending:
+        df['SEARCH_QUERY'] = df['ALAMAT'].astype(str)
+
+    unique_addresses = list(dict.fromkeys(
+        addr for df in pending for addr in df['SEARCH_QUERY'].unique()
+    ))
+    address_coords = geocode_addresses(unique_addresses, progress)
 
-def _create_route_cache_key(lat1: float, lon1: float, lat2: float, lon2: float) -> str:
-    return f"{round(lat1, 5)},{round(lon1, 5)}|{round(lat2, 5)},{round(lon2, 5)}"
+    for df in pending:
+        df['ALAMAT_LAT'] = df['SEARCH_QUERY'].map(lambda x: address_coords.get(x, (None, None))[0])
+        df['ALAMAT_LONG'] = df['SEARCH_QUERY'].map(lambda x: address_coords.get(x, (None, None))[1])
 
-def get_valhalla_route(
+        success_count = df['ALAMAT_LAT'].notna().sum()
+        print(f"Geocoding selesai: {success_count}/{len(df)} alamat berhasil di-geocode")
+
+    return frames
+
+def geocode_dataframe(
+    df: pd.DataFrame,
+    progress: Optional[ProgressCallback] = None
+) -> pd.DataFrame:
+    return geocode_dataframes([df], progress)[0]
+
+def column_fingerprint(series: pd.Series) -> str:
+    """Hash isi kolom (sebagai teks), untuk mengecek kolom masih sama dengan saat validasi."""
+    hashed = pd.util.hash_pandas_object(series.astype(str), index=False).to_numpy()
+    return hashlib.blake2b(hashed.tobytes(), digest_size=16).hexdigest()
+
+def prepare_columns(
+    df: pd.DataFrame,
+    prepared: Optional[Dict[str, Any]] = None
+) -> None:
+    """
+    Ubah ACT. LOAD DATE menjadi datetime dan isi CABANG_NORM. prepared adalah
+    hasil validasi untuk frame ini: kolom yang isinya masih sama dengan saat
+    validasi dipakai ulang tanpa parse/normalisasi ulang.
+    """
+    prepared = prepared or {}
+    dates = df['ACT. LOAD DATE']
+    if prepared.get('date_fingerprint') == column_fingerprint(dates):
+        df['ACT. LOAD DATE'] = prepared['dates']
+    else:
+        # Parser yang sama dengan validasi, jadi tafsiran DD/MM vs MM/DD identik
+        df['ACT. LOAD DATE'] = parse_datetime_column(dates)[0]
+
+    if prepared.get('cabang_fingerprint') == column_fingerprint(df['CABANG']):
+        df['CABANG_NORM'] = prepared['cabang_norm']
+    else:
+        df['CABANG_NORM'] = df['CABANG'].apply(normalize_cabang)
+
+def attach_coordinates(
+    frames: List[pd.DataFrame],
+    address_coords: Dict[str, Tuple[Optional[float], Optional[float]]],
+    progress: Optional[ProgressCallback] = None
+) -> None:
+    """
+    Isi ALAMAT_LAT/ALAMAT_LONG dari koordinat hasil validasi (key: alamat yang
+    di-strip). Hanya alamat yang belum pernah di-geocode (mis. diedit setelah
+    validasi) yang di-geocode.
+    """
+    keys = [df['ALAMAT'].astype(str).str.strip() for df in frames]
+    missing = list(dict.fromkeys(
+        addr for frame_keys in keys for addr in frame_keys.unique()
+        if addr not in address_coords and addr.lower() not in ('nan', 'none', '')
+    ))
+    if missing:
+        address_coords = {**address_coords, **geocode_addresses(missing, progress)}
+
+    for df, frame_keys in zip(frames, keys):
+        coords = frame_keys.map(lambda x: address_coords.get(x, (None, None)))
+        df['ALAMAT_LAT'] = coords.str[0].astype(float)
+        df['ALAMAT_LONG'] = coords.str[1].astype(float)
+
+PORT_LEG_COLUMNS = ['DIST_PORT_TO_ADDR', 'DIST_ADDR_TO_PORT']
+
+def attach_port_legs(
+    df_dest: pd.DataFrame,
+    df_origin: pd.DataFrame,
+    provider: DistanceProvider
+) -> None:
+    """
+    Hitung leg port->alamat dan alamat->port sekali per (cabang, koordinat) unik
+    dari kedua frame, lalu simpan sebagai kolom CABANG_NORM, DIST_PORT_TO_ADDR
+    dan DIST_ADDR_TO_PORT. Baris tanpa cabang atau STRIPPING diisi NaN.
+    """
+    keys_per_frame: List[List[Optional[Tuple[str, float, float]]]] = []
+    coords_by_cabang: Dict[str, Dict[Tuple[float, float], None]] = {}
+
+    for df in (df_dest, df_origin):
+        if 'CABANG_NORM' not in df.columns:
+            df['CABANG_NORM'] = df['CABANG'].apply(normalize_cabang)
+        if 'SERVICE TYPE' in df.columns:
+            is_stripping = df['SERVICE TYPE'].astype(str).str.strip().str.upper() == 'STRIPPING'
+        else:
+            is_stripping = pd.Series(False, index=df.index)
+
+        keys: List[Optional[Tuple[str, float, float]]] = []
+        for cabang, lat, lon, stripping in zip(
+            df['CABANG_NORM'], df['ALAMAT_LAT'], df['ALAMAT_LONG'], is_stripping
+        ):
+            if pd.isna(cabang) or stripping:
+                keys.append(None)
+                continue
+            key = (cabang, float(lat), float(lon))
+            coords_by_cabang.setdefault(cabang, {})[key[1:]] = None
+            keys.append(key)
+        keys_per_frame.append(keys)
+
+    port_legs: Dict[Tuple[str, float, float], Tuple[float, float]] = {}
+    for cabang, coords in coords_by_cabang.items():
+        port = get_port_location(cabang)
+        provider.prefetch([(port['lat'], port['lon'], lat, lon) for lat, lon in coords])
+        provider.prefetch([(lat, lon, port['lat'], port['lon']) for lat, lon in coords])
+        for lat, lon in coords:
+            port_legs[(cabang, lat, lon)] = (
+                _port_leg_distance(port['lat'], port['lon'], lat, lon, provider),
+                _port_leg_distance(lat, lon, port['lat'], port['lon'], provider),
+            )
+
+    for df, keys in zip((df_dest, df_origin), keys_per_frame):
+        legs = [port_legs[key] if key is not None else (np.nan, np.nan) for key in keys]
+        df['DIST_PORT_TO_ADDR'] = [leg[0] for leg in legs]
+        df['DIST_ADDR_TO_PORT'] = [leg[1] for leg in legs]
+
+def prefetch_candidate_legs(
+    dest: Dict[str, Any],
+    orig: Dict[str, Any],
+    candidates: Dict[int, Set[int]],
+    provider: DistanceProvider,
+    progress: Optional[ProgressCallback] = None
+) -> None:
+    """Ambil leg dest->origin per cabang, hanya untuk pasangan yang lolos prefilter."""
+    legs_by_cabang: Dict[str, List[Tuple[float, float, float, float]]] = {}
+    for i, origin_indices in candidates.items():
+        legs = legs_by_cabang.setdefault(dest['cabang'][i], [])
+        for j in origin_indices:
+            legs.append((dest['lat'][i], dest['lon'][i], orig['lat'][j], orig['lon'][j]))
+
+    total = sum(len(legs) for legs in legs_by_cabang.values())
+    routed = 0
+    for legs in legs_by_cabang.values():
+        provider.prefetch(legs)
+        routed += len(legs)
+        if progress:
+            progress("routing", routed, total)
+
+def _port_leg_distance(
     lat_start: float,
     lon_start: float,
     lat_end: float,
-    lon_end: float
-) -> Tuple[Optional[float], Optional[float], Optional[str]]:
-    cache_key = _create_route_cache_key(lat_start, lon_start, lat_end, lon_end)
-    
-    if cache_key in route_cache:
-        return route_cache[cache_key]
-    
-    payload = {
-        "locations": [
-            {"lat": lat_start, "lon": lon_start},
-            {"lat": lat_end, "lon": lon_end}
-        ],
-        "costing": "truck",
-        "units": "km"
-    }
-    
-    headers = {
-        "Content-Type": "application/json",
-        "ngrok-skip-browser-warning": "true"
+    lon_end: float,
+    provider: DistanceProvider
+) -> float:
+    distance_km = provider.get_distance(lat_start, lon_start, lat_end, lon_end)
+    return distance_km if distance_km else 99999
+
+def road_distance_lower_bound(lat1: Any, lon1: Any, lat2: Any, lon2: Any) -> Any:
+    """Batas bawah jarak jalan: haversine dikurangi toleransi snapping titik ke jalan."""
+    great_circle = haversine_km(lat1, lon1, lat2, lon2) * HAVERSINE_LOWER_BOUND_FACTOR
+    return np.maximum(great_circle - HAVERSINE_TOLERANCE_KM, 0.0)
+
+def hours_to_timedelta_us(hours: Any) -> np.ndarray:
+    """
+    timedelta(hours=x) dalam mikrodetik untuk array x. Pembulatan mengikuti
+    CPython (sisa pecahan dibulatkan half-to-even terhadap total), jadi hasilnya
+    identik dengan aritmetika datetime + timedelta per baris.
+    """
+    hours = np.asarray(hours, dtype=np.float64)
+    frac, whole = np.modf(hours)
+    leftover, us_whole = np.modf(frac * float(US_PER_HOUR))
+    total = whole.astype(np.int64) * US_PER_HOUR + us_whole.astype(np.int64)
+
+    rounded = np.rint(leftover)
+    half = np.abs(rounded - leftover) == 0.5
+    if half.any():
+        odd = (total % 2 == 1).astype(np.float64)
+        rounded = np.where(half, 2.0 * np.round((leftover + odd) * 0.5) - odd, rounded)
+    return total + rounded.astype(np.int64)
+
+def _datetime_ns(series: pd.Series) -> np.ndarray:
+    return series.astype('datetime64[ns]').to_numpy().astype(np.int64)
+
+def _row_columns(df: pd.DataFrame, tipe: str, durations: DurationIndex) -> Dict[str, Any]:
+    """Kolom per baris yang dipakai prefilter dan cost matrix, dihitung sekali (O(n))."""
+    n = len(df)
+    cabang = df['CABANG_NORM'].tolist()
+    cust_ids = (
+        [str(c).strip() for c in df['CUST ID']] if 'CUST ID' in df.columns else [''] * n
+    )
+    grades = df['GRADE CONT'].tolist() if 'GRADE CONT' in df.columns else ['-'] * n
+    dist_port_to_addr = df['DIST_PORT_TO_ADDR'].to_numpy(dtype=np.float64)
+    active = ~np.isnan(dist_port_to_addr)
+
+    # ACT. LOAD DATE + waktu tempuh port → customer
+    time_port_to_addr = np.where(active, dist_port_to_addr, 0.0) / TRUCK_SPEED_FULL_KMH
+    arrival_ns = _datetime_ns(df['ACT. LOAD DATE']) + hours_to_timedelta_us(time_port_to_addr) * 1000
+
+    # Durasi & time profile di-resolve sekali per (CUST ID, cabang) unik
+    customer_codes, cabang_codes = durations.codes(cust_ids, cabang)
+    durasi = np.where(active, durations.hours_for(customer_codes, cabang_codes, tipe), np.nan)
+
+    sizes = df['SIZE CONT'].tolist()
+    cost_cabang = {value: cost_cabang_index(value) for value in set(cabang)}
+    cost_size = {value: cost_size_class(value) for value in set(sizes)}
+
+    return {
+        'id': df['NO SOPT'].tolist(),
+        'cabang': cabang,
+        'size': sizes,
+        'cost_cabang': np.array([cost_cabang[value] for value in cabang], dtype=np.intp),
+        'cost_size': np.array([cost_size[value] for value in sizes], dtype=np.intp),
+        'grade': np.array([str(g).strip() for g in grades], dtype=str),
+        'cust_id': cust_ids,
+        'lat': df['ALAMAT_LAT'].astype(float).tolist(),
+        'lon': df['ALAMAT_LONG'].astype(float).tolist(),
+        'active': active,
+        'dist_port_to_addr': dist_port_to_addr,
+        'dist_addr_to_port': df['DIST_ADDR_TO_PORT'].to_numpy(dtype=np.float64),
+        'arrival_ns': arrival_ns,
+        'durasi': durasi,
+        'profile': durations.profiles(customer_codes, cabang_codes, tipe),
     }
-    
-    try:
-        response = requests.post(
-            VALHALLA_URL,
-            json=payload,
-            headers=headers,
-            timeout=15,
-            verify=False
+
+def _partition_rows(rows: Dict[str, Any]) -> Dict[Tuple[str, Any], List[int]]:
+    """Index baris aktif per (cabang, size). Size NaN tidak pernah match."""
+    blocks: Dict[Tuple[str, Any], List[int]] = {}
+    for idx in np.flatnonzero(rows['active']):
+        size = rows['size'][idx]
+        if size != size:
+            continue
+        blocks.setdefault((rows['cabang'][idx], size), []).append(int(idx))
+    return blocks
+
+def build_time_window_index(orig: Dict[str, Any]) -> Dict[Tuple[str, Any], Dict[str, Any]]:
+    """
+    Origin aktif per partisi (cabang, size), terurut menurut waktu tiba di
+    lokasi muat (jam), supaya kandidat per destinasi bisa dicari dengan
+    binary search.
+    """
+    index: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+    for key, rows in _partition_rows(orig).items():
+        rows = np.asarray(rows)
+        arrival = orig['arrival_ns'][rows] / NS_PER_HOUR
+        order = np.argsort(arrival, kind='stable')
+        rows = rows[order]
+        grade = orig['grade'][rows]
+        grade_wildcard = np.isin(grade, GRADE_WILDCARDS)
+        index[key] = {
+            'index': rows,
+            'arrival': arrival[order],
+            'lat': np.asarray(orig['lat'])[rows],
+            'lon': np.asarray(orig['lon'])[rows],
+            'dist_port_to_orig': orig['dist_port_to_addr'][rows],
+            'max_dist_port_to_orig': float(orig['dist_port_to_addr'][rows].max()),
+            'grade': grade,
+            'grade_wildcard': grade_wildcard,
+            'num_grade_wildcard': int(grade_wildcard.sum()),
+            'grade_counts': Counter(grade[~grade_wildcard].tolist()),
+        }
+    return index
+
+def prune_pairs_by_haversine(
+    dest: Dict[str, Any],
+    orig: Dict[str, Any]
+) -> Tuple[Dict[int, Set[int]], Dict[Tuple[str, Any], Dict[str, int]]]:
+    """
+    Buang pasangan (dest, origin) yang pasti tidak feasible sebelum leg
+    dest->origin di-route. Jarak dest->origin belum diketahui, jadi dipakai
+    batas-batasnya:
+
+    - bawah: haversine (road_distance_lower_bound)
+    - atas : dist_dest_to_port + dist_port_to_orig (selain itu saving <= 0)
+
+    Pasangan dibuang jika saving pasti <= 0, atau time_gap pasti di luar
+    [-max(MAX_MUNDURKAN_MUAT, MAX_MAJUKAN_BONGKAR),
+     MAX_IDLE_HOURS + max(MAX_MAJUKAN_MUAT, MAX_MUNDURKAN_BONGKAR)].
+    Origin di luar jendela waktu itu tidak disentuh sama sekali: jendelanya
+    dicari dengan binary search di build_time_window_index.
+
+    Input berupa kolom per baris dari _row_columns.
+    Returns (kandidat origin per index dest, statistik per partisi (cabang, size)).
+    """
+    max_shortage = max(MAX_MUNDURKAN_MUAT, MAX_MAJUKAN_BONGKAR)
+    max_gap = MAX_IDLE_HOURS + max(MAX_MAJUKAN_MUAT, MAX_MUNDURKAN_BONGKAR)
+
+    window_index = build_time_window_index(orig)
+
+    candidates: Dict[int, Set[int]] = {}
+    prune_stats: Dict[Tuple[str, Any], Dict[str, int]] = {}
+
+    for (cabang, size_cont), dest_rows in _partition_rows(dest).items():
+        group = window_index.get((cabang, size_cont))
+        if group is None:
+            continue
+
+        for i in dest_rows:
+            dest_grade = dest['grade'][i]
+            dest_wildcard = dest_grade in GRADE_WILDCARDS
+            if dest_wildcard:
+                num_compatible = len(group['index'])
+            else:
+                num_compatible = group['num_grade_wildcard'] + group['grade_counts'][dest_grade]
+            if num_compatible == 0:
+                continue
+
+            dist_dest_to_port = dest['dist_addr_to_port'][i]
+            # Paling cepat siap berangkat ke lokasi muat
+            ready_hours = dest['arrival_ns'][i] / NS_PER_HOUR + dest['durasi'][i] + PREP_TIME_HOURS
+
+            # Jendela waktu tiba origin yang masih mungkin feasible
+            earliest = ready_hours - max_shortage - 2 * PRUNE_EPSILON
+            latest = (
+                ready_hours + max_gap + 2 * PRUNE_EPSILON
+                + (dist_dest_to_port + group['max_dist_port_to_orig']) / TRUCK_SPEED_EMPTY_KMH
+            )
+            lo = int(np.searchsorted(group['arrival'], earliest, side='left'))
+            hi = int(np.searchsorted(group['arrival'], latest, side='right'))
+            window = slice(lo, hi)
+
+            if dest_wildcard:
+                compatible = np.ones(hi - lo, dtype=bool)
+            else:
+                compatible = group['grade_wildcard'][window] | (group['grade'][window] == dest_grade)
+
+            orig_arrival = group['arrival'][window][compatible]
+            dist_port_to_orig = group['dist_port_to_orig'][window][compatible]
+            direct_min = road_distance_lower_bound(
+                dest['lat'][i], dest['lon'][i],
+                group['lat'][window][compatible], group['lon'][window][compatible]
+            )
+            direct_max = dist_dest_to_port + dist_port_to_orig
+
+            gap_max = orig_arrival - ready_hours - direct_min / TRUCK_SPEED_EMPTY_KMH
+            gap_min = orig_arrival - ready_hours - direct_max / TRUCK_SPEED_EMPTY_KMH
+
+            keep = (
+                (direct_max - direct_min > -PRUNE_EPSILON)
+                & (gap_max >= -max_shortage - PRUNE_EPSILON)
+                & (gap_min <= max_gap + PRUNE_EPSILON)
+            )
+
+            kept = group['index'][window][compatible][keep]
+            candidates[i] = set(kept.tolist())
+
+            branch = prune_stats.setdefault(
+                (cabang, size_cont), {"candidate_pairs": 0, "pruned_pairs": 0}
+            )
+            branch["candidate_pairs"] += num_compatible
+            branch["pruned_pairs"] += num_compatible - len(kept)
+
+    for cabang, branch in sorted(prune_stats_by_cabang(prune_stats).items()):
+        print(
+            f"  Prefilter {cabang}: {branch['pruned_pairs']}/{branch['candidate_pairs']} "
+            f"pasangan dibuang sebelum routing"
         )
-        
-        if response.status_code == 200:
-            data = response.json()
-            shape = data['trip']['legs'][0]['shape']
-            distance_km = data['trip']['summary']['length']
-            time_hours = data['trip']['summary']['time'] / 3600.0
-            
-            result = (distance_km, time_hours, shape)
-            route_cache[cache_key] = result
-            return result
-            
-    except Exception:
-        pass
-    
-    return (None, None, None)
+
+    return candidates, prune_stats
+
+def prune_stats_by_cabang(
+    prune_stats: Dict[Tuple[str, Any], Dict[str, int]]
+) -> Dict[str, Dict[str, int]]:
+    by_cabang: Dict[str, Dict[str, int]] = {}
+    for (cabang, _), stats in prune_stats.items():
+        branch = by_cabang.setdefault(cabang, {"candidate_pairs": 0, "pruned_pairs": 0})
+        branch["candidate_pairs"] += stats["candidate_pairs"]
+        branch["pruned_pairs"] += stats["pruned_pairs"]
+    return by_cabang
 
 def normalize_cabang(cabang: Any) -> Optional[str]:
     if pd.isna(cabang) or cabang is None:
@@ -484,24 +846,30 @@ def normalize_cabang(cabang: Any) -> Optional[str]:
 def get_port_location(cabang: str) -> Dict[str, float]:
     return PORT_LOCATIONS.get(cabang, PORT_LOCATIONS['JKT'])
 
+def cost_cabang_index(cabang: Any) -> int:
+    """Baris cabang di COST_BASE / COST_PER_KM (baris default jika cabang tanpa model)."""
+    return COST_CABANG_INDEX.get(cabang, COST_DEFAULT_ROW)
+
+def cost_size_class(size_cont: Any) -> int:
+    """Kolom size di COST_BASE / COST_PER_KM: 20' (termasuk 21) atau 40'."""
+    return 0 if '20' in str(size_cont) or '21' in str(size_cont) else 1
+
+def trucking_costs(cabang_idx: Any, size_idx: Any, distance_km: np.ndarray) -> np.ndarray:
+    """
+    Biaya trucking untuk array jarak sekaligus: base + per_km * jarak, dengan
+    index cabang/size berupa skalar atau array yang di-broadcast ke jarak.
+    """
+    return COST_BASE[cabang_idx, size_idx] + COST_PER_KM[cabang_idx, size_idx] * distance_km
+
 def calculate_trucking_cost(cabang: str, size: int, distance_km: float) -> float:
-    normalized_size = 20 if size in [20, 21] else 40
-    
-    if cabang in TRUCKING_COST_MODEL:
-        model = TRUCKING_COST_MODEL[cabang].get(normalized_size, DEFAULT_COST_MODEL[normalized_size])
-    else:
-        model = DEFAULT_COST_MODEL[normalized_size]
-    
-    cost = model['base'] + model['per_km'] * distance_km
-    return cost
+    size_idx = COST_SIZE_CLASSES.index(20 if size in [20, 21] else 40)
+    return float(trucking_costs(cost_cabang_index(cabang), size_idx, distance_km))
 
 def is_grade_match(grade_dest: str, grade_orig: str) -> bool:
-    invalid_values = ['-', 'nan', 'None', '']
-    
     d_grade = str(grade_dest).strip()
     o_grade = str(grade_orig).strip()
     
-    if d_grade in invalid_values or o_grade in invalid_values:
+    if d_grade in GRADE_WILDCARDS or o_grade in GRADE_WILDCARDS:
         return True
     
     return d_grade == o_grade
@@ -615,24 +983,404 @@ def build_recommendation_text(
     
     return (main_text, origin_text, dest_text)
 
+def build_cost_edges(
+    dest: Dict[str, Any],
+    orig: Dict[str, Any],
+    candidates: Dict[int, Set[int]],
+    provider: DistanceProvider
+) -> Tuple[List[AssignmentBlock], CandidateEdges]:
+    """
+    Edge feasible (dest, origin, cost) per blok independen; matrix n x m penuh
+    tidak pernah dibuat. Baris dipartisi per (cabang, size); di tiap blok
+    kompatibilitas grade, jarak via port, saving, time gap, kategori pool,
+    shift, score dan biaya dihitung dengan broadcasting NumPy. Hasilnya
+    identik dengan evaluasi per pasangan (lihat evaluate_time_feasibility,
+    calculate_match_score, calculate_trucking_cost).
+
+    Input berupa kolom per baris dari _row_columns. Hanya pasangan di
+    `candidates` yang dievaluasi. Detail edge disimpan kolumnar
+    (CandidateEdges), bukan dict per pasangan.
+    """
+    blocks: List[AssignmentBlock] = []
+    edge_parts: List[CandidateEdges] = []
+
+    orig_blocks = _partition_rows(orig)
+
+    for (cabang, size_cont), dest_idx in _partition_rows(dest).items():
+        orig_idx = orig_blocks.get((cabang, size_cont))
+        if not orig_idx:
+            continue
+
+        d = np.asarray(dest_idx)
+        o = np.asarray(orig_idx)
+
+        d_grade = dest['grade'][d]
+        o_grade = orig['grade'][o]
+        compatible = (
+            np.isin(d_grade, GRADE_WILDCARDS)[:, None]
+            | np.isin(o_grade, GRADE_WILDCARDS)[None, :]
+            | (d_grade[:, None] == o_grade[None, :])
+        )
+
+        allowed = np.zeros_like(compatible)
+        position = {j: k for k, j in enumerate(orig_idx)}
+        for r, i in enumerate(dest_idx):
+            cols = [position[j] for j in candidates.get(i, ()) if j in position]
+            allowed[r, cols] = True
+
+        rows_in_block, cols_in_block = np.nonzero(compatible & allowed)
+        if len(rows_in_block) == 0:
+            continue
+        pair_d = d[rows_in_block]
+        pair_o = o[cols_in_block]
+
+        # Satu-satunya leg per pasangan: bongkar -> muat
+        direct = np.array([
+            np.nan if dist is None else dist
+            for dist in (
+                provider.get_distance(dest['lat'][i], dest['lon'][i], orig['lat'][j], orig['lon'][j])
+                for i, j in zip(pair_d.tolist(), pair_o.tolist())
+            )
+        ], dtype=np.float64)
+        routed = ~np.isnan(direct)
+
+        via_port = (
+            (dest['dist_port_to_addr'][d] + dest['dist_addr_to_port'][d])[:, None]
+            + orig['dist_port_to_addr'][o][None, :]
+            + orig['dist_addr_to_port'][o][None, :]
+        )[rows_in_block, cols_in_block]
+        triangulasi = (
+            dest['dist_port_to_addr'][pair_d] + direct + orig['dist_addr_to_port'][pair_o]
+        )
+        saving_km = via_port - triangulasi
+
+        keep = routed & (saving_km > 0)
+        pair_d, pair_o = pair_d[keep], pair_o[keep]
+        direct, via_port = direct[keep], via_port[keep]
+        triangulasi, saving_km = triangulasi[keep], saving_km[keep]
+
+        durasi_bongkar = dest['durasi'][pair_d]
+        selesai_bongkar_ns = (
+            dest['arrival_ns'][pair_d] + hours_to_timedelta_us(durasi_bongkar) * 1000
+        )
+        est_travel = direct / TRUCK_SPEED_EMPTY_KMH
+        est_tiba_muat_ns = (
+            selesai_bongkar_ns + hours_to_timedelta_us(PREP_TIME_HOURS + est_travel) * 1000
+        )
+        time_gap = (orig['arrival_ns'][pair_o] - est_tiba_muat_ns) / 1e9 / 3600.0
+
+        # evaluate_time_feasibility, tervektorisasi
+        late = time_gap < 0
+        idle = time_gap > MAX_IDLE_HOURS
+        shortage = np.abs(time_gap)
+        excess = time_gap - MAX_IDLE_HOURS
+        mundur_muat = late & (shortage <= MAX_MUNDURKAN_MUAT)
+        maju_bongkar = late & (shortage <= MAX_MAJUKAN_BONGKAR)
+        maju_muat = idle & (excess <= MAX_MAJUKAN_MUAT)
+        mundur_bongkar = idle & (excess <= MAX_MUNDURKAN_BONGKAR)
+        feasible = (
+            (~late & ~idle)
+            | mundur_muat | maju_bongkar
+            | maju_muat | mundur_bongkar
+        )
+        shift = np.where(late, shortage, np.where(idle, excess, 0.0))
+
+        score = saving_km * WEIGHT_SAVING - shift * PENALTY_PER_HOUR
+
+        # Satu partisi = satu (cabang, size): via port & triangulasi dihitung dalam satu panggilan
+        cost_via_port, cost_triangulasi = trucking_costs(
+            dest['cost_cabang'][d[0]], dest['cost_size'][d[0]], np.stack((via_port, triangulasi))
+        )
+
+        if not feasible.any():
+            continue
+        blocks.append(AssignmentBlock(
+            rows=pair_d[feasible],
+            cols=pair_o[feasible],
+            costs=MATCH_COST_OFFSET - score[feasible]
+        ))
+
+        records = np.empty(int(feasible.sum()), dtype=EDGE_DTYPE)
+        records['i'] = pair_d[feasible]
+        records['j'] = pair_o[feasible]
+        records['pool'] = np.where(late, POOL_LATE, np.where(idle, POOL_IDLE, POOL_OPTIMAL))[feasible]
+        records['options'] = option_bits(mundur_muat, maju_bongkar, maju_muat, mundur_bongkar)[feasible]
+        records['score'] = score[feasible]
+        records['saving_km'] = saving_km[feasible]
+        records['cost_triangulasi'] = cost_triangulasi[feasible]
+        records['cost_via_port'] = cost_via_port[feasible]
+        records['dist_triangulasi'] = triangulasi[feasible]
+        records['dist_via_port'] = via_port[feasible]
+        records['dist_direct'] = direct[feasible]
+        records['est_travel'] = est_travel[feasible]
+        records['shift'] = shift[feasible]
+        records['gap'] = time_gap[feasible]
+        records['selesai_bongkar_ns'] = selesai_bongkar_ns[feasible]
+        edge_parts.append(CandidateEdges(records))
+
+    return blocks, CandidateEdges.concat(edge_parts)
+
+class _StoredLegProvider(DistanceProvider):
+    """Leg dest->origin yang sudah diketahui dari session; leg lain ke provider asli."""
+
+    def __init__(self, provider: DistanceProvider, legs: Dict[Tuple[float, float, float, float], float]):
+        self.provider = provider
+        self.legs = legs
+        self.name = provider.name
+
+    def get_distance(
+        self,
+        lat_start: float,
+        lon_start: float,
+        lat_end: float,
+        lon_end: float
+    ) -> Optional[float]:
+        distance_km = self.legs.get((lat_start, lon_start, lat_end, lon_end))
+        if distance_km is not None:
+            return distance_km
+        return self.provider.get_distance(lat_start, lon_start, lat_end, lon_end)
+
+def _row_fingerprints(rows: Dict[str, Any]) -> List[str]:
+    """Sidik jari isi baris yang menentukan edge-nya; baris yang tidak diedit sama antar run."""
+    fields = zip(
+        rows['id'], rows['cabang'], rows['size'], rows['grade'].tolist(), rows['cust_id'],
+        rows['lat'], rows['lon'], rows['arrival_ns'].tolist(),
+        rows['dist_port_to_addr'].tolist(), rows['dist_addr_to_port'].tolist(), rows['durasi'].tolist()
+    )
+    return [hashlib.blake2b(repr(f).encode(), digest_size=16).hexdigest() for f in fields]
+
+def _restrict_rows(rows: Dict[str, Any], keys: Set[Tuple[str, Any]]) -> Dict[str, Any]:
+    """Kolom baris yang sama, tetapi hanya baris di partisi `keys` yang aktif."""
+    in_keys = np.array(
+        [(cabang, size) in keys for cabang, size in zip(rows['cabang'], rows['size'])],
+        dtype=bool
+    )
+    return {**rows, 'active': rows['active'] & in_keys}
+
+def solve_partitions(
+    dest: Dict[str, Any],
+    orig: Dict[str, Any],
+    provider: DistanceProvider,
+    previous: Optional[Dict[str, Any]] = None,
+    progress: Optional[ProgressCallback] = None
+) -> Tuple[
+    np.ndarray,
+    np.ndarray,
+    CandidateEdges,
+    Dict[Tuple[str, Any], Dict[str, int]],
+    Dict[str, Any]
+]:
+    """
+    Prefilter, routing, cost edge dan assignment per partisi (cabang, size),
+    dengan memakai ulang state run sebelumnya (`previous`, dari session):
+
+    - partisi yang barisnya tidak berubah: solusi lama dipakai apa adanya
+    - partisi yang tersentuh edit: hanya pasangan dengan baris baru/terubah
+      yang di-route dan di-score; edge antar baris lama diambil dari edge
+      table lama, lalu partisi di-solve ulang
+    - partisi baru (atau dengan baris duplikat): dihitung penuh
+
+    Tanpa `previous` semua partisi dihitung penuh. Hasil identik dengan
+    run penuh pada data yang sama.
+
+    Returns (row_indices, col_indices, edge table yang mencakup semua
+    pasangan terpilih, statistik prefilter per partisi, state untuk session
+    berikutnya).
+    """
+    dest_fp = _row_fingerprints(dest)
+    orig_fp = _row_fingerprints(orig)
+    dest_parts = _partition_rows(dest)
+    orig_parts = _partition_rows(orig)
+    previous_parts = (
+        previous['partitions']
+        if previous and previous.get('provider') == provider.name else {}
+    )
+
+    reused: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+    carried: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+    touched: Set[Tuple[str, Any]] = set()
+    for key, dest_idx in dest_parts.items():
+        if key not in orig_parts:
+            continue
+        d_fps = [dest_fp[i] for i in dest_idx]
+        o_fps = [orig_fp[j] for j in orig_parts[key]]
+        old = previous_parts.get(key)
+        unique = len(set(d_fps)) == len(d_fps) and len(set(o_fps)) == len(o_fps)
+        if old is not None and unique and old['unique']:
+            if old['dest_fp'] == d_fps and old['orig_fp'] == o_fps:
+                reused[key] = old
+                continue
+            carried[key] = old
+        touched.add(key)
+
+    candidates: Dict[int, Set[int]] = {}
+    prune_stats: Dict[Tuple[str, Any], Dict[str, int]] = {}
+    new_blocks: List[AssignmentBlock] = []
+    edges = CandidateEdges.empty()
+    if touched:
+        dest_touched = _restrict_rows(dest, touched)
+        orig_touched = _restrict_rows(orig, touched)
+        candidates, prune_stats = prune_pairs_by_haversine(dest_touched, orig_touched)
+
+        # Pasangan antar baris lama sudah ada di edge table lama
+        for key, old in carried.items():
+            old_dest, old_orig = set(old['dest_fp']), set(old['orig_fp'])
+            for i in dest_parts[key]:
+                if dest_fp[i] in old_dest and i in candidates:
+                    candidates[i] = {j for j in candidates[i] if orig_fp[j] not in old_orig}
+
+        prefetch_candidate_legs(dest_touched, orig_touched, candidates, provider, progress)
+        print("Membangun cost matrix...")
+        new_blocks, edges = build_cost_edges(dest_touched, orig_touched, candidates, provider)
+
+    new_edges = {
+        (dest['cabang'][block.rows[0]], dest['size'][block.rows[0]]): block for block in new_blocks
+    }
+
+    blocks: List[AssignmentBlock] = []
+    block_keys: List[Tuple[str, Any]] = []
+    known_legs: Dict[Tuple[float, float, float, float], float] = {}
+    for key in dest_parts:
+        if key not in touched:
+            continue
+        d = np.asarray(dest_parts[key])
+        o = np.asarray(orig_parts[key])
+        parts = []
+        if key in new_edges:
+            parts.append(new_edges[key])
+        if key in carried:
+            old = carried[key]
+            dest_pos = {fp: i for fp, i in zip((dest_fp[i] for i in d), d)}
+            orig_pos = {fp: j for fp, j in zip((orig_fp[j] for j in o), o)}
+            old_to_dest = np.array([dest_pos.get(fp, -1) for fp in old['dest_fp']], dtype=np.intp)
+            old_to_orig = np.array([orig_pos.get(fp, -1) for fp in old['orig_fp']], dtype=np.intp)
+            rows = old_to_dest[old['edge_rows']]
+            cols = old_to_orig[old['edge_cols']]
+            keep = (rows >= 0) & (cols >= 0)
+            parts.append(AssignmentBlock(rows=rows[keep], cols=cols[keep], costs=old['costs'][keep]))
+            for i, j, direct in zip(rows[keep].tolist(), cols[keep].tolist(), old['direct'][keep].tolist()):
+                known_legs[(dest['lat'][i], dest['lon'][i], orig['lat'][j], orig['lon'][j])] = direct
+        if not parts or not sum(len(part.costs) for part in parts):
+            continue
+
+        rows = np.concatenate([part.rows for part in parts])
+        cols = np.concatenate([part.cols for part in parts])
+        costs = np.concatenate([part.costs for part in parts])
+        # Urutan edge sama dengan run penuh (per baris, lalu kolom)
+        order = np.lexsort((cols, rows))
+        blocks.append(AssignmentBlock(rows=rows[order], cols=cols[order], costs=costs[order]))
+        block_keys.append(key)
+
+    largest_block = max((len(block.costs) for block in blocks), default=0)
+    print(
+        f"Menjalankan assignment untuk {sum(len(block.costs) for block in blocks)} pasangan feasible "
+        f"dalam {len(blocks)} blok (terbesar {largest_block} pasangan), "
+        f"{len(reused)} blok dipakai ulang dari session..."
+    )
+    row_indices, col_indices = solve_assignment(
+        blocks,
+        progress=(lambda done, total: progress("assignment", done, total)) if progress else None
+    )
+
+    row_parts = [row_indices]
+    col_parts = [col_indices]
+    for key, old in reused.items():
+        row_parts.append(np.asarray(dest_parts[key], dtype=np.intp)[old['match_rows']])
+        col_parts.append(np.asarray(orig_parts[key], dtype=np.intp)[old['match_cols']])
+    row_indices = np.concatenate(row_parts).astype(np.intp)
+    col_indices = np.concatenate(col_parts).astype(np.intp)
+    order = np.argsort(row_indices, kind="stable")
+    row_indices, col_indices = row_indices[order], col_indices[order]
+
+    # Detail pasangan terpilih yang edge-nya berasal dari session
+    missing: Dict[int, Set[int]] = {}
+    unknown = edges.find(row_indices, col_indices) < 0
+    for i, j in zip(row_indices[unknown].tolist(), col_indices[unknown].tolist()):
+        missing.setdefault(i, set()).add(j)
+    if missing:
+        for key, old in reused.items():
+            d = dest_parts[key]
+            o = orig_parts[key]
+            for r, c, direct in zip(old['edge_rows'].tolist(), old['edge_cols'].tolist(), old['direct'].tolist()):
+                i, j = d[r], o[c]
+                if j in missing.get(i, ()):
+                    known_legs[(dest['lat'][i], dest['lon'][i], orig['lat'][j], orig['lon'][j])] = direct
+        missing_keys = {(dest['cabang'][i], dest['size'][i]) for i in missing}
+        _, missing_edges = build_cost_edges(
+            _restrict_rows(dest, missing_keys),
+            _restrict_rows(orig, missing_keys),
+            missing,
+            _StoredLegProvider(provider, known_legs)
+        )
+        edges = CandidateEdges.concat([edges, missing_edges])
+
+    selected = set(zip(row_indices.tolist(), col_indices.tolist()))
+    blocks_by_key = dict(zip(block_keys, blocks))
+    empty_block = AssignmentBlock(
+        rows=np.array([], dtype=np.intp), cols=np.array([], dtype=np.intp), costs=np.array([])
+    )
+    state_parts: Dict[Tuple[str, Any], Dict[str, Any]] = dict(reused)
+    for key in touched:
+        block = blocks_by_key.get(key, empty_block)
+        d = np.asarray(dest_parts[key])
+        o = np.asarray(orig_parts[key])
+        d_fps = [dest_fp[i] for i in d]
+        o_fps = [orig_fp[j] for j in o]
+        pairs = list(zip(block.rows.tolist(), block.cols.tolist()))
+        is_match = np.array([pair in selected for pair in pairs], dtype=bool)
+        positions = edges.find(block.rows, block.cols)
+        direct = edges.records['dist_direct'][np.maximum(positions, 0)] if len(edges) else np.full(len(pairs), np.nan)
+        for k in np.flatnonzero(positions < 0).tolist():
+            i, j = pairs[k]
+            direct[k] = known_legs[(dest['lat'][i], dest['lon'][i], orig['lat'][j], orig['lon'][j])]
+        edge_rows = np.searchsorted(d, block.rows).astype(np.int32)
+        edge_cols = np.searchsorted(o, block.cols).astype(np.int32)
+        state_parts[key] = {
+            'dest_fp': d_fps,
+            'orig_fp': o_fps,
+            'unique': len(set(d_fps)) == len(d_fps) and len(set(o_fps)) == len(o_fps),
+            'edge_rows': edge_rows,
+            'edge_cols': edge_cols,
+            'costs': block.costs,
+            'direct': direct,
+            'match_rows': edge_rows[is_match],
+            'match_cols': edge_cols[is_match],
+            'prune': prune_stats.get(key, {"candidate_pairs": 0, "pruned_pairs": 0}),
+        }
+
+    all_prune_stats = {key: part['prune'] for key, part in state_parts.items()}
+    state = {'provider': provider.name, 'partitions': state_parts}
+    return row_indices, col_indices, edges, all_prune_stats, state
+
 def process_optimization(
     df_dest: pd.DataFrame,
-    df_origin: pd.DataFrame
+    df_origin: pd.DataFrame,
+    routing_mode: str = ROUTING_MODE,
+    include_geometry: bool = INCLUDE_ROUTE_GEOMETRY,
+    distance_provider: Optional[str] = None,
+    progress: Optional[ProgressCallback] = None,
+    session_id: Optional[str] = None,
+    validation_token: Optional[str] = None
 ) -> List[Dict[str, Any]]:
 
-    df_dest['ACT. LOAD DATE'] = pd.to_datetime(
-        df_dest['ACT. LOAD DATE'], 
-        errors='coerce'
-    )
-    df_origin['ACT. LOAD DATE'] = pd.to_datetime(
-        df_origin['ACT. LOAD DATE'], 
-        errors='coerce'
-    )
-    
-    if 'ALAMAT_LAT' not in df_dest.columns:
-        df_dest = geocode_dataframe(df_dest)
-    if 'ALAMAT_LAT' not in df_origin.columns:
-        df_origin = geocode_dataframe(df_origin)
+    provider = get_distance_provider(distance_provider, routing_mode)
+
+    validated = None
+    if validation_token:
+        validated = load_session(validate_session_id(validation_token), kind=SESSION_KIND_VALIDATION)
+        if validated is None:
+            print(f"Validation token {validation_token} tidak ditemukan/kedaluwarsa, parse & geocode ulang")
+        else:
+            print("Memakai tanggal, cabang & koordinat hasil validasi")
+
+    prepare_columns(df_dest, validated['dest'] if validated else None)
+    prepare_columns(df_origin, validated['orig'] if validated else None)
+
+    needs_coords = [df for df in (df_dest, df_origin) if 'ALAMAT_LAT' not in df.columns]
+    if validated:
+        attach_coordinates(needs_coords, validated['address_coords'], progress)
+    else:
+        geocode_dataframes(needs_coords, progress)
     
     df_dest = df_dest.dropna(
         subset=['ALAMAT_LAT', 'ALAMAT_LONG', 'ACT. LOAD DATE']
@@ -647,185 +1395,45 @@ def process_optimization(
     
     print(f"Data valid: {num_dest} destinasi, {num_origin} origin")
     
-    INFINITY_COST = 1e9
-    cost_matrix = np.full((num_dest, num_origin), INFINITY_COST)
+    print(f"Distance provider: {provider.name}")
+    attach_port_legs(df_dest, df_origin, provider)
     
-    match_details: Dict[Tuple[int, int], Dict[str, Any]] = {}
+    # Satu versi lookup untuk seluruh run, walaupun file di-reload di tengah jalan
+    durations = get_duration_index()
+    dest_rows = _row_columns(df_dest, 'bongkar', durations)
+    orig_rows = _row_columns(df_origin, 'muat', durations)
     
-    print("Membangun cost matrix...")
-    
-    for i, dest_row in df_dest.iterrows():
-        dest_id = dest_row['NO SOPT']
-        dest_lat = float(dest_row['ALAMAT_LAT'])
-        dest_lon = float(dest_row['ALAMAT_LONG'])
-        dest_load_time = dest_row['ACT. LOAD DATE']
-        dest_cabang = normalize_cabang(dest_row['CABANG'])
-        
-        if dest_cabang is None:
+    for dest_id, cabang in zip(dest_rows['id'], dest_rows['cabang']):
+        if pd.isna(cabang):
             print(f"  Warning: DEST {dest_id} memiliki cabang kosong, dilewati.")
-            continue
-        
-        dest_service = str(dest_row.get('SERVICE TYPE', '')).strip().upper()
-        if dest_service == 'STRIPPING':
-            continue
-            
-        port = get_port_location(dest_cabang)
-        
-        dist_port_to_dest, _, _ = get_valhalla_route(
-            port['lat'], port['lon'],
-            dest_lat, dest_lon
-        )
-        dist_port_to_dest = dist_port_to_dest if dist_port_to_dest else 99999
-        time_port_to_dest = dist_port_to_dest / TRUCK_SPEED_FULL_KMH
-
-        # ACT. LOAD DATE + waktu tempuh port → customer bongkar
-        dest_arrival = dest_load_time + timedelta(hours=time_port_to_dest)
-        
-        dist_dest_to_port, _, _ = get_valhalla_route(
-            dest_lat, dest_lon, 
-            port['lat'], port['lon']
-        )
-        dist_dest_to_port = dist_dest_to_port if dist_dest_to_port else 99999
-        
-        for j, orig_row in df_origin.iterrows():
-            orig_cabang = normalize_cabang(orig_row['CABANG'])
-
-            if dest_cabang != orig_cabang:
-                continue
-
-            orig_service = str(orig_row.get('SERVICE TYPE', '')).strip().upper()
-            if orig_service == 'STRIPPING':
-                continue
-            
-            if dest_row['SIZE CONT'] != orig_row['SIZE CONT']:
-                continue
-            
-            if not is_grade_match(
-                dest_row.get('GRADE CONT', '-'),
-                orig_row.get('GRADE CONT', '-')
-            ):
-                continue
-
-            orig_lat = float(orig_row['ALAMAT_LAT'])
-            orig_lon = float(orig_row['ALAMAT_LONG'])
-            
-            dist_direct, _, route_shape = get_valhalla_route(
-                dest_lat, dest_lon,
-                orig_lat, orig_lon
-            )
-            
-            if dist_direct is None:
-                continue
-            
-            dist_port_to_orig, _, _ = get_valhalla_route(
-                port['lat'], port['lon'],
-                orig_lat, orig_lon
-            )
-            dist_port_to_orig = dist_port_to_orig if dist_port_to_orig else 99999
-            time_port_to_orig = dist_port_to_orig / TRUCK_SPEED_FULL_KMH
-
-            # ACT. LOAD DATE + waktu tempuh port → customer muat
-            orig_arrival = orig_row['ACT. LOAD DATE'] + timedelta(hours=time_port_to_orig)
-            
-            dist_orig_to_port, _, _ = get_valhalla_route(
-                orig_lat, orig_lon,
-                port['lat'], port['lon']
-            )
-            dist_orig_to_port = dist_orig_to_port if dist_orig_to_port else 99999
-            
-            dist_via_port_full = (
-                dist_port_to_dest +   
-                dist_dest_to_port +   
-                dist_port_to_orig +   
-                dist_orig_to_port     
-            )
-            
-            dist_triangulasi_full = (
-                dist_port_to_dest +   
-                dist_direct +         
-                dist_orig_to_port     
-            )
-            
-            saving_km = dist_via_port_full - dist_triangulasi_full
-            
-            if saving_km <= 0:
-                continue
-            
-            dest_cust_id = str(dest_row.get('CUST ID', '')).strip()
-            orig_cust_id = str(orig_row.get('CUST ID', '')).strip()
-            durasi_bongkar = get_customer_duration(dest_cust_id, dest_cabang, tipe='bongkar')
-            durasi_muat = get_customer_duration(orig_cust_id, dest_cabang, tipe='muat')
-
-            # Waktu selesai bongkar = tiba di customer + durasi bongkar
-            selesai_bongkar = dest_arrival + timedelta(hours=durasi_bongkar)
-
-            # Estimasi waktu tiba di lokasi muat
-            time_bongkar_to_muat = dist_direct / TRUCK_SPEED_EMPTY_KMH
-            est_tiba_muat = selesai_bongkar + timedelta(hours=PREP_TIME_HOURS + time_bongkar_to_muat)
+    
+    session_id = validate_session_id(session_id) if session_id else new_session_id()
+    previous = load_session(session_id)
+    if previous:
+        print(f"Session {session_id}: hanya partisi yang berubah dihitung ulang")
+    
+    print("Prefilter pasangan dengan jendela waktu & batas bawah haversine...")
+    row_indices, col_indices, edges, partition_prune_stats, state = solve_partitions(
+        dest_rows, orig_rows, provider, previous, progress
+    )
+    save_session(session_id, state)
+    prune_stats = prune_stats_by_cabang(partition_prune_stats)
 
-            # Time gap = deadline muat - estimasi tiba
-            time_gap = (orig_arrival - est_tiba_muat).total_seconds() / 3600.0
-            
-            pool_category, shift_needed, options = evaluate_time_feasibility(time_gap)
-            
-            if pool_category == "UNFEASIBLE":
-                continue
-            
-            score = calculate_match_score(saving_km, shift_needed)
-            
-            size_cont = dest_row['SIZE CONT']
-            size_int = 20 if '20' in str(size_cont) or '21' in str(size_cont) else 40
-            
-            cost_via_port = calculate_trucking_cost(dest_cabang, size_int, dist_via_port_full)
-            
-            cost_triangulasi = calculate_trucking_cost(dest_cabang, size_int, dist_triangulasi_full)
-            
-            saving_cost = cost_via_port - cost_triangulasi
-            
-            cost_matrix[i, j] = 10_000_000 - score
-            
-            match_details[(i, j)] = {
-                'dest_id': dest_id,
-                'orig_id': orig_row['NO SOPT'],
-                'cabang': dest_cabang,
-                'size_cont': size_cont,
-                'pool': pool_category,
-                'score': score,
-                'saving_km': saving_km,
-                'saving_cost': saving_cost,
-                'cost_triangulasi': cost_triangulasi,
-                'cost_via_port': cost_via_port,
-                'dist_triangulasi': dist_triangulasi_full,  
-                'dist_via_port': dist_via_port_full,        
-                'dist_direct': dist_direct,                  
-                'est_travel': time_bongkar_to_muat,
-                'shift': shift_needed,
-                'gap': time_gap,
-                'opsi': options,
-                'shape': route_shape,
-                'waktu_bongkar': dest_arrival,
-                'waktu_muat': orig_arrival,
-                'durasi_bongkar_est': durasi_bongkar,
-                'durasi_muat_est': durasi_muat,
-                'selesai_bongkar': selesai_bongkar,
-                'dest_cust_id': dest_cust_id,
-                'orig_cust_id': orig_cust_id,
-                'dest_lat': dest_lat,
-                'dest_lon': dest_lon,
-                'orig_lat': orig_lat,
-                'orig_lon': orig_lon
-            }
-
-    print("Menjalankan Hungarian Algorithm untuk optimasi global...")
-    row_indices, col_indices = linear_sum_assignment(cost_matrix)
+    # Dict detail hanya untuk pasangan terpilih
+    match_details = edges.details(edges.find(row_indices, col_indices), dest_rows, orig_rows)
+    memory_stats = {
+        "candidate_edges": len(edges),
+        "edge_store_mb": round(edges.nbytes / 2**20, 2),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    print(
+        f"Memori: {memory_stats['candidate_edges']} edge kandidat, "
+        f"{memory_stats['edge_store_mb']} MB edge store, puncak RSS {memory_stats['peak_rss_mb']} MB"
+    )
     
     results: List[Dict[str, Any]] = []
     
-    for row_idx, col_idx in zip(row_indices, col_indices):
-        if cost_matrix[row_idx, col_idx] >= INFINITY_COST:
-            continue
-        
-        details = match_details[(row_idx, col_idx)]
+    for row_idx, col_idx, details in zip(row_indices, col_indices, match_details):
         
         dest_cabang = df_dest.iloc[row_idx]['CABANG'] if row_idx < num_dest else 'JKT'
         port_loc = get_port_location(str(dest_cabang).upper())
@@ -866,20 +1474,22 @@ def process_optimization(
             "SELESAI_BONGKAR": details['selesai_bongkar'].strftime('%Y-%m-%d %H:%M:%S'),
             "DEST_CUST_ID": details['dest_cust_id'],
             "ORIG_CUST_ID": details['orig_cust_id'],
-            "DEST_TIME_PROFILE": get_customer_time_profile(
-                details['dest_cust_id'], details['cabang'], "bongkar"
-            ),
-            "ORIG_TIME_PROFILE": get_customer_time_profile(
-                details['orig_cust_id'], details['cabang'], "muat"
-            ),
-            "geometry": details['shape'],
+            "DEST_TIME_PROFILE": dest_rows['profile'][row_idx],
+            "ORIG_TIME_PROFILE": orig_rows['profile'][col_idx],
+            "geometry": None,
             "origin_coords": [details['orig_lat'], details['orig_lon']],
             "dest_coords": [details['dest_lat'], details['dest_lon']],
             "port_coords": [port_loc['lat'], port_loc['lon']]
         })
     
-    df_dest['CABANG_NORM'] = df_dest['CABANG'].apply(normalize_cabang)
-    df_origin['CABANG_NORM'] = df_origin['CABANG'].apply(normalize_cabang)
+    if include_geometry and provider.supports_geometry and results:
+        print(f"Mengambil geometry untuk {len(results)} pasangan terpilih...")
+        geometry_legs = [
+            (*res['dest_coords'], *res['origin_coords']) for res in results
+        ]
+        shapes = fetch_route_geometries(geometry_legs)
+        for res, leg in zip(results, geometry_legs):
+            res['geometry'] = shapes[leg]
     
     cabang_stats = {}
     
@@ -892,7 +1502,8 @@ def process_optimization(
             "total_dest": int(df_dest[df_dest['CABANG_NORM'] == cabang].shape[0]),
             "match": 0,
             "saving": 0,
-            "saving_cost": 0
+            "saving_cost": 0,
+            "pruned_pairs": prune_stats.get(cabang, {}).get("pruned_pairs", 0)
         }
     
     for res in results:
@@ -921,6 +1532,9 @@ def process_optimization(
             "total_dest": num_dest,
             "saving": total_saving_km,
             "saving_cost": total_saving_cost,
-            "cabang_breakdown": cabang_breakdown
-        }
+            "cabang_breakdown": cabang_breakdown,
+            "pruned_pairs": sum(b["pruned_pairs"] for b in prune_stats.values()),
+            "memory": memory_stats
+        },
+        "session_id": session_id
     }
\ No newline at end of file
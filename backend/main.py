@@ -1,17 +1,33 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from logic import process_optimization
+from fastapi.responses import JSONResponse, StreamingResponse
+from logic import process_optimization, geocode_cache
+from valhalla import route_cache, route_geometry_cache
 from validate import validate_data, geocode_single_address
+from http_client import post_async, run_async
+from ingest import read_upload
+from durations import get_duration_index, reload_duration_index
+from sessions import validate_session_id
+from jobs import (
+    JOB_STATUS_DONE,
+    JOB_STATUS_FAILED,
+    get_job,
+    get_job_result,
+    start_job,
+    stream_job_events,
+)
+from workers import WORKER_RETRY_AFTER_SECONDS, WorkerPoolFull, run_in_worker
+import workers
 from pydantic import BaseModel
 from typing import List, Optional
-import pandas as pd
-import io
+import hmac
 import os
 import requests
 
 app = FastAPI()
 
 VALHALLA_URL = os.getenv("VALHALLA_URL", "http://localhost:8002/route")
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")   # Kosong = endpoint admin yang mengubah state dinonaktifkan
 
 class ValhallaLocation(BaseModel):
     lat: float
@@ -32,6 +48,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(WorkerPoolFull)
+async def worker_pool_full_handler(request, exc: WorkerPoolFull):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(WORKER_RETRY_AFTER_SECONDS)}
+    )
+
 @app.post("/api/valhalla/route")
 async def valhalla_proxy(request: ValhallaRequest):
     try:
@@ -46,7 +70,7 @@ async def valhalla_proxy(request: ValhallaRequest):
             "ngrok-skip-browser-warning": "true"
         }
         
-        response = requests.post(VALHALLA_URL, json=payload, headers=headers, timeout=15, verify=False)
+        response = await post_async(VALHALLA_URL, json=payload, headers=headers, timeout=15, verify=False)
         
         if response.status_code == 200:
             return response.json()
@@ -64,21 +88,64 @@ async def valhalla_proxy(request: ValhallaRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/workers/stats")
+async def worker_stats_endpoint():
+    return workers.stats()
+
+
+@app.get("/api/cache/stats")
+async def cache_stats_endpoint():
+    return {
+        "route_cache": route_cache.stats(),
+        "route_geometry_cache": route_geometry_cache.stats(),
+        "geocode_cache": geocode_cache.stats()
+    }
+
+
+@app.get("/api/admin/duration-lookup")
+async def duration_lookup_info_endpoint():
+    return get_duration_index().info()
+
+
+def require_admin_token(token: Optional[str]) -> None:
+    """403 kecuali header X-Admin-Token sama dengan ADMIN_TOKEN (CORS terbuka untuk semua origin)."""
+    if not ADMIN_TOKEN or not token or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin token tidak valid")
+
+
+@app.post("/api/admin/duration-lookup/reload")
+async def duration_lookup_reload_endpoint(x_admin_token: Optional[str] = Header(None)):
+    require_admin_token(x_admin_token)
+    # Optimasi yang sedang jalan tetap memakai index lama sampai selesai
+    index = await run_async(reload_duration_index, True)
+    return index.info()
+
+
+async def read_uploads(file_dest: UploadFile, file_orig: UploadFile):
+    content_dest = await file_dest.read()
+    content_orig = await file_orig.read()
+    
+    try:
+        df_d = await run_in_worker(read_upload, content_dest, file_dest.filename)
+        df_o = await run_in_worker(read_upload, content_orig, file_orig.filename)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return df_d, df_o
+
+
 @app.post("/api/validate")
 async def validate_endpoint(
     file_dest: UploadFile = File(...),
     file_orig: UploadFile = File(...)
 ):
     try:
-        content_dest = await file_dest.read()
-        content_orig = await file_orig.read()
-
-        df_d = pd.read_excel(io.BytesIO(content_dest))
-        df_o = pd.read_excel(io.BytesIO(content_orig))
+        df_d, df_o = await read_uploads(file_dest, file_orig)
 
-        result = validate_data(df_d, df_o)
+        result = await run_in_worker(validate_data, df_d, df_o)
         return result
 
+    except (HTTPException, WorkerPoolFull):
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -88,7 +155,7 @@ async def validate_endpoint(
 @app.post("/api/geocode-single")
 async def geocode_single_endpoint(request: GeocodeSingleRequest):
     try:
-        result = geocode_single_address(request.address)
+        result = await run_async(geocode_single_address, request.address)
         return result
     except Exception as e:
         import traceback
@@ -96,32 +163,112 @@ async def geocode_single_endpoint(request: GeocodeSingleRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def read_optimize_upload(file_dest: UploadFile, file_orig: UploadFile):
+    df_d, df_o = await read_uploads(file_dest, file_orig)
+    
+    required = ['NO SOPT', 'ALAMAT', 'CABANG', 'ACT. LOAD DATE', 'CUST ID'] 
+    
+    missing_d = [col for col in required if col not in df_d.columns]
+    missing_o = [col for col in required if col not in df_o.columns]
+    
+    if missing_d:
+        raise HTTPException(400, f"File Destinasi kurang kolom: {missing_d}")
+    if missing_o:
+        raise HTTPException(400, f"File Origin kurang kolom: {missing_o}")
+    
+    return df_d, df_o
+
+
+def check_session_id(session_id: Optional[str]) -> None:
+    if session_id:
+        try:
+            validate_session_id(session_id)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+
+
 @app.post("/api/optimize")
 async def optimize_endpoint(
     file_dest: UploadFile = File(...),
-    file_orig: UploadFile = File(...)
+    file_orig: UploadFile = File(...),
+    distance_provider: Optional[str] = Form(None),
+    session_id: Optional[str] = Form(None),
+    validation_token: Optional[str] = Form(None)
 ):
     try:
-        content_dest = await file_dest.read()
-        content_orig = await file_orig.read()
-        
-        df_d = pd.read_excel(io.BytesIO(content_dest))
-        df_o = pd.read_excel(io.BytesIO(content_orig))
+        df_d, df_o = await read_optimize_upload(file_dest, file_orig)
+        check_session_id(session_id)
+        check_session_id(validation_token)
         
-        required = ['NO SOPT', 'ALAMAT', 'CABANG', 'ACT. LOAD DATE', 'CUST ID'] 
-        
-        missing_d = [col for col in required if col not in df_d.columns]
-        missing_o = [col for col in required if col not in df_o.columns]
-        
-        if missing_d:
-            raise HTTPException(400, f"File Destinasi kurang kolom: {missing_d}")
-        if missing_o:
-            raise HTTPException(400, f"File Origin kurang kolom: {missing_o}")
-        
-        results = process_optimization(df_d, df_o)
+        try:
+            results = await run_in_worker(
+                process_optimization, df_d, df_o,
+                distance_provider=distance_provider,
+                session_id=session_id,
+                validation_token=validation_token
+            )
+        except ValueError as e:
+            raise HTTPException(400, str(e))
         return results
         
+    except (HTTPException, WorkerPoolFull):
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/optimize/jobs")
+async def optimize_job_submit_endpoint(
+    file_dest: UploadFile = File(...),
+    file_orig: UploadFile = File(...),
+    distance_provider: Optional[str] = Form(None),
+    session_id: Optional[str] = Form(None),
+    validation_token: Optional[str] = Form(None)
+):
+    try:
+        df_d, df_o = await read_optimize_upload(file_dest, file_orig)
+        check_session_id(session_id)
+        check_session_id(validation_token)
+        job = start_job(
+            process_optimization, df_d, df_o,
+            distance_provider=distance_provider,
+            session_id=session_id,
+            validation_token=validation_token
+        )
+        return {"job_id": job["job_id"], "status": job["status"]}
+        
+    except (HTTPException, WorkerPoolFull):
+        raise
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/optimize/jobs/{job_id}")
+async def optimize_job_status_endpoint(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(404, f"Job tidak ditemukan: {job_id}")
+    return job
+
+
+@app.get("/api/optimize/jobs/{job_id}/events")
+async def optimize_job_events_endpoint(job_id: str):
+    if get_job(job_id) is None:
+        raise HTTPException(404, f"Job tidak ditemukan: {job_id}")
+    return StreamingResponse(stream_job_events(job_id), media_type="application/x-ndjson")
+
+
+@app.get("/api/optimize/jobs/{job_id}/result")
+async def optimize_job_result_endpoint(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(404, f"Job tidak ditemukan: {job_id}")
+    if job["status"] == JOB_STATUS_FAILED:
+        raise HTTPException(500, job.get("error") or "Job gagal")
+    if job["status"] != JOB_STATUS_DONE:
+        raise HTTPException(409, f"Job belum selesai (status: {job['status']})")
+    return get_job_result(job_id)
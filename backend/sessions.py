@@ -0,0 +1,98 @@
+import os
+import pickle
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+OPTIMIZE_SESSION_DIR = Path(os.getenv(
+    "OPTIMIZE_SESSION_DIR",
+    str(Path(__file__).parent / "cache" / "sessions")
+))
+OPTIMIZE_SESSION_TTL_HOURS = float(os.getenv("OPTIMIZE_SESSION_TTL_HOURS", "12"))
+OPTIMIZE_SESSION_MAX = int(os.getenv("OPTIMIZE_SESSION_MAX", "50"))   # Maks session yang disimpan
+
+SESSION_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+SESSION_STATE_VERSION = 1
+
+SESSION_KIND_OPTIMIZE = "optimize"       # Edge table & solusi per partisi (optimasi inkremental)
+SESSION_KIND_VALIDATION = "validation"   # Kolom hasil validasi (tanggal, koordinat, cabang)
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+def validate_session_id(session_id: str) -> str:
+    """Session id dipakai sebagai nama file, jadi hanya hex uuid yang diterima."""
+    if not SESSION_ID_PATTERN.match(session_id or ""):
+        raise ValueError(f"Session id tidak valid: '{session_id}'")
+    return session_id
+
+
+def _session_path(session_id: str) -> Path:
+    return OPTIMIZE_SESSION_DIR / f"{validate_session_id(session_id)}.pkl"
+
+
+def load_session(session_id: str, kind: str = SESSION_KIND_OPTIMIZE) -> Optional[Dict[str, Any]]:
+    """
+    State session jenis kind (mis. edge table & solusi per partisi), atau None
+    jika session tidak ada, kedaluwarsa, dari jenis lain, atau dari versi format lain.
+    """
+    path = _session_path(session_id)
+    try:
+        if time.time() - path.stat().st_mtime > OPTIMIZE_SESSION_TTL_HOURS * 3600:
+            return None
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Warning: session {session_id} tidak bisa dibaca: {e}")
+        return None
+
+    if state.get("version") != SESSION_STATE_VERSION or state.get("kind", SESSION_KIND_OPTIMIZE) != kind:
+        return None
+    return state
+
+
+def save_session(session_id: str, state: Dict[str, Any], kind: str = SESSION_KIND_OPTIMIZE) -> None:
+    """Tulis state secara atomik (file sementara + rename), lalu buang session lama."""
+    path = _session_path(session_id)
+    try:
+        OPTIMIZE_SESSION_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump({**state, "kind": kind, "version": SESSION_STATE_VERSION}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: session {session_id} tidak bisa disimpan: {e}")
+        return
+    evict_sessions()
+
+
+def evict_sessions() -> int:
+    """Hapus session kedaluwarsa, lalu yang paling lama jika melebihi OPTIMIZE_SESSION_MAX."""
+    files = []
+    for path in OPTIMIZE_SESSION_DIR.glob("*.pkl"):
+        try:
+            files.append((path.stat().st_mtime, path))
+        except OSError:
+            continue   # Sudah dihapus proses lain
+    files.sort()
+
+    cutoff = time.time() - OPTIMIZE_SESSION_TTL_HOURS * 3600
+    stale = [path for mtime, path in files if mtime < cutoff]
+    fresh = [path for mtime, path in files if mtime >= cutoff]
+    if OPTIMIZE_SESSION_MAX > 0 and len(fresh) > OPTIMIZE_SESSION_MAX:
+        stale += fresh[:len(fresh) - OPTIMIZE_SESSION_MAX]
+
+    removed = 0
+    for path in stale:
+        try:
+            path.unlink()
+            removed += 1
+        except OSError:
+            pass
+    return removed
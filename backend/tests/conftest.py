@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Modul backend di-import flat (seperti saat uvicorn dijalankan dari backend/)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,95 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import date_parsing
+from date_parsing import parse_datetime_column
+
+
+class _NoStrftime(datetime.datetime):
+    """Sel datetime yang gagal jika diformat satu per satu."""
+
+    def strftime(self, fmt):
+        raise AssertionError("ISO harus diformat tervektorisasi, bukan per nilai")
+
+
+@pytest.fixture
+def per_value_calls(monkeypatch):
+    """Hitung nilai yang lewat parse_datetime_value (jalur lambat per nilai)."""
+    calls = []
+    parse_value = date_parsing.parse_datetime_value
+
+    def counting(value):
+        calls.append(value)
+        return parse_value(value)
+
+    monkeypatch.setattr(date_parsing, "parse_datetime_value", counting)
+    return calls
+
+
+def test_datetime64_column_is_not_parsed(monkeypatch):
+    def fail(*args):
+        raise AssertionError("kolom datetime64 tidak boleh di-parse ulang")
+
+    monkeypatch.setattr(date_parsing, "infer_datetime_format", fail)
+    monkeypatch.setattr(date_parsing, "parse_datetime_value", fail)
+    series = pd.Series(
+        [pd.Timestamp("2025-03-01 10:00"), pd.NaT, pd.Timestamp("2025-03-02 06:30:15")],
+        index=[5, 6, 7],
+        name="ACT. LOAD DATE"
+    ).dt.tz_localize("Asia/Jakarta")
+
+    column, iso, errors = parse_datetime_column(series)
+
+    assert column.dtype == "datetime64[ns]"
+    assert column.name == "ACT. LOAD DATE" and list(column.index) == [5, 6, 7]
+    assert iso == ["2025-03-01T10:00:00", None, "2025-03-02T06:30:15"]
+    assert errors == [None, "Nilai kosong", None]
+
+
+def test_uniform_strings_skip_per_value_fallback(per_value_calls):
+    dates = pd.date_range("2025-01-01", periods=5000, freq="17min")
+    values = list(dates.strftime("%d/%m/%Y %H:%M")) + ["garbage", "3 Mar 2025 10:00", "", None]
+
+    column, iso, errors = parse_datetime_column(pd.Series(values, dtype=object))
+
+    assert per_value_calls == ["garbage", "3 Mar 2025 10:00"]
+    assert (column[:5000].to_numpy() == dates.to_numpy()).all()
+    assert iso[:2] == ["2025-01-01T00:00:00", "2025-01-01T00:17:00"]
+    assert iso[5001] == "2025-03-03T10:00:00"
+    assert errors[5000].startswith("Format tidak dikenali")
+    assert errors[5002:] == ["Nilai kosong", "Nilai kosong"]
+    assert column[5000:].isna().tolist() == [True, False, True, True]
+
+
+def test_timestamp_cells_keep_wall_time(per_value_calls):
+    values = [
+        pd.Timestamp("2025-03-02 06:00", tz="Asia/Jakarta"),
+        _NoStrftime(2025, 3, 1, 5),
+        datetime.datetime(1, 1, 1),
+        np.nan,
+    ]
+
+    column, iso, errors = parse_datetime_column(pd.Series(values, dtype=object))
+
+    assert per_value_calls == []
+    assert column[:2].tolist() == [pd.Timestamp("2025-03-02 06:00"), pd.Timestamp("2025-03-01 05:00")]
+    # Di luar rentang datetime64[ns]: NaT untuk optimasi, tapi tetap valid di validasi
+    assert pd.isna(column[2]) and errors[2] is None and iso[2] is not None
+    assert iso[:2] == ["2025-03-02T06:00:00", "2025-03-01T05:00:00"]
+    assert errors[3] == "Nilai kosong"
+
+
+def test_format_inference_is_vectorized(monkeypatch):
+    def fail(*args):
+        raise AssertionError("inferensi format tidak boleh strptime per string")
+
+    monkeypatch.setattr(date_parsing, "_strptime_or_none", fail)
+
+    assert date_parsing.infer_datetime_format(["01/03/2025 10:00", "02/03/2025 11:30"]) == "%d/%m/%Y %H:%M"
+    # Ada hari > 12 di posisi kedua: kolom MM/DD
+    assert date_parsing.infer_datetime_format(["01/03/2025 10:00", "12/31/2025 10:00"]) == "%m/%d/%Y %H:%M"
+    assert date_parsing.infer_datetime_format(["2025-03-01 10:00:00", "garbage"]) == "%Y-%m-%d %H:%M:%S"
+    assert date_parsing.infer_datetime_format(["garbage"]) is None
@@ -0,0 +1,75 @@
+import pytest
+import requests
+
+import logic
+from cache_store import PersistentCache
+from http_client import TokenBucket
+
+
+class _Response:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+class _Session:
+    def __init__(self, outcome):
+        self.outcome = outcome
+        self.calls = 0
+
+    def get(self, *args, **kwargs):
+        self.calls += 1
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+@pytest.fixture
+def geocode_env(tmp_path, monkeypatch):
+    cache = PersistentCache(
+        str(tmp_path / "geocode.sqlite3"), table="geocodes", max_entries=100, ttl_seconds=3600
+    )
+    monkeypatch.setattr(logic, "geocode_cache", cache)
+    monkeypatch.setattr(logic, "get_rate_limiter", lambda *args: TokenBucket(0))
+    monkeypatch.setattr(logic.time, "sleep", lambda seconds: None)
+
+    def use(outcome):
+        session = _Session(outcome)
+        monkeypatch.setattr(logic, "get_session", lambda: session)
+        return session
+
+    return cache, use
+
+
+@pytest.mark.parametrize("outcome", [
+    requests.exceptions.Timeout(),
+    requests.exceptions.ConnectionError(),
+    _Response(503),
+    _Response(429),
+])
+def test_transport_failure_is_not_cached(geocode_env, outcome):
+    cache, use = geocode_env
+    session = use(outcome)
+
+    assert logic.geocode_helper("Jl. Sudirman 1, Jakarta", max_retries=2) == (None, None)
+    assert session.calls >= 1
+    assert len(cache) == 0
+
+
+def test_not_found_is_cached(geocode_env):
+    cache, use = geocode_env
+    use(_Response(200, []))
+
+    assert logic.geocode_helper("Alamat Tidak Ada") == (None, None)
+    assert cache.get(logic.normalize_address("Alamat Tidak Ada")) == [None, None]
+
+
+def test_found_is_cached(geocode_env):
+    cache, use = geocode_env
+    use(_Response(200, [{"lat": "-6.2", "lon": "106.8"}]))
+
+    assert logic.geocode_helper("Jl. Thamrin 2, Jakarta") == (-6.2, 106.8)
+    assert cache.get(logic.normalize_address("Jl. Thamrin 2, Jakarta")) == [-6.2, 106.8]
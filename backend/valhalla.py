@@ -0,0 +1,306 @@
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import urllib3
+
+from cache_store import PersistentCache
+from http_client import get_session, map_concurrent, run_async
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+VALHALLA_URL = os.getenv("VALHALLA_URL", "http://localhost:8002/route")
+VALHALLA_MATRIX_URL = os.getenv(
+    "VALHALLA_MATRIX_URL",
+    VALHALLA_URL.rsplit("/", 1)[0] + "/sources_to_targets"
+)
+VALHALLA_MATRIX_MAX_LOCATIONS = int(os.getenv("VALHALLA_MATRIX_MAX_LOCATIONS", "50"))  # Batas sources/targets per request
+VALHALLA_MATRIX_TIMEOUT = 60
+
+ROUTING_MODE_ROUTE = "route"      # Satu request /route per pasangan
+ROUTING_MODE_MATRIX = "matrix"    # Batch /sources_to_targets per cabang
+ROUTING_MODE = os.getenv("ROUTING_MODE", ROUTING_MODE_ROUTE)
+
+ROUTE_CACHE_PATH = os.getenv(
+    "ROUTE_CACHE_PATH",
+    str(Path(__file__).parent / "cache" / "route_cache.sqlite3")
+)
+ROUTE_CACHE_MAX_ENTRIES = int(os.getenv("ROUTE_CACHE_MAX_ENTRIES", "500000"))
+ROUTE_CACHE_TTL_DAYS = float(os.getenv("ROUTE_CACHE_TTL_DAYS", "30"))
+
+# Jarak & waktu per leg (dipakai cost matrix)
+route_cache = PersistentCache(
+    ROUTE_CACHE_PATH,
+    table="routes",
+    max_entries=ROUTE_CACHE_MAX_ENTRIES,
+    ttl_seconds=ROUTE_CACHE_TTL_DAYS * 86400
+)
+# Geometry hanya untuk pasangan hasil assignment
+route_geometry_cache = PersistentCache(
+    ROUTE_CACHE_PATH,
+    table="route_geometries",
+    max_entries=ROUTE_CACHE_MAX_ENTRIES,
+    ttl_seconds=ROUTE_CACHE_TTL_DAYS * 86400
+)
+
+def _create_route_cache_key(lat1: float, lon1: float, lat2: float, lon2: float) -> str:
+    return f"{round(lat1, 5)},{round(lon1, 5)}|{round(lat2, 5)},{round(lon2, 5)}"
+
+def _request_valhalla_route(
+    lat_start: float,
+    lon_start: float,
+    lat_end: float,
+    lon_end: float,
+    with_geometry: bool
+) -> Optional[Dict[str, Any]]:
+    payload = {
+        "locations": [
+            {"lat": lat_start, "lon": lon_start},
+            {"lat": lat_end, "lon": lon_end}
+        ],
+        "costing": "truck",
+        "units": "km"
+    }
+    if not with_geometry:
+        # Tanpa manuver/instruksi: payload jauh lebih kecil
+        payload["directions_type"] = "none"
+    
+    headers = {
+        "Content-Type": "application/json",
+        "ngrok-skip-browser-warning": "true"
+    }
+    
+    try:
+        response = get_session().post(
+            VALHALLA_URL,
+            json=payload,
+            headers=headers,
+            timeout=15,
+            verify=False
+        )
+        
+        if response.status_code == 200:
+            return response.json()
+            
+    except Exception:
+        pass
+    
+    return None
+
+def get_valhalla_distance(
+    lat_start: float,
+    lon_start: float,
+    lat_end: float,
+    lon_end: float
+) -> Tuple[Optional[float], Optional[float]]:
+    """Jarak (km) & waktu (jam) saja, tanpa geometry. Dipakai saat membangun cost matrix."""
+    cache_key = _create_route_cache_key(lat_start, lon_start, lat_end, lon_end)
+    
+    cached = route_cache.get(cache_key)
+    if cached is not None:
+        return (cached[0], cached[1])
+    
+    data = _request_valhalla_route(lat_start, lon_start, lat_end, lon_end, with_geometry=False)
+    if data is None:
+        return (None, None)
+    
+    try:
+        distance_km = data['trip']['summary']['length']
+        time_hours = data['trip']['summary']['time'] / 3600.0
+    except (KeyError, TypeError):
+        return (None, None)
+    
+    route_cache.set(cache_key, (distance_km, time_hours))
+    return (distance_km, time_hours)
+
+def get_valhalla_route(
+    lat_start: float,
+    lon_start: float,
+    lat_end: float,
+    lon_end: float
+) -> Tuple[Optional[float], Optional[float], Optional[str]]:
+    """Rute lengkap dengan geometry (encoded polyline). Hanya untuk pasangan terpilih."""
+    cache_key = _create_route_cache_key(lat_start, lon_start, lat_end, lon_end)
+    
+    cached = route_geometry_cache.get(cache_key)
+    if cached is not None:
+        return tuple(cached)
+    
+    data = _request_valhalla_route(lat_start, lon_start, lat_end, lon_end, with_geometry=True)
+    if data is None:
+        return (None, None, None)
+    
+    try:
+        shape = data['trip']['legs'][0]['shape']
+        distance_km = data['trip']['summary']['length']
+        time_hours = data['trip']['summary']['time'] / 3600.0
+    except (KeyError, IndexError, TypeError):
+        return (None, None, None)
+    
+    result = (distance_km, time_hours, shape)
+    route_geometry_cache.set(cache_key, result)
+    route_cache.set(cache_key, (distance_km, time_hours))
+    return result
+
+async def get_valhalla_route_async(
+    lat_start: float,
+    lon_start: float,
+    lat_end: float,
+    lon_end: float
+) -> Tuple[Optional[float], Optional[float], Optional[str]]:
+    return await run_async(get_valhalla_route, lat_start, lon_start, lat_end, lon_end)
+
+def prefetch_routes(legs: List[Tuple[float, float, float, float]]) -> None:
+    """
+    Isi route_cache (jarak & waktu saja) untuk semua leg secara paralel
+    (maks HTTP_MAX_CONCURRENCY), sehingga loop cost matrix cukup membaca cache.
+    """
+    pending = [
+        leg for leg in dict.fromkeys(legs)
+        if route_cache.get(_create_route_cache_key(*leg)) is None
+    ]
+    if not pending:
+        return
+    print(f"Routing {len(pending)} leg secara paralel...")
+    map_concurrent(lambda leg: get_valhalla_distance(*leg), pending)
+
+def fetch_route_geometries(
+    legs: List[Tuple[float, float, float, float]]
+) -> Dict[Tuple[float, float, float, float], Optional[str]]:
+    """Ambil geometry secara paralel, hanya untuk leg yang diminta (pasangan hasil assignment)."""
+    unique_legs = list(dict.fromkeys(legs))
+    shapes = map_concurrent(lambda leg: get_valhalla_route(*leg)[2], unique_legs)
+    return dict(zip(unique_legs, shapes))
+
+def _chunked(items: List[Any], size: int) -> List[List[Any]]:
+    return [items[k:k + size] for k in range(0, len(items), size)]
+
+def _request_valhalla_matrix(
+    source_chunk: List[Tuple[float, float]],
+    target_chunk: List[Tuple[float, float]]
+) -> Dict[str, Tuple[float, Optional[float]]]:
+    """Satu request /sources_to_targets; {} jika gagal (pemanggil fallback ke /route)."""
+    payload = {
+        "sources": [{"lat": lat, "lon": lon} for lat, lon in source_chunk],
+        "targets": [{"lat": lat, "lon": lon} for lat, lon in target_chunk],
+        "costing": "truck",
+        "units": "km"
+    }
+    headers = {
+        "Content-Type": "application/json",
+        "ngrok-skip-browser-warning": "true"
+    }
+
+    try:
+        response = get_session().post(
+            VALHALLA_MATRIX_URL,
+            json=payload,
+            headers=headers,
+            timeout=VALHALLA_MATRIX_TIMEOUT,
+            verify=False
+        )
+        if response.status_code != 200:
+            print(f"  Warning: matrix request gagal (HTTP {response.status_code}), fallback ke /route.")
+            return {}
+        rows = response.json()['sources_to_targets']
+    except Exception as e:
+        print(f"  Warning: matrix request gagal ({e}), fallback ke /route.")
+        return {}
+
+    table: Dict[str, Tuple[float, Optional[float]]] = {}
+    for (src_lat, src_lon), row in zip(source_chunk, rows):
+        for (tgt_lat, tgt_lon), cell in zip(target_chunk, row):
+            distance_km = cell.get('distance')
+            if distance_km is None:
+                continue
+            time_sec = cell.get('time')
+            key = _create_route_cache_key(src_lat, src_lon, tgt_lat, tgt_lon)
+            table[key] = (distance_km, time_sec / 3600.0 if time_sec is not None else None)
+    return table
+
+def _fetch_matrix_blocks(
+    blocks: List[Tuple[List[Tuple[float, float]], List[Tuple[float, float]]]]
+) -> Dict[str, Tuple[float, Optional[float]]]:
+    """
+    Jarak & waktu untuk setiap blok sources x targets via /sources_to_targets.
+    Sel yang sudah ada di route_cache langsung dipakai; source/target yang
+    semua selnya ter-cache tidak ikut dikirim. Sisanya dipecah per
+    VALHALLA_MATRIX_MAX_LOCATIONS agar tidak melewati limit server, chunk dari
+    semua blok dikirim paralel lewat executor bulk, dan hasilnya ditulis ke
+    route_cache. Pasangan yang gagal/unreachable tidak dimasukkan.
+    """
+    table: Dict[str, Tuple[float, Optional[float]]] = {}
+    chunk_size = max(1, VALHALLA_MATRIX_MAX_LOCATIONS)
+    chunks = []
+    for sources, targets in blocks:
+        keys = {
+            (source, target): _create_route_cache_key(*source, *target)
+            for source in sources for target in targets
+        }
+        cached = route_cache.get_many(keys.values())
+        table.update((key, tuple(value)) for key, value in cached.items())
+
+        sources = [s for s in sources if any(keys[(s, t)] not in cached for t in targets)]
+        targets = [t for t in targets if any(keys[(s, t)] not in cached for s in sources)]
+        chunks.extend(
+            (source_chunk, target_chunk)
+            for source_chunk in _chunked(sources, chunk_size)
+            for target_chunk in _chunked(targets, chunk_size)
+        )
+
+    for chunk_table in map_concurrent(lambda chunk: _request_valhalla_matrix(*chunk), chunks):
+        table.update(chunk_table)
+        route_cache.set_many({
+            key: value for key, value in chunk_table.items() if value[1] is not None
+        })
+
+    return table
+
+def _matrix_blocks(
+    legs: List[Tuple[float, float, float, float]]
+) -> List[Tuple[List[Tuple[float, float]], List[Tuple[float, float]]]]:
+    """
+    Kelompokkan leg per komponen terhubung graf bipartit source-target. Satu
+    blok = source x target dari leg yang saling terhubung, jadi leg port->alamat
+    (1 x N), alamat->port (N x 1) dan dest->origin tidak pernah digabung dalam
+    satu cross product.
+    """
+    parent: Dict[Tuple[str, Tuple[float, float]], Tuple[str, Tuple[float, float]]] = {}
+
+    def find(node: Tuple[str, Tuple[float, float]]) -> Tuple[str, Tuple[float, float]]:
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for lat_start, lon_start, lat_end, lon_end in legs:
+        source = ("source", (lat_start, lon_start))
+        target = ("target", (lat_end, lon_end))
+        parent.setdefault(source, source)
+        parent.setdefault(target, target)
+        root_source, root_target = find(source), find(target)
+        if root_source != root_target:
+            parent[root_source] = root_target
+
+    blocks: Dict[Tuple[str, Tuple[float, float]], Tuple[List[Tuple[float, float]], List[Tuple[float, float]]]] = {}
+    for node in parent:
+        sources, targets = blocks.setdefault(find(node), ([], []))
+        (sources if node[0] == "source" else targets).append(node[1])
+    return list(blocks.values())
+
+def prefetch_matrix(
+    legs: List[Tuple[float, float, float, float]]
+) -> Dict[str, Tuple[float, Optional[float]]]:
+    """
+    Mode matrix: leg yang belum ada di route_cache dikelompokkan per blok
+    terhubung (_matrix_blocks), bukan satu cross product semua start x end.
+    Returns jarak & waktu semua leg yang berhasil (cache + Valhalla).
+    """
+    legs = list(dict.fromkeys(legs))
+    keys = [_create_route_cache_key(*leg) for leg in legs]
+    cached = route_cache.get_many(keys)
+    table = {key: tuple(cached[key]) for key in keys if key in cached}
+    pending = [leg for leg, key in zip(legs, keys) if key not in cached]
+    if pending:
+        table.update(_fetch_matrix_blocks(_matrix_blocks(pending)))
+    return table
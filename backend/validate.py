@@ -1,16 +1,22 @@
-import time
-from datetime import datetime
 from difflib import get_close_matches
-from typing import Any, Dict, List, Optional, Tuple
+from itertools import repeat
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 
+import numpy as np
 import pandas as pd
 
+from date_parsing import parse_datetime_column
 from logic import (
     CABANG_ALIASES,
     PORT_LOCATIONS,
+    column_fingerprint,
+    geocode_addresses,
     geocode_helper,
-    geocode_cache,
+    normalize_cabang,
 )
+from sessions import SESSION_KIND_VALIDATION, new_session_id, save_session
+
+T = TypeVar("T")
 
 REQUIRED_COLUMNS = [
     'NO SOPT', 'ALAMAT', 'CABANG', 'ACT. LOAD DATE',
@@ -42,24 +48,13 @@ VALID_SERVICE_TYPE = {'INTERCHANGE', 'STRIPPING'}
 VALID_GRADE_CONT = {'A', 'B', 'C', '-', '', 'NAN', 'NONE'}
 VALID_CABANG_CODES = set(PORT_LOCATIONS.keys())
 VALID_CABANG_NAMES = set(CABANG_ALIASES.keys())
+CABANG_FUZZY_CANDIDATES = list(VALID_CABANG_NAMES) + list(VALID_CABANG_CODES)
 
-DATETIME_FORMATS = [
-    '%Y-%m-%d %H:%M:%S',
-    '%Y-%m-%d %H:%M',
-    '%Y-%m-%dT%H:%M:%S',
-    '%Y-%m-%dT%H:%M',
-    '%d/%m/%Y %H:%M:%S',
-    '%d/%m/%Y %H:%M',
-    '%d-%m-%Y %H:%M:%S',
-    '%d-%m-%Y %H:%M',
-    '%d %b %Y %H:%M',
-    '%d %B %Y %H:%M',
-    '%Y/%m/%d %H:%M',
-    '%Y-%m-%d',
-    '%d/%m/%Y',
-    '%d-%m-%Y',
-]
-
+VALUE_COLUMNS = {
+    'SIZE CONT': VALID_SIZE_CONT,
+    'SERVICE TYPE': VALID_SERVICE_TYPE,
+    'GRADE CONT': VALID_GRADE_CONT,
+}
 
 def _normalize_column_name(raw: str) -> str:
     """Normalize a column name using aliases."""
@@ -73,41 +68,41 @@ def _find_column_suggestion(col_name: str, existing_cols: List[str]) -> Optional
     return matches[0] if matches else None
 
 
-def _try_parse_datetime(value: Any) -> Tuple[Optional[str], Optional[str]]:
-    """
-    Try to parse a value into ISO datetime string.
-    Returns (parsed_iso, error_message).
-    """
-    if value is None or (isinstance(value, float) and pd.isna(value)):
-        return None, "Nilai kosong"
+def _map_unique(values: pd.Series, func: Callable[[Any], T]) -> List[T]:
+    """func(value) untuk setiap nilai, tetapi dievaluasi sekali per nilai unik."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    mapped = np.empty(len(uniques), dtype=object)
+    for k, value in enumerate(uniques):
+        mapped[k] = func(value)
+    return mapped[codes].tolist()
 
-    if isinstance(value, datetime):
-        return value.strftime('%Y-%m-%dT%H:%M:%S'), None
 
-    if isinstance(value, pd.Timestamp):
-        return value.strftime('%Y-%m-%dT%H:%M:%S'), None
+def _mask_unique(values: pd.Series, func: Callable[[pd.Series], Any]) -> np.ndarray:
+    """Mask boolean tervektorisasi func, dievaluasi pada nilai unik saja lalu disebar ke semua baris."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    mask = func(pd.Series(np.asarray(uniques, dtype=object), dtype=object))
+    return np.asarray(mask, dtype=bool)[codes]
 
-    s = str(value).strip()
-    if not s or s.lower() in ('nat', 'nan', 'none', ''):
-        return None, "Nilai kosong"
 
-    # Try each format
-    for fmt in DATETIME_FORMATS:
-        try:
-            dt = datetime.strptime(s, fmt)
-            return dt.strftime('%Y-%m-%dT%H:%M:%S'), None
-        except ValueError:
-            continue
+def _blank_values(values: pd.Series) -> np.ndarray:
+    """
+    Kosong = NA atau string yang isinya spasi saja. Hanya sel string yang
+    di-strip; tanggal/angka tidak pernah kosong kecuali NA, jadi sel
+    Timestamp tidak perlu diformat ke string.
+    """
+    blank = values.isna().to_numpy(copy=True)
+    is_text = np.fromiter(map(isinstance, values, repeat(str)), dtype=bool, count=len(values))
+    if is_text.any():
+        blank[is_text] = (values[is_text].str.strip() == '').to_numpy()
+    return blank
 
-    # Try pandas as last resort (with dayfirst=True for DD/MM convention)
-    try:
-        dt = pd.to_datetime(s, dayfirst=True)
-        if pd.notna(dt):
-            return dt.strftime('%Y-%m-%dT%H:%M:%S'), None
-    except Exception:
-        pass
 
-    return None, f"Format tidak dikenali: '{s}'"
+def _address_key(value: Any) -> Optional[str]:
+    """Alamat yang sudah di-strip, atau None jika kosong."""
+    addr = str(value).strip()
+    if not addr or addr.lower() in ('nan', 'none', ''):
+        return None
+    return addr
 
 
 def _validate_cabang(value: Any) -> Tuple[Optional[str], Optional[str]]:
@@ -131,8 +126,7 @@ def _validate_cabang(value: Any) -> Tuple[Optional[str], Optional[str]]:
         return CABANG_ALIASES[s], None
 
     # Fuzzy match on names
-    all_names = list(VALID_CABANG_NAMES) + list(VALID_CABANG_CODES)
-    matches = get_close_matches(s, all_names, n=1, cutoff=0.7)
+    matches = get_close_matches(s, CABANG_FUZZY_CANDIDATES, n=1, cutoff=0.7)
     if matches:
         suggestion = matches[0]
         if suggestion in CABANG_ALIASES:
@@ -172,10 +166,8 @@ def geocode_single_address(address: str) -> Dict[str, Any]:
 
     address = address.strip()
 
-    if address in geocode_cache and geocode_cache[address] == (None, None):
-        del geocode_cache[address]
-
-    lat, lon = geocode_helper(address)
+    # Alamat yang baru diedit user selalu dicoba ulang meski pernah gagal
+    lat, lon = geocode_helper(address, retry_failed=True)
 
     if lat is not None and lon is not None:
         return {"lat": lat, "lon": lon, "error": None}
@@ -183,10 +175,27 @@ def geocode_single_address(address: str) -> Dict[str, Any]:
         return {"lat": None, "lon": None, "error": f"Alamat tidak ditemukan: '{address}'"}
 
 
+def _unique_addresses(df: pd.DataFrame) -> List[str]:
+    """Alamat unik (sudah di-strip, tanpa yang kosong) dari kolom alamat, apa pun alias namanya."""
+    for col in df.columns:
+        if _normalize_column_name(col) == 'ALAMAT':
+            addresses = _map_unique(df[col], _address_key)
+            return list(dict.fromkeys(addr for addr in addresses if addr is not None))
+    return []
+
+
 def validate_dataframe(
     df: pd.DataFrame,
-    label: str = "data"
+    label: str = "data",
+    address_coords: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+    prepared: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
+    """
+    Validasi satu DataFrame. address_coords berisi hasil geocode yang sudah
+    dijalankan pemanggil (validate_data menggabungkan bongkar & muat); jika
+    None, alamat unik di-geocode di sini. Jika prepared diberikan, diisi kolom
+    tanggal & cabang hasil parse untuk dipakai ulang optimasi (logic.prepare_columns).
+    """
     result: Dict[str, Any] = {
         "column_issues": [],
         "rows": [],
@@ -229,97 +238,105 @@ def validate_dataframe(
                 "type": "missing"
             })
 
-    unique_addresses = {}
+    n = len(df)
+    summary = result["summary"]
     address_col_exists = 'ALAMAT' in df.columns
     date_col_exists = 'ACT. LOAD DATE' in df.columns
 
-    if address_col_exists:
-        for idx, row in df.iterrows():
-            addr = str(row.get('ALAMAT', '')).strip()
-            if addr and addr.lower() not in ('nan', 'none', ''):
-                unique_addresses[addr] = None
-
-    if unique_addresses:
-        total = len(unique_addresses)
-        print(f"[Validate] Geocoding {total} alamat unik untuk {label}...")
-        for i, addr in enumerate(unique_addresses.keys()):
-            print(f"  [{i + 1}/{total}] Geocoding: {addr[:50]}...")
-            lat, lon = geocode_helper(addr)
-            unique_addresses[addr] = (lat, lon)
-            time.sleep(1.2 if lat is not None else 0.5)
-
-    for idx, row in df.iterrows():
-        row_result: Dict[str, Any] = {
-            "index": int(idx),
-            "datetime_parsed": None,
-            "datetime_error": None,
-            "geocode_lat": None,
-            "geocode_lon": None,
-            "geocode_error": None,
-            "value_warnings": [],
-        }
+    datetime_parsed: List[Optional[str]] = [None] * n
+    if date_col_exists:
+        parsed_dates, datetime_parsed, datetime_errors = parse_datetime_column(df['ACT. LOAD DATE'])
+        if prepared is not None:
+            prepared['date_fingerprint'] = column_fingerprint(df['ACT. LOAD DATE'])
+            prepared['dates'] = parsed_dates.to_numpy()
+        summary["datetime_success"] = sum(parsed is not None for parsed in datetime_parsed)
+        summary["datetime_failed"] = n - summary["datetime_success"]
+    else:
+        datetime_errors = ["Kolom 'ACT. LOAD DATE' tidak ada"] * n
+        summary["datetime_failed"] = n
 
-        if date_col_exists:
-            date_val = row.get('ACT. LOAD DATE')
-            parsed, error = _try_parse_datetime(date_val)
-            row_result["datetime_parsed"] = parsed
-            row_result["datetime_error"] = error
-            if parsed:
-                result["summary"]["datetime_success"] += 1
-            else:
-                result["summary"]["datetime_failed"] += 1
-        else:
-            row_result["datetime_error"] = "Kolom 'ACT. LOAD DATE' tidak ada"
-            result["summary"]["datetime_failed"] += 1
-
-        if address_col_exists:
-            addr = str(row.get('ALAMAT', '')).strip()
-            if addr and addr.lower() not in ('nan', 'none', ''):
-                coords = unique_addresses.get(addr, (None, None))
-                if coords[0] is not None and coords[1] is not None:
-                    row_result["geocode_lat"] = coords[0]
-                    row_result["geocode_lon"] = coords[1]
-                    result["summary"]["geocode_success"] += 1
-                else:
-                    row_result["geocode_error"] = f"Alamat tidak ditemukan: '{addr}'"
-                    result["summary"]["geocode_failed"] += 1
-            else:
-                row_result["geocode_error"] = "Alamat kosong"
-                result["summary"]["geocode_failed"] += 1
-        else:
-            row_result["geocode_error"] = "Kolom 'ALAMAT' tidak ada"
-            result["summary"]["geocode_failed"] += 1
-
-        if 'CABANG' in df.columns:
-            cabang_val = row.get('CABANG')
-            normalized_cabang, cabang_warning = _validate_cabang(cabang_val)
-            if cabang_warning:
-                row_result["value_warnings"].append({
+    if address_col_exists:
+        addresses = _map_unique(df['ALAMAT'], _address_key)
+        unique_addresses = list(dict.fromkeys(addr for addr in addresses if addr is not None))
+
+        if address_coords is None:
+            print(f"[Validate] Geocoding alamat unik untuk {label}...")
+            address_coords = geocode_addresses(unique_addresses)
+
+        # (lat, lon, error) per alamat unik, lalu disebar ke semua baris
+        geocode_by_address = {}
+        for addr in unique_addresses:
+            lat, lon = address_coords.get(addr, (None, None))
+            geocode_by_address[addr] = (
+                (lat, lon, None) if lat is not None and lon is not None
+                else (None, None, f"Alamat tidak ditemukan: '{addr}'")
+            )
+        empty_address = (None, None, "Alamat kosong")
+        geocoded = [
+            geocode_by_address[addr] if addr is not None else empty_address
+            for addr in addresses
+        ]
+        summary["geocode_success"] = sum(error is None for _, _, error in geocoded)
+        summary["geocode_failed"] = n - summary["geocode_success"]
+    else:
+        geocoded = [(None, None, "Kolom 'ALAMAT' tidak ada")] * n
+        summary["geocode_failed"] = n
+
+    # Peringatan nilai per baris, urutan kolom: CABANG, SIZE CONT, SERVICE TYPE, GRADE CONT
+    value_warnings: Dict[int, List[Dict[str, str]]] = {}
+    if 'CABANG' in df.columns:
+        cabang_values = df['CABANG'].tolist()
+        cabang_warnings = _map_unique(df['CABANG'], lambda value: _validate_cabang(value)[1])
+        for k, (value, warning) in enumerate(zip(cabang_values, cabang_warnings)):
+            if warning:
+                value_warnings.setdefault(k, []).append({
                     "column": "CABANG",
-                    "value": str(cabang_val),
-                    "message": cabang_warning
+                    "value": str(value),
+                    "message": warning
                 })
-                result["summary"]["value_warnings"] += 1
-
-        for col in ['SIZE CONT', 'SERVICE TYPE', 'GRADE CONT']:
-            if col in df.columns:
-                val = row.get(col)
-                warning = _validate_value(col, val)
-                if warning:
-                    row_result["value_warnings"].append({
-                        "column": col,
-                        "value": str(val),
-                        "message": warning
-                    })
-                    result["summary"]["value_warnings"] += 1
-
-        for req_col in REQUIRED_COLUMNS:
-            if req_col in df.columns:
-                val = row.get(req_col)
-                if pd.isna(val) or val is None or str(val).strip() == '':
-                    result["summary"]["missing_required"] += 1
-
-        result["rows"].append(row_result)
+        if prepared is not None:
+            prepared['cabang_fingerprint'] = column_fingerprint(df['CABANG'])
+            prepared['cabang_norm'] = _map_unique(df['CABANG'], normalize_cabang)
+
+    for col, valid_values in VALUE_COLUMNS.items():
+        if col not in df.columns:
+            continue
+        values = df[col]
+
+        def is_invalid(uniques: pd.Series) -> pd.Series:
+            normalized = uniques.astype(str).str.strip().str.upper()
+            return uniques.notna() & (normalized != '') & ~normalized.isin(valid_values)
+
+        invalid_rows = np.flatnonzero(_mask_unique(values, is_invalid))
+        invalid_values = values.iloc[invalid_rows]
+        messages = _map_unique(invalid_values, lambda value: _validate_value(col, value))
+        for k, value, message in zip(invalid_rows.tolist(), invalid_values.tolist(), messages):
+            value_warnings.setdefault(k, []).append({
+                "column": col,
+                "value": str(value),
+                "message": message
+            })
+
+    summary["value_warnings"] = sum(len(warnings) for warnings in value_warnings.values())
+
+    for req_col in REQUIRED_COLUMNS:
+        if req_col in df.columns:
+            summary["missing_required"] += int(_mask_unique(df[req_col], _blank_values).sum())
+
+    result["rows"] = [
+        {
+            "index": int(idx),
+            "datetime_parsed": parsed,
+            "datetime_error": datetime_error,
+            "geocode_lat": lat,
+            "geocode_lon": lon,
+            "geocode_error": geocode_error,
+            "value_warnings": value_warnings.get(k, []),
+        }
+        for k, (idx, parsed, datetime_error, (lat, lon, geocode_error)) in enumerate(zip(
+            df.index, datetime_parsed, datetime_errors, geocoded
+        ))
+    ]
 
     return result
 
@@ -332,8 +349,18 @@ def validate_data(
     print("STARTING DATA VALIDATION")
     print("=" * 60)
 
-    dest_result = validate_dataframe(df_dest, "bongkar/destinasi")
-    orig_result = validate_dataframe(df_orig, "muat/origin")
+    # Alamat bongkar & muat di-geocode dalam satu batch paralel
+    print("[Validate] Geocoding alamat unik bongkar & muat...")
+    address_coords = geocode_addresses(list(dict.fromkeys(
+        _unique_addresses(df_dest) + _unique_addresses(df_orig)
+    )))
+
+    # Disimpan sebagai validation token supaya /api/optimize tidak parse & geocode ulang
+    prepared: Dict[str, Any] = {"dest": {}, "orig": {}, "address_coords": address_coords}
+    dest_result = validate_dataframe(df_dest, "bongkar/destinasi", address_coords, prepared["dest"])
+    orig_result = validate_dataframe(df_orig, "muat/origin", address_coords, prepared["orig"])
+    validation_token = new_session_id()
+    save_session(validation_token, prepared, kind=SESSION_KIND_VALIDATION)
 
     print("=" * 60)
     print("VALIDATION COMPLETE")
@@ -347,5 +374,6 @@ def validate_data(
 
     return {
         "dest": dest_result,
-        "orig": orig_result
+        "orig": orig_result,
+        "validation_token": validation_token
     }
\ No newline at end of file
@@ -0,0 +1,81 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from assignment import _pool_context
+
+WORKER_POOL_KIND_THREAD = "thread"
+WORKER_POOL_KIND_PROCESS = "process"
+WORKER_POOL_KIND = os.getenv("WORKER_POOL_KIND", WORKER_POOL_KIND_THREAD)
+
+WORKER_POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", "2"))     # Optimasi/validasi yang jalan bersamaan
+WORKER_QUEUE_SIZE = int(os.getenv("WORKER_QUEUE_SIZE", "8"))   # Maks antrian di belakangnya
+WORKER_RETRY_AFTER_SECONDS = 30
+
+
+class WorkerPoolFull(Exception):
+    """Antrian worker penuh; request ditolak supaya server tetap responsif."""
+
+
+_executor: Optional[Executor] = None
+_executor_pid: Optional[int] = None
+_in_flight = 0
+_lock = threading.Lock()
+
+
+def _get_executor() -> Executor:
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        workers = max(1, WORKER_POOL_SIZE)
+        if WORKER_POOL_KIND == WORKER_POOL_KIND_PROCESS:
+            # Start method sama dengan pool assignment (lihat _pool_context)
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+        elif WORKER_POOL_KIND == WORKER_POOL_KIND_THREAD:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="worker")
+        else:
+            raise ValueError(f"WORKER_POOL_KIND tidak dikenal: '{WORKER_POOL_KIND}'")
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def _release(_: Future) -> None:
+    global _in_flight
+    with _lock:
+        _in_flight -= 1
+
+
+def submit(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    """
+    Jadwalkan pekerjaan berat (optimasi, validasi) di worker pool. Jika yang
+    sedang jalan + antri sudah WORKER_POOL_SIZE + WORKER_QUEUE_SIZE, langsung
+    raise WorkerPoolFull alih-alih menumpuk antrian tanpa batas.
+    """
+    global _in_flight
+    with _lock:
+        if _in_flight >= max(1, WORKER_POOL_SIZE) + WORKER_QUEUE_SIZE:
+            raise WorkerPoolFull(
+                f"Server sedang sibuk ({_in_flight} pekerjaan berjalan/antri). Coba lagi nanti."
+            )
+        future = _get_executor().submit(func, *args, **kwargs)
+        _in_flight += 1
+    future.add_done_callback(_release)
+    return future
+
+
+async def run_in_worker(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Jalankan func di worker pool tanpa memblokir event loop."""
+    return await asyncio.wrap_future(submit(func, *args, **kwargs))
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        in_flight = _in_flight
+    return {
+        "kind": WORKER_POOL_KIND,
+        "pool_size": WORKER_POOL_SIZE,
+        "queue_size": WORKER_QUEUE_SIZE,
+        "in_flight": in_flight,
+        "queued": max(0, in_flight - WORKER_POOL_SIZE),
+    }
@@ -11,7 +11,7 @@ const REQUIRED_COLUMNS = ['NO SOPT', 'CABANG', 'ACT. LOAD DATE', 'CUST ID', 'ALA
 type InputTab = 'upload' | 'paste' | 'manual';
 
 interface PlanningInputViewProps {
-    onSubmitData: (destData: PlanningRow[], origData: PlanningRow[]) => void;
+    onSubmitData: (destData: PlanningRow[], origData: PlanningRow[], validationToken?: string | null) => void;
     onBackToLanding: () => void;
     loading: boolean;
 }
@@ -180,10 +180,12 @@ export default function PlanningInputView({
     const [origValidation, setOrigValidation] = useState<DataValidationResult | null>(null);
     const [isValidating, setIsValidating] = useState(false);
     const [isValidated, setIsValidated] = useState(false);
+    // Token hasil validasi: backend memakai ulang tanggal, cabang & koordinat tanpa geocode ulang
+    const [validationToken, setValidationToken] = useState<string | null>(null);
 
     const handleSubmit = useCallback(() => {
-        onSubmitData(destData, origData);
-    }, [destData, origData, onSubmitData]);
+        onSubmitData(destData, origData, isValidated ? validationToken : null);
+    }, [destData, origData, onSubmitData, isValidated, validationToken]);
 
     const validateParsedData = (rows: PlanningRow[], label: string): string | null => {
         if (rows.length === 0) return `Data ${label} kosong.`;
@@ -227,6 +229,7 @@ export default function PlanningInputView({
 
             setDestValidation(res.data.dest);
             setOrigValidation(res.data.orig);
+            setValidationToken(res.data.validation_token ?? null);
             setIsValidated(true);
         } catch (err) {
             if (axios.isAxiosError(err)) {
@@ -246,6 +249,7 @@ export default function PlanningInputView({
         }
         setError(null);
         setIsValidated(false);
+        setValidationToken(null);
         setDestValidation(null);
         setOrigValidation(null);
         try {
@@ -277,6 +281,7 @@ export default function PlanningInputView({
         }
         setError(null);
         setIsValidated(false);
+        setValidationToken(null);
         setDestValidation(null);
         setOrigValidation(null);
         try {
@@ -311,6 +316,7 @@ export default function PlanningInputView({
         setDestData([]);
         setOrigData([]);
         setIsValidated(false);
+        setValidationToken(null);
         setDestValidation(null);
         setOrigValidation(null);
         setShowPreview(true);
@@ -319,6 +325,7 @@ export default function PlanningInputView({
     const handleBackFromPreview = () => {
         setShowPreview(false);
         setIsValidated(false);
+        setValidationToken(null);
         setDestValidation(null);
         setOrigValidation(null);
     };
@@ -483,7 +490,7 @@ export default function PlanningInputView({
                             </label>
                             <input
                                 type="file"
-                                accept=".xlsx,.xls"
+                                accept=".xlsx,.xls,.csv"
                                 onChange={(e) => setFileDest(e.target.files?.[0] || null)}
                                 className="block w-full text-sm text-slate-500 file:mr-4 file:py-3 file:px-6 file:rounded-full file:border-0 file:text-sm file:font-bold file:bg-violet-50 file:text-violet-700 hover:file:bg-violet-100 cursor-pointer border border-slate-200 rounded-lg"
                             />
@@ -496,7 +503,7 @@ export default function PlanningInputView({
                             </label>
                             <input
                                 type="file"
-                                accept=".xlsx,.xls"
+                                accept=".xlsx,.xls,.csv"
                                 onChange={(e) => setFileOrig(e.target.files?.[0] || null)}
                                 className="block w-full text-sm text-slate-500 file:mr-4 file:py-3 file:px-6 file:rounded-full file:border-0 file:text-sm file:font-bold file:bg-blue-50 file:text-blue-700 hover:file:bg-blue-100 cursor-pointer border border-slate-200 rounded-lg"
                             />
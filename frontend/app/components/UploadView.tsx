@@ -4,6 +4,7 @@ interface UploadViewProps {
   fileDest: File | null;
   fileOrig: File | null;
   loading: boolean;
+  progressText?: string;
   onFileDestChange: (file: File | null) => void;
   onFileOrigChange: (file: File | null) => void;
   onRun: () => void;
@@ -13,6 +14,7 @@ export default function UploadView({
   fileDest,
   fileOrig,
   loading,
+  progressText,
   onFileDestChange,
   onFileOrigChange,
   onRun,
@@ -22,7 +24,7 @@ export default function UploadView({
       <div className="text-center mb-10">
         <h2 className="text-3xl font-bold text-slate-800 mb-2">UPLOAD DATA</h2>
         <p className="text-slate-500">
-          Upload Data Rencana Bongkar dengan format Excel .xlsx
+          Upload Data Rencana Bongkar dengan format Excel .xlsx, CSV, Parquet, atau Arrow
         </p>
       </div>
 
@@ -33,7 +35,7 @@ export default function UploadView({
           </label>
           <input
             type="file"
-            accept=".xlsx"
+            accept=".xlsx,.csv,.parquet,.arrow,.feather"
             onChange={(e) => onFileDestChange(e.target.files?.[0] || null)}
             className="block w-full text-sm text-slate-500 file:mr-4 file:py-3 file:px-6 file:rounded-full file:border-0 file:text-sm file:font-bold file:bg-blue-50 file:text-blue-700 hover:file:bg-blue-100 cursor-pointer border border-slate-200 rounded-lg"
           />
@@ -50,7 +52,7 @@ export default function UploadView({
           </label>
           <input
             type="file"
-            accept=".xlsx"
+            accept=".xlsx,.csv,.parquet,.arrow,.feather"
             onChange={(e) => onFileOrigChange(e.target.files?.[0] || null)}
             className="block w-full text-sm text-slate-500 file:mr-4 file:py-3 file:px-6 file:rounded-full file:border-0 file:text-sm file:font-bold file:bg-blue-50 file:text-blue-700 hover:file:bg-blue-100 cursor-pointer border border-slate-200 rounded-lg"
           />
@@ -72,6 +74,12 @@ export default function UploadView({
         >
           {loading ? 'Sedang Memproses Algoritma...' : 'Jalankan Mapping'}
         </button>
+
+        {progressText && (
+          <p className="text-sm text-center text-slate-500 animate-pulse">
+            {progressText}
+          </p>
+        )}
       </div>
     </div>
   );
@@ -2,10 +2,10 @@
 
 import { useState } from 'react';
 import { useRouter } from 'next/navigation';
-import axios from 'axios';
 import { useMappingContext } from '@/context';
 import { Header, UploadView } from '@/app/components';
-import { OptimizationResult } from '@/types';
+import { OptimizeJobStatus } from '@/types';
+import { formatJobProgress, runOptimizeJob } from '@/utils/optimizeJob';
 
 export default function MappingPage() {
   const router = useRouter();
@@ -23,6 +23,7 @@ export default function MappingPage() {
   const [fileDest, setFileDest] = useState<File | null>(null);
   const [fileOrig, setFileOrig] = useState<File | null>(null);
   const [loading, setLoading] = useState(false);
+  const [job, setJob] = useState<OptimizeJobStatus | null>(null);
 
   const handleBackToLanding = () => {
     setAppMode(null);
@@ -41,6 +42,7 @@ export default function MappingPage() {
     }
 
     setLoading(true);
+    setJob(null);
 
     const fd = new FormData();
     fd.append('file_dest', fileDest);
@@ -48,9 +50,7 @@ export default function MappingPage() {
 
     try {
       const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://127.0.0.1:8000';
-      const res = await axios.post(`${apiUrl}/api/optimize`, fd);
-
-      const { results: data, stats: backendStats } = res.data;
+      const { results: data, stats: backendStats } = await runOptimizeJob(apiUrl, fd, setJob);
 
       const newStats = {
         match: backendStats.total_match,
@@ -111,6 +111,7 @@ export default function MappingPage() {
           fileDest={fileDest}
           fileOrig={fileOrig}
           loading={loading}
+          progressText={loading ? formatJobProgress(job) : undefined}
           onFileDestChange={setFileDest}
           onFileOrigChange={setFileOrig}
           onRun={handleRun}
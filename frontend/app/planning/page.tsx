@@ -2,11 +2,11 @@
 
 import { useState } from 'react';
 import { useRouter } from 'next/navigation';
-import axios from 'axios';
 import * as XLSX from 'xlsx';
 import { useMappingContext } from '@/context';
 import { Header, PlanningInputView } from '@/app/components';
-import { PlanningRow } from '@/types';
+import { OptimizeJobStatus, PlanningRow } from '@/types';
+import { formatJobProgress, runOptimizeJob } from '@/utils/optimizeJob';
 
 export default function PlanningPage() {
     const router = useRouter();
@@ -22,6 +22,7 @@ export default function PlanningPage() {
     } = useMappingContext();
 
     const [loading, setLoading] = useState(false);
+    const [job, setJob] = useState<OptimizeJobStatus | null>(null);
 
     const handleBackToLanding = () => {
         setAppMode(null);
@@ -33,8 +34,13 @@ export default function PlanningPage() {
         router.push('/');
     };
 
-    const handleSubmitData = async (destData: PlanningRow[], origData: PlanningRow[]) => {
+    const handleSubmitData = async (
+        destData: PlanningRow[],
+        origData: PlanningRow[],
+        validationToken?: string | null
+    ) => {
         setLoading(true);
+        setJob(null);
         try {
             const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://127.0.0.1:8000';
 
@@ -60,10 +66,10 @@ export default function PlanningPage() {
             const fd = new FormData();
             fd.append('file_dest', destBlob, 'planning_dest.xlsx');
             fd.append('file_orig', origBlob, 'planning_orig.xlsx');
+            // Kolom yang tidak diedit sejak validasi tidak di-parse/geocode ulang
+            if (validationToken) fd.append('validation_token', validationToken);
 
-            const res = await axios.post(`${apiUrl}/api/optimize`, fd);
-
-            const { results: data, stats: backendStats } = res.data;
+            const { results: data, stats: backendStats } = await runOptimizeJob(apiUrl, fd, setJob);
 
             const newStats = {
                 match: backendStats.total_match,
@@ -109,6 +115,11 @@ export default function PlanningPage() {
             />
 
             <main className="flex-1 p-6 w-full max-w-300 mx-auto">
+                {loading && (
+                    <div className="mb-4 p-3 bg-blue-50 border border-blue-200 rounded-lg text-blue-700 text-sm text-center animate-pulse">
+                        {formatJobProgress(job) || 'Memproses...'}
+                    </div>
+                )}
                 <PlanningInputView
                     onSubmitData={handleSubmitData}
                     onBackToLanding={handleBackToLanding}
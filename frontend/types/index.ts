@@ -53,6 +53,7 @@ export interface CabangStats {
   match: number;
   saving: number;
   saving_cost: number;
+  pruned_pairs?: number;
 }
 
 export interface OptimizationStats {
@@ -123,4 +124,40 @@ export interface DataValidationResult {
 export interface FullValidationResult {
   dest: DataValidationResult;
   orig: DataValidationResult;
-}
\ No newline at end of file
+  validation_token?: string;
+}
+// --- Optimization Job Types ---
+
+export type OptimizeJobStage = 'geocoding' | 'routing' | 'assignment';
+
+export interface OptimizeJobProgress {
+  done: number;
+  total: number;
+}
+
+export interface OptimizeJobStatus {
+  job_id: string;
+  status: 'queued' | 'running' | 'done' | 'failed';
+  stage: OptimizeJobStage | null;
+  progress: Partial<Record<OptimizeJobStage, OptimizeJobProgress>>;
+  error: string | null;
+}
+
+export interface OptimizeResponse {
+  results: OptimizationResult[];
+  stats: {
+    total_match: number;
+    total_origin: number;
+    total_dest: number;
+    saving: number;
+    saving_cost: number;
+    cabang_breakdown: CabangStats[];
+    pruned_pairs?: number;
+    memory?: {
+      candidate_edges: number;
+      edge_store_mb: number;
+      peak_rss_mb: number | null;
+    };
+  };
+  session_id?: string;
+}
@@ -0,0 +1,76 @@
+import { OptimizeJobStage, OptimizeJobStatus, OptimizeResponse } from '@/types';
+
+const STAGE_LABELS: Record<OptimizeJobStage, string> = {
+  geocoding: 'Geocoding alamat',
+  routing: 'Menghitung rute',
+  assignment: 'Optimasi pasangan',
+};
+
+export const formatJobProgress = (job: OptimizeJobStatus | null): string => {
+  if (!job) return '';
+  if (job.status === 'queued') return 'Menunggu antrian...';
+  if (!job.stage) return 'Memproses...';
+
+  const progress = job.progress[job.stage];
+  const label = STAGE_LABELS[job.stage] ?? job.stage;
+  return progress ? `${label} (${progress.done}/${progress.total})` : `${label}...`;
+};
+
+// Session optimasi terakhir; submit ulang setelah edit kecil hanya menghitung ulang yang berubah
+const SESSION_STORAGE_KEY = 'optimizeSessionId';
+
+const readErrorDetail = async (res: Response): Promise<string> => {
+  try {
+    const body = await res.json();
+    return body?.detail || res.statusText;
+  } catch {
+    return res.statusText;
+  }
+};
+
+/**
+ * Jalankan optimasi sebagai job: submit, ikuti progress (NDJSON), lalu ambil hasil.
+ * Session id run sebelumnya ikut dikirim supaya backend bisa optimasi inkremental.
+ */
+export async function runOptimizeJob(
+  apiUrl: string,
+  formData: FormData,
+  onProgress?: (job: OptimizeJobStatus) => void
+): Promise<OptimizeResponse> {
+  const sessionId = window.sessionStorage.getItem(SESSION_STORAGE_KEY);
+  if (sessionId && !formData.has('session_id')) formData.append('session_id', sessionId);
+
+  const submitRes = await fetch(`${apiUrl}/api/optimize/jobs`, { method: 'POST', body: formData });
+  if (!submitRes.ok) throw new Error(await readErrorDetail(submitRes));
+  const { job_id: jobId } = await submitRes.json();
+
+  const eventsRes = await fetch(`${apiUrl}/api/optimize/jobs/${jobId}/events`);
+  if (!eventsRes.ok || !eventsRes.body) throw new Error(await readErrorDetail(eventsRes));
+
+  const reader = eventsRes.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let lastJob: OptimizeJobStatus | null = null;
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    const lines = buffer.split('\n');
+    buffer = lines.pop() ?? '';
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      lastJob = JSON.parse(line) as OptimizeJobStatus;
+      onProgress?.(lastJob);
+    }
+  }
+
+  if (lastJob?.status === 'failed') throw new Error(lastJob.error || 'Job gagal');
+
+  const resultRes = await fetch(`${apiUrl}/api/optimize/jobs/${jobId}/result`);
+  if (!resultRes.ok) throw new Error(await readErrorDetail(resultRes));
+  const result: OptimizeResponse = await resultRes.json();
+  if (result.session_id) window.sessionStorage.setItem(SESSION_STORAGE_KEY, result.session_id);
+  return result;
+}